@@ -1,7 +1,7 @@
 from fastapi import FastAPI
 from core.config import settings
 from core.observability import instrument_app
-from routers import ingest, train, series, init_backfill, metrics, futures, obs
+from routers import ingest, train, series, init_backfill, metrics, futures, obs, predict, forecast, backtest, tuning, candles, export, events
 
 app = FastAPI(
     title="BTC ML API",
@@ -23,6 +23,60 @@ app.include_router(init_backfill.router)
 app.include_router(metrics.router)
 app.include_router(futures.router)
 app.include_router(obs.router)
+app.include_router(predict.router)
+app.include_router(forecast.router)
+app.include_router(backtest.router)
+app.include_router(tuning.router)
+app.include_router(candles.router)
+app.include_router(export.router)
+app.include_router(events.router)
+
+
+@app.on_event("startup")
+def apply_migrations():
+	# Migrações versionadas (core/migrations.py): schema.sql + tabelas dos serviços, uma vez;
+	# as requisições não executam DDL. Com MIGRATE_ON_STARTUP=0, rodar
+	# "python -m core.migrations" antes de subir a API.
+	from core import migrations, partitioning
+	try:
+		if settings.MIGRATE_ON_STARTUP:
+			migrations.migrate()
+		# partições do mês atual e dos próximos (btc_candles/futures/series_cache) + manutenção periódica
+		partitioning.premake()
+		partitioning.start_maintenance()
+	except Exception:
+		pass
+
+
+@app.on_event("startup")
+def seed_candle_buffer():
+	# Buffer de candles recentes (services/candle_buffer.py); sem banco, segue vazio e
+	# as previsões usam o caminho via Postgres
+	from services import candle_buffer
+	try:
+		candle_buffer.seed_from_db()
+	except Exception:
+		pass
+
+
+@app.on_event("startup")
+def check_feature_store():
+	# Recalcula candle_features em background se estiver vazia ou com outra versão de FEATURE_COLS
+	from services import feature_store_service
+	try:
+		feature_store_service.ensure_feature_store()
+	except Exception:
+		pass
+
+
+@app.on_event("startup")
+def check_rollups():
+	# Preenche em background as resoluções de CANDLE_ROLLUP_INTERVALS ainda vazias em candle_rollups
+	from services import rollup_service
+	try:
+		rollup_service.ensure_rollups()
+	except Exception:
+		pass
 
 # rota raiz para indicar status da API
 @app.get("/")
@@ -0,0 +1,113 @@
+"""Stand-in local da API de klines da Binance (GET /api/v3/klines) com dados sintéticos.
+
+Serve uma série determinística (ml.synthetic) que "avança" com o relógio: candles com
+open_time no futuro ficam ocultos até chegar a hora, então /ingest periódico enxerga
+candles novos como em produção.
+
+Uso (a partir de api/):
+    python -m bench.binance_stub --port 9001 --days 90 --interval 5m
+    BINANCE_BASE=http://127.0.0.1:9001 uvicorn app:app
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+from ml.synthetic import candles_for_days, interval_seconds, synthetic_candles, synthetic_klines_payload
+
+
+class KlineBook:
+    """Série sintética pré-gerada (histórico + algumas horas à frente do relógio)."""
+
+    def __init__(self, days: float, interval: str, seed: int = 42, ahead_hours: float = 24.0):
+        self.interval = interval
+        n = candles_for_days(days + ahead_hours / 24.0, interval)
+        end = datetime.utcnow() + timedelta(hours=ahead_hours)
+        df = synthetic_candles(n, interval=interval, end=end, seed=seed)
+        self.rows = synthetic_klines_payload(df, interval=interval)
+        self.open_ms = np.asarray([r[0] for r in self.rows], dtype=np.int64)
+
+    def window(self, limit: int, start_ms: int | None = None, end_ms: int | None = None) -> list:
+        now_ms = int(time.time() * 1000)
+        visible = int(np.searchsorted(self.open_ms, now_ms, side="right"))
+        if end_ms is not None:
+            visible = min(visible, int(np.searchsorted(self.open_ms, end_ms, side="right")))
+        if start_ms is not None:
+            lo = int(np.searchsorted(self.open_ms, start_ms, side="left"))
+            return self.rows[lo:min(lo + limit, visible)]
+        return self.rows[max(0, visible - limit):visible]
+
+
+def make_handler(book: KlineBook, latency_ms: float = 0.0):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):  # silencioso (é usado sob carga)
+            pass
+
+        def _send(self, status: int, body: bytes, headers: dict | None = None):
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            for k, v in (headers or {}).items():
+                self.send_header(k, v)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            u = urlparse(self.path)
+            if u.path != "/api/v3/klines":
+                self._send(404, b'{"code":-1,"msg":"not found"}')
+                return
+            q = {k: v[0] for k, v in parse_qs(u.query).items()}
+            if q.get("interval", book.interval) != book.interval:
+                self._send(400, b'{"code":-1120,"msg":"Invalid interval."}')
+                return
+            limit = max(1, min(int(q.get("limit", 500)), 1000))
+            start_ms = int(q["startTime"]) if "startTime" in q else None
+            end_ms = int(q["endTime"]) if "endTime" in q else None
+            if latency_ms > 0:
+                time.sleep(latency_ms / 1000.0)
+            rows = book.window(limit, start_ms, end_ms)
+            self._send(200, json.dumps(rows).encode("utf-8"), {"X-MBX-USED-WEIGHT-1M": "2"})
+
+    return Handler
+
+
+def start_stub(port: int = 0, days: float = 90, interval: str = "5m", seed: int = 42,
+               latency_ms: float = 0.0) -> tuple[ThreadingHTTPServer, str]:
+    """Sobe o stub numa thread daemon e devolve (server, base_url)."""
+    book = KlineBook(days, interval, seed=seed)
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(book, latency_ms))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="binance-stub", daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def main(argv: list[str] | None = None) -> None:
+    ap = argparse.ArgumentParser(description="Stand-in local de /api/v3/klines (dados sintéticos).")
+    ap.add_argument("--port", type=int, default=9001)
+    ap.add_argument("--days", type=float, default=90)
+    ap.add_argument("--interval", default="5m")
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--latency-ms", type=float, default=0.0, help="latência artificial por resposta")
+    args = ap.parse_args(argv)
+    interval_seconds(args.interval)  # valida o intervalo
+    server, base = start_stub(args.port, args.days, args.interval, args.seed, args.latency_ms)
+    print(f"BINANCE_BASE={base}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
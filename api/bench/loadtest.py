@@ -0,0 +1,360 @@
+"""Gerador de carga com mix de tráfego (sintético ou gravado) e relatório de SLO.
+
+Mix sintético (padrão):
+- periódicos: POST /ingest (a cada 5 min) e POST /train/auto (a cada 1 h), com o relógio
+  comprimido por --time-scale (60 => 5 min viram 5 s);
+- leitores concorrentes em loop fechado: GET /series/cached, GET /futures?limit=288 e
+  GET /metrics, escolhidos por peso.
+
+A concorrência de leitores sobe em degraus (--ramp); para cada degrau e endpoint o
+relatório traz throughput, taxa de erro e latências p50/p90/p99/max, além do ponto de
+saturação (degrau em que o throughput para de crescer ou o SLO é violado).
+
+Com --replay, um arquivo JSONL gravado ({"t": s, "method": ..., "path": ...}, ver
+--record-mix) é reproduzido em loop aberto; os degraus do --ramp viram multiplicadores
+de velocidade.
+
+Uso (a partir de api/):
+    python -m bench.loadtest --spawn-api --workers 2 --ramp 1,4,16,64 --step-seconds 30
+    python -m bench.loadtest --base-url http://localhost:8000 --record-mix mix.jsonl
+    python -m bench.loadtest --base-url http://localhost:8000 --replay mix.jsonl --ramp 1,2,4
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import requests
+
+
+@dataclass(frozen=True)
+class Call:
+    name: str
+    method: str
+    path: str
+    weight: float = 1.0
+
+
+DEFAULT_READERS = [
+    Call("series_cached", "GET", "/series/cached", 6),
+    Call("futures", "GET", "/futures?limit=288", 3),
+    Call("metrics", "GET", "/metrics", 1),
+]
+
+# (call, período real em segundos)
+DEFAULT_PERIODIC = [
+    (Call("ingest", "POST", "/ingest"), 300.0),
+    (Call("train_auto", "POST", "/train/auto"), 3600.0),
+]
+
+
+class Recorder:
+    """Acumula amostras (degrau, endpoint, latência, ok) de todas as threads."""
+
+    def __init__(self, record_mix: Optional[Path] = None):
+        self._lock = threading.Lock()
+        self.samples: list[tuple[int, str, float, bool]] = []
+        self.step = 0
+        self._t0 = time.perf_counter()
+        self._step_started: list[float] = []
+        self.durations: list[float] = []
+        self._mix = open(record_mix, "w", encoding="utf-8") if record_mix else None
+
+    def begin_step(self, step: int) -> None:
+        now = time.perf_counter()
+        if self._step_started:
+            self.durations.append(now - self._step_started[-1])
+        self._step_started.append(now)
+        self.step = step
+
+    def end_steps(self) -> None:
+        if len(self._step_started) > len(self.durations):
+            self.durations.append(time.perf_counter() - self._step_started[-1])
+
+    def add(self, name: str, latency_s: float, ok: bool) -> None:
+        with self._lock:
+            self.samples.append((self.step, name, latency_s, ok))
+
+    def log_call(self, call: Call) -> None:
+        if self._mix is None:
+            return
+        with self._lock:
+            t = time.perf_counter() - self._t0
+            self._mix.write(json.dumps({"t": round(t, 4), "method": call.method, "path": call.path, "name": call.name}) + "\n")
+
+    def close(self) -> None:
+        if self._mix is not None:
+            self._mix.close()
+
+
+def _send(session: requests.Session, base_url: str, call: Call, rec: Recorder, timeout: float) -> None:
+    rec.log_call(call)
+    t0 = time.perf_counter()
+    ok = False
+    try:
+        r = session.request(call.method, base_url + call.path, timeout=timeout)
+        # a API responde 200 com {"status":"error"} em falhas de job; conta como erro
+        ok = r.status_code < 400 and b'"status":"error"' not in r.content[:200]
+    except requests.RequestException:
+        ok = False
+    rec.add(call.name, time.perf_counter() - t0, ok)
+
+
+def _periodic_loop(base_url: str, periodic: list, time_scale: float, rec: Recorder,
+                   stop: threading.Event, timeout: float) -> None:
+    next_at = {c.name: time.perf_counter() for c, _ in periodic}
+    while not stop.is_set():
+        now = time.perf_counter()
+        for call, period in periodic:
+            if now >= next_at[call.name]:
+                next_at[call.name] = now + period / time_scale
+                # sessão própria por disparo: /train/auto pode demorar mais que o período comprimido
+                threading.Thread(
+                    target=_send, args=(requests.Session(), base_url, call, rec, timeout), daemon=True
+                ).start()
+        stop.wait(0.05)
+
+
+def _reader_loop(base_url: str, readers: list[Call], seed: int, deadline: float, rec: Recorder,
+                 think_s: float, timeout: float) -> None:
+    rng = random.Random(seed)
+    weights = [c.weight for c in readers]
+    session = requests.Session()
+    while time.perf_counter() < deadline:
+        _send(session, base_url, rng.choices(readers, weights)[0], rec, timeout)
+        if think_s > 0:
+            time.sleep(think_s)
+
+
+def run_synthetic(args, base_url: str, rec: Recorder, steps: list[int]) -> None:
+    stop = threading.Event()
+    periodic = threading.Thread(
+        target=_periodic_loop,
+        args=(base_url, DEFAULT_PERIODIC, args.time_scale, rec, stop, args.timeout),
+        daemon=True,
+    )
+    if not args.no_periodic:
+        periodic.start()
+    try:
+        for i, conc in enumerate(steps):
+            rec.begin_step(i)
+            print(f"degrau {i}: {conc} leitores por {args.step_seconds}s", file=sys.stderr)
+            deadline = time.perf_counter() + args.step_seconds
+            threads = [
+                threading.Thread(
+                    target=_reader_loop,
+                    args=(base_url, DEFAULT_READERS, args.seed * 1000 + i * 100 + w, deadline, rec,
+                          args.think_ms / 1000.0, args.timeout),
+                    daemon=True,
+                )
+                for w in range(conc)
+            ]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+    finally:
+        stop.set()
+
+
+def run_replay(args, base_url: str, rec: Recorder, steps: list[int]) -> None:
+    calls = []
+    for line in Path(args.replay).read_text(encoding="utf-8").splitlines():
+        if line.strip():
+            d = json.loads(line)
+            name = d.get("name") or d["path"].split("?")[0].strip("/").replace("/", "_") or "root"
+            calls.append((float(d["t"]), Call(name, d.get("method", "GET"), d["path"])))
+    calls.sort(key=lambda x: x[0])
+    if not calls:
+        raise SystemExit("arquivo de replay vazio")
+    local = threading.local()
+
+    def send(call: Call):
+        if not hasattr(local, "session"):
+            local.session = requests.Session()
+        _send(local.session, base_url, call, rec, args.timeout)
+
+    with ThreadPoolExecutor(max_workers=args.max_inflight) as pool:
+        for i, speed in enumerate(steps):
+            rec.begin_step(i)
+            print(f"degrau {i}: replay {speed}x", file=sys.stderr)
+            t0 = time.perf_counter()
+            futures = []
+            for t, call in calls:
+                wait = t / speed - (time.perf_counter() - t0)
+                if wait > 0:
+                    time.sleep(wait)
+                futures.append(pool.submit(send, call))
+            for f in futures:
+                f.result()
+
+
+def summarize(rec: Recorder, steps: list[int], durations: list[float]) -> list[dict]:
+    out = []
+    by_key: dict[tuple[int, str], list[tuple[float, bool]]] = {}
+    for step, name, lat, ok in rec.samples:
+        by_key.setdefault((step, name), []).append((lat, ok))
+        by_key.setdefault((step, "_all"), []).append((lat, ok))
+    for (step, name), vals in sorted(by_key.items()):
+        lat_ms = np.asarray([v[0] for v in vals]) * 1000.0
+        errors = sum(1 for v in vals if not v[1])
+        dur = durations[step] if step < len(durations) and durations[step] > 0 else 1.0
+        out.append({
+            "step": step,
+            "load": steps[step],
+            "endpoint": name,
+            "requests": len(vals),
+            "errors": errors,
+            "error_rate": errors / len(vals),
+            "throughput_rps": len(vals) / dur,
+            "p50_ms": float(np.percentile(lat_ms, 50)),
+            "p90_ms": float(np.percentile(lat_ms, 90)),
+            "p99_ms": float(np.percentile(lat_ms, 99)),
+            "max_ms": float(lat_ms.max()),
+        })
+    return out
+
+
+def find_saturation(rows: list[dict], slo_p99_ms: float, slo_error_rate: float, knee: float) -> dict:
+    """Por endpoint: último degrau dentro do SLO e primeiro degrau saturado.
+
+    Saturado = SLO violado, ou throughput cresceu menos que 'knee' (fração) em relação
+    ao degrau anterior enquanto a p50 subiu.
+    """
+    out = {}
+    for name in sorted({r["endpoint"] for r in rows}):
+        series = sorted((r for r in rows if r["endpoint"] == name), key=lambda r: r["step"])
+        last_ok = None
+        saturated = None
+        reason = None
+        prev = None
+        for r in series:
+            within = r["p99_ms"] <= slo_p99_ms and r["error_rate"] <= slo_error_rate
+            if within:
+                last_ok = r["load"]
+            if saturated is None:
+                if not within:
+                    saturated, reason = r["load"], "slo_violated"
+                elif prev is not None and r["throughput_rps"] < prev["throughput_rps"] * (1.0 + knee) \
+                        and r["p50_ms"] > prev["p50_ms"]:
+                    saturated, reason = r["load"], "throughput_plateau"
+            prev = r
+        out[name] = {"max_load_within_slo": last_ok, "saturation_load": saturated, "reason": reason}
+    return out
+
+
+def _spawn_api(args) -> tuple[subprocess.Popen, str, object]:
+    from bench.binance_stub import start_stub
+
+    stub, stub_url = start_stub(0, days=args.stub_days, interval=args.stub_interval)
+    env = dict(os.environ, BINANCE_BASE=stub_url, BINANCE_INTERVAL=args.stub_interval)
+    api_dir = Path(__file__).resolve().parent.parent
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app:app", "--host", "127.0.0.1", "--port", str(args.api_port),
+         "--workers", str(args.workers), "--log-level", "warning"],
+        cwd=str(api_dir),
+        env=env,
+    )
+    base_url = f"http://127.0.0.1:{args.api_port}"
+    deadline = time.time() + 120
+    while time.time() < deadline:
+        try:
+            if requests.get(base_url + "/", timeout=2).status_code == 200:
+                return proc, base_url, stub
+        except requests.RequestException:
+            pass
+        if proc.poll() is not None:
+            raise SystemExit("uvicorn terminou antes de ficar pronto")
+        time.sleep(0.5)
+    proc.terminate()
+    raise SystemExit("timeout aguardando a API subir")
+
+
+def _print_table(rows: list[dict], saturation: dict) -> None:
+    print(f"{'load':>6} {'endpoint':<15}{'req':>8}{'err%':>7}{'rps':>9}{'p50 ms':>9}{'p90 ms':>9}{'p99 ms':>9}")
+    for r in rows:
+        print(
+            f"{r['load']:>6} {r['endpoint']:<15}{r['requests']:>8}{100 * r['error_rate']:>7.1f}"
+            f"{r['throughput_rps']:>9.1f}{r['p50_ms']:>9.1f}{r['p90_ms']:>9.1f}{r['p99_ms']:>9.1f}"
+        )
+    print()
+    for name, s in saturation.items():
+        print(f"{name:<15} dentro do SLO até {s['max_load_within_slo']}; saturação em {s['saturation_load']} ({s['reason']})")
+
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(description="Teste de carga com mix de tráfego e relatório de SLO.")
+    ap.add_argument("--base-url", default="http://127.0.0.1:8000")
+    ap.add_argument("--spawn-api", action="store_true", help="sobe uvicorn local apontando para o stub da Binance")
+    ap.add_argument("--api-port", type=int, default=8765)
+    ap.add_argument("--workers", type=int, default=1, help="workers uvicorn (com --spawn-api)")
+    ap.add_argument("--stub-days", type=float, default=90)
+    ap.add_argument("--stub-interval", default="5m")
+    ap.add_argument("--ramp", default="1,2,4,8,16,32", help="concorrência por degrau (ou velocidades no replay)")
+    ap.add_argument("--step-seconds", type=float, default=30.0)
+    ap.add_argument("--time-scale", type=float, default=60.0, help="compressão do relógio dos jobs periódicos")
+    ap.add_argument("--no-periodic", action="store_true", help="não dispara /ingest e /train/auto")
+    ap.add_argument("--think-ms", type=float, default=0.0)
+    ap.add_argument("--timeout", type=float, default=60.0)
+    ap.add_argument("--replay", default=None, help="JSONL gravado para reproduzir")
+    ap.add_argument("--max-inflight", type=int, default=256, help="requisições simultâneas no replay")
+    ap.add_argument("--record-mix", default=None, help="grava as chamadas emitidas em JSONL (para replay)")
+    ap.add_argument("--slo-p99-ms", type=float, default=500.0)
+    ap.add_argument("--slo-error-rate", type=float, default=0.01)
+    ap.add_argument("--knee", type=float, default=0.10)
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--out", default=None, help="arquivo JSON do relatório")
+    args = ap.parse_args(argv)
+
+    steps = [int(float(s)) if not args.replay else float(s) for s in args.ramp.split(",") if s.strip()]
+    proc = stub = None
+    base_url = args.base_url.rstrip("/")
+    if args.spawn_api:
+        proc, base_url, stub = _spawn_api(args)
+    rec = Recorder(Path(args.record_mix) if args.record_mix else None)
+    try:
+        (run_replay if args.replay else run_synthetic)(args, base_url, rec, steps)
+        rec.end_steps()
+    finally:
+        rec.close()
+        if proc is not None:
+            proc.terminate()
+            proc.wait(timeout=30)
+        if stub is not None:
+            stub.shutdown()
+
+    rows = summarize(rec, steps, rec.durations)
+    saturation = find_saturation(rows, args.slo_p99_ms, args.slo_error_rate, args.knee)
+    report = {
+        "meta": {
+            "created_at": datetime.utcnow().isoformat(),
+            "base_url": base_url,
+            "mode": "replay" if args.replay else "synthetic",
+            "ramp": steps,
+            "step_seconds": args.step_seconds,
+            "workers": args.workers if args.spawn_api else None,
+            "slo": {"p99_ms": args.slo_p99_ms, "error_rate": args.slo_error_rate},
+        },
+        "steps": rows,
+        "saturation": saturation,
+    }
+    if args.out:
+        Path(args.out).write_text(json.dumps(report, indent=2), encoding="utf-8")
+    _print_table(rows, saturation)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
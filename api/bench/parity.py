@@ -0,0 +1,76 @@
+"""Checagem de paridade: motor de features NumPy/incremental × build_features_targets (pandas).
+
+Uso (a partir de api/):
+    python -m bench.parity --days 30 --interval 1m --seed 42
+Sai com código 1 se alguma coluna divergir além da tolerância.
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+
+import numpy as np
+
+from ml.features import FEATURE_COLS, TARGET_REG_COLS, build_features_targets
+from ml.streaming_features import StreamingFeatureEngine, build_features_targets_np
+from ml.synthetic import candles_for_days, synthetic_candles
+
+# vol_rel: pandas usa soma corrente compensada na média móvel (ver ml/streaming_features.py)
+TOLERANCES = {"vol_rel": 1e-12}
+
+
+def _compare(name: str, ref: np.ndarray, got: np.ndarray, rtol: float) -> tuple[bool, float]:
+    if ref.shape != got.shape:
+        return False, float("inf")
+    if rtol == 0.0:
+        same = np.array_equal(ref, got)
+        diff = 0.0 if same else float(np.max(np.abs(ref - got)))
+        return same, diff
+    rel = np.abs(ref - got) / np.maximum(np.abs(ref), 1e-300)
+    worst = float(rel.max()) if rel.size else 0.0
+    return worst <= rtol, worst
+
+
+def check(df) -> list[tuple[str, str, bool, float]]:
+    df2, X, Yreg, Ycls = build_features_targets(df)
+    o, h, l, c, v = (df[k].to_numpy(dtype=np.float64) for k in ("open", "high", "low", "close", "volume"))
+    keep, Xn, Yn, Cn = build_features_targets_np(o, h, l, c, v)
+
+    engine = StreamingFeatureEngine()
+    Xs = np.vstack([engine.update(*row) for row in zip(o, h, l, c, v)])[keep]
+
+    results = []
+    ok_rows = np.array_equal(df["time"].to_numpy()[keep], df2["time"].to_numpy())
+    results.append(("batch", "rows", ok_rows, 0.0 if ok_rows else float(abs(len(keep) - len(df2)))))
+    if not ok_rows:
+        return results
+    Xref = X.to_numpy(dtype=np.float64)
+    for j, col in enumerate(FEATURE_COLS):
+        tol = TOLERANCES.get(col, 0.0)
+        results.append(("batch", col, *_compare(col, Xref[:, j], Xn[:, j], tol)))
+        results.append(("streaming", col, *_compare(col, Xref[:, j], Xs[:, j], tol)))
+    Yref = Yreg.to_numpy(dtype=np.float64)
+    for j, col in enumerate(TARGET_REG_COLS):
+        results.append(("batch", col, *_compare(col, Yref[:, j], Yn[:, j], 0.0)))
+    same_cls = np.array_equal(Ycls.to_numpy(dtype=np.int64), Cn)
+    results.append(("batch", "dir_next", same_cls, 0.0 if same_cls else 1.0))
+    return results
+
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(description="Paridade das features NumPy/incrementais com a versão pandas.")
+    ap.add_argument("--days", type=float, default=30)
+    ap.add_argument("--interval", default="1m")
+    ap.add_argument("--seed", type=int, default=42)
+    args = ap.parse_args(argv)
+
+    df = synthetic_candles(candles_for_days(args.days, args.interval), interval=args.interval, seed=args.seed)
+    failed = 0
+    for mode, col, ok, diff in check(df):
+        print(f"{mode:<10}{col:<12}{'ok' if ok else 'FALHOU':<8}{diff:.3e}")
+        failed += 0 if ok else 1
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,696 @@
+"""Suíte de benchmarks offline (dados sintéticos determinísticos).
+
+Mede os estágios do pipeline em vários tamanhos de série e gera um relatório JSON
+(throughput, p50/p99 e pico de RSS por estágio/tamanho). Estágios que usam banco rodam
+contra um database descartável criado no Postgres local (credenciais PG_* do .env) e
+removido ao final.
+
+Uso (a partir de api/):
+    python -m bench.run --sizes 1d,30d,365d --interval 1m --repeat 5 --out bench_report.json
+    python -m bench.run --sizes 3y --stages features,sequences,scaler --no-db
+    python -m bench.run --save-baseline bench/baseline.json
+    python -m bench.run --baseline bench/baseline.json --fail-on-regression
+    python -m bench.run --sizes 1d --stages predict_realtime --repeat 1000 --no-db
+    python -m bench.run --sizes 90d --interval 5m --stages encode_series_pydantic,encode_series_fast --no-db
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import os
+import platform
+import sys
+import tempfile
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Optional
+
+import numpy as np
+
+
+DEFAULT_SIZES = "1d,30d,90d"
+DEFAULT_STAGES = "features,features_np,features_stream,sequences,scaler,predict,predict_scaled,predict_serving,predict_numpy,predict_many_direct,predict_many_batched,predict_realtime,forecast_rollout,bundle_load,bundle_load_compact,encode_series_pydantic,encode_series_fast,upsert,backfill,series_cache_build,series_cache_load"
+DB_STAGES = {"upsert", "backfill", "series_cache_build", "series_cache_load"}
+TF_STAGES = {"predict", "predict_scaled", "predict_serving", "predict_numpy", "predict_many_direct", "predict_many_batched", "predict_realtime", "forecast_rollout", "bundle_load", "bundle_load_compact", "series_cache_build"}
+
+
+def parse_size(label: str) -> float:
+    """'1d' -> 1.0, '2w' -> 14.0, '3y' -> 1095.0 (dias)."""
+    unit = label[-1].lower()
+    mult = {"d": 1.0, "w": 7.0, "y": 365.0}.get(unit)
+    if mult is None:
+        raise ValueError(f"Tamanho inválido: {label} (use sufixo d, w ou y)")
+    return float(label[:-1]) * mult
+
+
+@dataclass
+class BenchContext:
+    interval: str
+    seq_len: int
+    seed: int
+    workdir: Path
+    use_db: bool
+    _model: object = None
+    _bundle_ready: bool = False
+    scalers: tuple = ()
+    _db_loaded_size: Optional[str] = None
+    cache: dict = field(default_factory=dict)
+
+    def model(self):
+        if self._model is None:
+            from ml.features import FEATURE_COLS, TARGET_REG_COLS
+            from ml.lstm_model import LstmModelConfig, build_lstm_multitask_model
+
+            cfg = LstmModelConfig(
+                seq_len=self.seq_len,
+                n_features=len(FEATURE_COLS),
+                n_reg_targets=len(TARGET_REG_COLS),
+            )
+            self._model = build_lstm_multitask_model(cfg)
+        return self._model
+
+    def ensure_bundle(self, X, Yreg) -> None:
+        """Grava um bundle (modelo não treinado + scalers) nos caminhos temporários do bench."""
+        if self._bundle_ready:
+            return
+        import joblib
+        from sklearn.preprocessing import MinMaxScaler
+
+        from ml.features import FEATURE_COLS, TARGET_REG_COLS
+        from ml.bundle_format import save_compact_bundle
+        from ml.lstm_model import build_serving_model
+        from ml.model_paths import LSTM_BUNDLE_PATH, LSTM_COMPACT_BUNDLE_DIR, LSTM_MODEL_PATH, LSTM_SERVING_MODEL_PATH
+        from services.lstm_bundle_service import clear_bundle_cache
+
+        scaler_x = MinMaxScaler().fit(X.to_numpy(dtype="float32"))
+        scaler_y = MinMaxScaler().fit(Yreg.to_numpy(dtype="float32"))
+        self.scalers = (scaler_x, scaler_y)
+        self.model().save(LSTM_MODEL_PATH)
+        build_serving_model(self.model(), scaler_x, scaler_y).save(LSTM_SERVING_MODEL_PATH)
+        save_compact_bundle(LSTM_COMPACT_BUNDLE_DIR, self.model(), scaler_x, scaler_y,
+                            FEATURE_COLS, TARGET_REG_COLS, self.seq_len)
+        joblib.dump(
+            {
+                "model_path": LSTM_MODEL_PATH,
+                "serving_model_path": LSTM_SERVING_MODEL_PATH,
+                "scaler_x": scaler_x,
+                "scaler_y": scaler_y,
+                "feature_cols": FEATURE_COLS,
+                "target_reg_cols": TARGET_REG_COLS,
+                "seq_len": self.seq_len,
+            },
+            LSTM_BUNDLE_PATH,
+        )
+        clear_bundle_cache()
+        self._bundle_ready = True
+
+    def load_candles(self, size: str, df) -> None:
+        """Garante que btc_candles do database descartável contém exatamente a série 'size'."""
+        if self._db_loaded_size == size:
+            return
+        from services.ingestion_service import upsert_candles
+
+        _truncate("btc_candles", "series_cache")
+        upsert_candles(df)
+        self._db_loaded_size = size
+
+
+# Cada estágio recebe (ctx, size, df) e devolve (run, before_each). 'run' é a parte cronometrada.
+StageFn = Callable[[BenchContext, str, object], tuple]
+
+
+def _features_xy(ctx: BenchContext, size: str, df):
+    key = ("features", size)
+    if key not in ctx.cache:
+        from ml.features import build_features_targets
+
+        ctx.cache.clear()
+        ctx.cache[key] = build_features_targets(df)
+    return ctx.cache[key]
+
+
+def stage_features(ctx, size, df):
+    from ml.features import build_features_targets
+
+    return (lambda: build_features_targets(df)), None
+
+
+def stage_features_np(ctx, size, df):
+    from ml.streaming_features import build_features_targets_np
+
+    cols = [df[k].to_numpy(dtype="float64") for k in ("open", "high", "low", "close", "volume")]
+    return (lambda: build_features_targets_np(*cols)), None
+
+
+def stage_features_stream(ctx, size, df):
+    """Custo por candle do motor incremental (throughput = candles/s)."""
+    from ml.streaming_features import StreamingFeatureEngine
+
+    rows = list(zip(*(df[k].to_numpy(dtype="float64").tolist() for k in ("open", "high", "low", "close", "volume"))))
+
+    def run():
+        engine = StreamingFeatureEngine()
+        for row in rows:
+            engine.update(*row)
+
+    return run, None
+
+
+def stage_sequences(ctx, size, df):
+    from ml.lstm_dataset import build_x_sequences
+
+    _, X, _, _ = _features_xy(ctx, size, df)
+    return (lambda: build_x_sequences(X, seq_len=ctx.seq_len)), None
+
+
+def stage_scaler(ctx, size, df):
+    from sklearn.preprocessing import MinMaxScaler
+
+    from ml.lstm_dataset import build_x_sequences
+
+    _, X, Yreg, _ = _features_xy(ctx, size, df)
+    X_seq, _ = build_x_sequences(X, seq_len=ctx.seq_len)
+    Y = Yreg.to_numpy(dtype="float32")
+    scaler_x = MinMaxScaler().fit(X.to_numpy(dtype="float32"))
+    scaler_y = MinMaxScaler().fit(Y)
+
+    def run():
+        X2d = X_seq.reshape((X_seq.shape[0] * X_seq.shape[1], X_seq.shape[2]))
+        scaler_x.transform(X2d).reshape(X_seq.shape).astype("float32")
+        scaler_y.inverse_transform(Y)
+
+    return run, None
+
+
+def stage_predict(ctx, size, df):
+    from ml.lstm_dataset import build_x_sequences
+
+    _, X, _, _ = _features_xy(ctx, size, df)
+    X_seq, _ = build_x_sequences(X, seq_len=ctx.seq_len)
+    model = ctx.model()
+    return (lambda: model.predict(X_seq, verbose=0, batch_size=512)), None
+
+
+def _bundle_stage(ctx, size, df, mode: str):
+    from ml.features import FEATURE_COLS, TARGET_REG_COLS
+    from ml.lstm_dataset import build_x_sequences
+    from ml.lstm_model import build_serving_model
+    from services.lstm_bundle_service import LstmBundle, load_compact_bundle
+
+    _, X, Yreg, _ = _features_xy(ctx, size, df)
+    ctx.ensure_bundle(X, Yreg)
+    scaler_x, scaler_y = ctx.scalers
+    common = dict(scaler_x=scaler_x, scaler_y=scaler_y, feature_cols=FEATURE_COLS,
+                  target_reg_cols=TARGET_REG_COLS, seq_len=ctx.seq_len)
+    if mode == "scaled":
+        # caminho antigo: MinMaxScaler do joblib antes/depois do predict
+        bundle = LstmBundle(model=ctx.model(), **common)
+    elif mode == "serving":
+        bundle = LstmBundle(model=None, serving_model=build_serving_model(ctx.model(), scaler_x, scaler_y), **common)
+    else:
+        bundle = load_compact_bundle()
+    X_seq, _ = build_x_sequences(X, seq_len=ctx.seq_len)
+    return (lambda: bundle.predict(X_seq)), None
+
+
+def stage_predict_scaled(ctx, size, df):
+    return _bundle_stage(ctx, size, df, "scaled")
+
+
+def stage_predict_serving(ctx, size, df):
+    """Features brutas -> preço num forward só (scalers dentro do grafo)."""
+    return _bundle_stage(ctx, size, df, "serving")
+
+
+def stage_predict_numpy(ctx, size, df):
+    """Forward NumPy sobre os pesos mapeados do bundle compacto."""
+    return _bundle_stage(ctx, size, df, "numpy")
+
+
+def _concurrent_single_windows(ctx, size, df, batched: bool, n_calls: int = 64, n_threads: int = 16):
+    """n_calls pedidos de 1 janela vindos de n_threads threads (padrão de /predict e futures)."""
+    from concurrent.futures import ThreadPoolExecutor
+
+    from ml.lstm_dataset import build_x_sequences
+    from services.inference_scheduler import InferenceScheduler
+    from services.lstm_bundle_service import load_bundle
+
+    _, X, Yreg, _ = _features_xy(ctx, size, df)
+    ctx.ensure_bundle(X, Yreg)
+    bundle = load_bundle()
+    X_seq, _ = build_x_sequences(X.tail(ctx.seq_len + n_calls), seq_len=ctx.seq_len)
+    wins = [X_seq[i:i + 1] for i in range(n_calls)]
+    if batched:
+        sched = InferenceScheduler(predict_fn=lambda Xb, bs: bundle.predict(Xb, batch_size=bs))
+        call = sched.predict
+    else:
+        call = bundle.predict
+    pool = ThreadPoolExecutor(max_workers=n_threads)
+
+    def run():
+        list(pool.map(call, wins))
+
+    return run, None
+
+
+def stage_predict_many_direct(ctx, size, df):
+    return _concurrent_single_windows(ctx, size, df, batched=False)
+
+
+def stage_predict_many_batched(ctx, size, df):
+    """Mesmos pedidos pelo InferenceScheduler (lotes dinâmicos)."""
+    return _concurrent_single_windows(ctx, size, df, batched=True)
+
+
+def stage_predict_realtime(ctx, size, df):
+    """Uma chamada de POST /predict (sem HTTP): buffer em memória + forward de uma janela.
+
+    Para p99 por chamada, rode com --repeat alto (ex.: --stages predict_realtime --repeat 1000).
+    """
+    from services.candle_buffer import CandleRing
+    from services.lstm_bundle_service import load_bundle
+    from services.realtime_service import predict_candle
+
+    _, X, Yreg, _ = _features_xy(ctx, size, df)
+    ctx.ensure_bundle(X, Yreg)
+    bundle = load_bundle()
+    ring = CandleRing(max(ctx.seq_len * 4, 64))
+    ring.replace_df(df.tail(ring.capacity))
+    last = df.iloc[-1]
+    candle = (float(last["close"]), float(last["high"]), float(last["low"]), float(last["close"]) * 1.001, float(last["volume"]))
+    return (lambda: predict_candle(*candle, ring=ring, bundle=bundle)), None
+
+
+def stage_forecast_rollout(ctx, size, df, horizon: int = 12):
+    """Backtest do rollout de 12 passos a partir de todas as origens da série (um forward por passo)."""
+    from ml.rollout import origin_windows, rollout
+    from ml.streaming_features import VOL_WINDOW
+    from services.lstm_bundle_service import load_compact_bundle
+
+    df2, X, Yreg, _ = _features_xy(ctx, size, df)
+    ctx.ensure_bundle(X, Yreg)
+    bundle = load_compact_bundle()
+    origins = np.arange(max(ctx.seq_len, VOL_WINDOW) - 1, len(df2) - horizon)
+    ohlcv = df2[["open", "high", "low", "close", "volume"]].to_numpy(dtype="float64")
+    windows, hist = origin_windows(X[bundle.feature_cols].to_numpy(), ohlcv, origins, ctx.seq_len)
+
+    def run():
+        rollout(bundle.predict, windows, hist, bundle.feature_cols, bundle.target_reg_cols, horizon)
+
+    return run, None
+
+
+def stage_bundle_load(ctx, size, df):
+    """Load do par joblib + .keras (independe do tamanho da série)."""
+    from services.lstm_bundle_service import load_keras_bundle
+
+    _, X, Yreg, _ = _features_xy(ctx, size, df)
+    ctx.ensure_bundle(X, Yreg)
+    return load_keras_bundle, None
+
+
+def stage_bundle_load_compact(ctx, size, df):
+    """Load do bundle compacto (manifest + memmap, com checagem dos checksums)."""
+    from services.lstm_bundle_service import load_compact_bundle
+
+    _, X, Yreg, _ = _features_xy(ctx, size, df)
+    ctx.ensure_bundle(X, Yreg)
+    return load_compact_bundle, None
+
+
+def stage_upsert(ctx, size, df):
+    from services.ingestion_service import upsert_candles
+
+    def before_each():
+        _truncate("btc_candles")
+        ctx._db_loaded_size = None
+
+    def run():
+        upsert_candles(df)
+        ctx._db_loaded_size = size
+
+    return run, before_each
+
+
+def stage_backfill(ctx, size, df):
+    """Backfill completo contra a fonte sintética (sem rede), incluindo paginação e upsert."""
+    from services.ingestion_service import backfill_job
+    from services.kline_source import SyntheticKlineSource, set_kline_source
+
+    days = _span_days(df)
+    set_kline_source(SyntheticKlineSource(days=days + 1, interval=ctx.interval, seed=ctx.seed))
+
+    def before_each():
+        _truncate("btc_candles")
+        ctx._db_loaded_size = None
+
+    def run():
+        out = backfill_job(days=days, symbol="BTCUSDT", interval=ctx.interval, sleep_ms=0)
+        if out.get("status") != "ok":
+            raise RuntimeError(out.get("message"))
+
+    return run, before_each
+
+
+def stage_series_cache_build(ctx, size, df):
+    from services.series_cache_service import build_series_cache
+
+    _, X, Yreg, _ = _features_xy(ctx, size, df)
+    ctx.ensure_bundle(X, Yreg)
+    ctx.load_candles(size, df)
+    days = _span_days(df)
+
+    def before_each():
+        _truncate("series_cache")
+
+    return (lambda: build_series_cache(days)), before_each
+
+
+def stage_series_cache_load(ctx, size, df):
+    from services.series_cache_service import build_series_cache, load_series_cached
+
+    _, X, Yreg, _ = _features_xy(ctx, size, df)
+    try:
+        ctx.ensure_bundle(X, Yreg)
+    except ImportError:
+        # sem tensorflow a série é materializada só com os dados reais
+        pass
+    ctx.load_candles(size, df)
+    days = _span_days(df)
+    if _count("series_cache") == 0:
+        build_series_cache(days)
+    return (lambda: load_series_cached(None, None, fallback_days=days)), None
+
+
+def _series_payload(ctx, size, df) -> dict:
+    """Payload de /series/cached montado pelo próprio serviço a partir de linhas sintéticas."""
+    key = ("series_payload", size)
+    if key not in ctx.cache:
+        from services.series_cache_service import _cached_point
+
+        rng = np.random.default_rng(ctx.seed)
+        o, h, l, c, v = (df[k].to_numpy(dtype="float64") for k in ("open", "high", "low", "close", "volume"))
+        pred = c * (1.0 + rng.normal(0.0, 1e-3, len(c)))
+        pred[: ctx.seq_len] = np.nan  # sem janela completa não há previsão
+        prob_up = rng.uniform(0.0, 1.0, len(c))
+        nxt = np.append(c[1:], np.nan)
+        rows = zip(
+            df["time"].dt.to_pydatetime(), o, h, l, c, v,
+            pred, pred * 1.001, pred * 0.999, pred, h - l,
+            (prob_up >= 0.5).astype(int), prob_up, 1.0 - prob_up,
+            np.abs(pred - nxt), pred - nxt, np.abs(h - l),
+        )
+        points = []
+        for r in rows:
+            # como vem do banco: NULL -> None
+            r = tuple((float(x) if math.isfinite(x) else None) if isinstance(x, float) else x for x in r)
+            points.append(_cached_point(r))
+        ctx.cache[key] = {"points": points}
+    return ctx.cache[key]
+
+
+def stage_encode_series_pydantic(ctx, size, df):
+    """Resposta de /series/cached pelo response_model: validação pydantic + jsonable_encoder + json."""
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.responses import JSONResponse
+
+    from models.schemas import SeriesResponse
+
+    payload = _series_payload(ctx, size, df)
+    return (lambda: JSONResponse(jsonable_encoder(SeriesResponse(**payload)))), None
+
+
+def stage_encode_series_fast(ctx, size, df):
+    """Mesma resposta por FastJSONResponse (orjson direto, sem validação ponto a ponto)."""
+    from core.fast_json import FastJSONResponse
+
+    payload = _series_payload(ctx, size, df)
+    return (lambda: FastJSONResponse(payload)), None
+
+
+STAGES: dict[str, StageFn] = {
+    "features": stage_features,
+    "features_np": stage_features_np,
+    "features_stream": stage_features_stream,
+    "sequences": stage_sequences,
+    "scaler": stage_scaler,
+    "predict": stage_predict,
+    "predict_scaled": stage_predict_scaled,
+    "predict_serving": stage_predict_serving,
+    "predict_numpy": stage_predict_numpy,
+    "predict_many_direct": stage_predict_many_direct,
+    "predict_many_batched": stage_predict_many_batched,
+    "predict_realtime": stage_predict_realtime,
+    "forecast_rollout": stage_forecast_rollout,
+    "bundle_load": stage_bundle_load,
+    "bundle_load_compact": stage_bundle_load_compact,
+    "encode_series_pydantic": stage_encode_series_pydantic,
+    "encode_series_fast": stage_encode_series_fast,
+    "upsert": stage_upsert,
+    "backfill": stage_backfill,
+    "series_cache_build": stage_series_cache_build,
+    "series_cache_load": stage_series_cache_load,
+}
+
+
+def _span_days(df) -> int:
+    span = (df["time"].iloc[-1] - df["time"].iloc[0]).total_seconds() / 86400.0
+    return int(math.ceil(span)) + 1
+
+
+def _truncate(*tables: str) -> None:
+    from core.db import pg_conn
+
+    with pg_conn() as conn:
+        with conn.cursor() as cur:
+            for t in tables:
+                cur.execute(f"TRUNCATE {t}")
+
+
+def _count(table: str) -> int:
+    from core.db import pg_conn
+
+    with pg_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute(f"SELECT COUNT(*) FROM {table}")
+            return int(cur.fetchone()[0])
+
+
+@contextmanager
+def throwaway_database(keep: bool = False):
+    """Cria um database temporário no Postgres local, aplica as migrações e aponta settings para ele."""
+    import psycopg2
+
+    from core.config import settings
+
+    name = f"btcbench_{os.getpid()}_{int(datetime.utcnow().timestamp())}"
+    admin = psycopg2.connect(
+        dbname=os.getenv("BENCH_PG_ADMIN_DB", "postgres"),
+        user=settings.PG_USER,
+        password=settings.PG_PWD,
+        host=settings.PG_HOST,
+        port=settings.PG_PORT,
+    )
+    admin.autocommit = True
+    old_db = settings.PG_DB
+    try:
+        with admin.cursor() as cur:
+            cur.execute(f'CREATE DATABASE "{name}"')
+        settings.PG_DB = name
+        from core import migrations, partitioning
+
+        migrations.migrate()
+        partitioning.premake()
+        yield name
+    finally:
+        settings.PG_DB = old_db
+        if not keep:
+            with admin.cursor() as cur:
+                cur.execute(f'DROP DATABASE IF EXISTS "{name}"')
+        admin.close()
+
+
+def run_stage(ctx: BenchContext, stage: str, size: str, df, repeat: int, warmup: int) -> dict:
+    from core.profiling import measure
+
+    run, before_each = STAGES[stage](ctx, size, df)
+    for _ in range(warmup):
+        if before_each:
+            before_each()
+        run()
+    wall, cpu, peak, peak_delta = [], [], 0, 0
+    for _ in range(repeat):
+        if before_each:
+            before_each()
+        with measure() as m:
+            run()
+        wall.append(m.wall_s)
+        cpu.append(m.cpu_s)
+        peak = max(peak, m.peak_rss)
+        peak_delta = max(peak_delta, m.peak_rss_delta)
+    p50 = float(np.percentile(wall, 50))
+    return {
+        "stage": stage,
+        "size": size,
+        "rows": int(len(df)),
+        "repeat": repeat,
+        "p50_s": p50,
+        "p99_s": float(np.percentile(wall, 99)),
+        "mean_s": float(np.mean(wall)),
+        "min_s": float(np.min(wall)),
+        "cpu_p50_s": float(np.percentile(cpu, 50)),
+        "throughput_rows_s": (len(df) / p50) if p50 > 0 else None,
+        "peak_rss_mb": peak / 2**20,
+        "peak_rss_delta_mb": peak_delta / 2**20,
+    }
+
+
+def compare_to_baseline(results: list[dict], baseline: dict, tolerance: float) -> list[dict]:
+    """Compara p50 e pico de RSS com o baseline; marca regressões acima da tolerância."""
+    base = {(r["stage"], r["size"]): r for r in baseline.get("results", [])}
+    out = []
+    for r in results:
+        b = base.get((r["stage"], r["size"]))
+        if b is None:
+            continue
+        time_ratio = r["p50_s"] / b["p50_s"] if b.get("p50_s") else None
+        rss_ratio = r["peak_rss_delta_mb"] / b["peak_rss_delta_mb"] if b.get("peak_rss_delta_mb") else None
+        out.append({
+            "stage": r["stage"],
+            "size": r["size"],
+            "p50_ratio": time_ratio,
+            "peak_rss_delta_ratio": rss_ratio,
+            "time_regression": time_ratio is not None and time_ratio > 1.0 + tolerance,
+            "memory_regression": rss_ratio is not None and rss_ratio > 1.0 + tolerance,
+        })
+    return out
+
+
+def _meta(args) -> dict:
+    import pandas as pd
+
+    return {
+        "created_at": datetime.utcnow().isoformat(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "interval": args.interval,
+        "seed": args.seed,
+        "seq_len": args.seq_len,
+        "repeat": args.repeat,
+    }
+
+
+def _print_table(results: list[dict], comparison: list[dict]) -> None:
+    cmp = {(c["stage"], c["size"]): c for c in comparison}
+    print(f"{'stage':<20}{'size':>7}{'rows':>10}{'p50 s':>11}{'p99 s':>11}{'rows/s':>13}{'rss MB':>9}{'vs base':>9}")
+    for r in results:
+        c = cmp.get((r["stage"], r["size"]))
+        ratio = f"{c['p50_ratio']:.2f}x" if c and c["p50_ratio"] else "-"
+        if c and (c["time_regression"] or c["memory_regression"]):
+            ratio += "!"
+        thr = f"{r['throughput_rows_s']:.0f}" if r["throughput_rows_s"] else "-"
+        print(
+            f"{r['stage']:<20}{r['size']:>7}{r['rows']:>10}{r['p50_s']:>11.4f}{r['p99_s']:>11.4f}"
+            f"{thr:>13}{r['peak_rss_delta_mb']:>9.1f}{ratio:>9}"
+        )
+
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(description="Benchmarks offline do pipeline BTC (dados sintéticos).")
+    ap.add_argument("--sizes", default=DEFAULT_SIZES, help="tamanhos da série, ex.: 1d,30d,365d,3y")
+    ap.add_argument("--interval", default="1m", help="intervalo dos candles sintéticos (1m, 5m, 1h...)")
+    ap.add_argument("--stages", default=DEFAULT_STAGES, help="estágios separados por vírgula")
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--warmup", type=int, default=1)
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--seq-len", type=int, default=48)
+    ap.add_argument("--no-db", action="store_true", help="pula os estágios que usam Postgres")
+    ap.add_argument("--keep-db", action="store_true", help="não remove o database descartável ao final")
+    ap.add_argument("--out", default=None, help="arquivo JSON do relatório (padrão: stdout)")
+    ap.add_argument("--baseline", default=None, help="relatório JSON de referência para comparação")
+    ap.add_argument("--tolerance", type=float, default=0.15, help="regressão se p50/RSS > baseline*(1+tol)")
+    ap.add_argument("--save-baseline", default=None, help="grava o relatório também como baseline")
+    ap.add_argument("--fail-on-regression", action="store_true")
+    args = ap.parse_args(argv)
+
+    workdir = Path(tempfile.mkdtemp(prefix="btcbench_"))
+    # Precisa acontecer antes de importar core.config (Settings lê o ambiente no import).
+    os.environ["LSTM_MODEL_PATH"] = str(workdir / "lstm_model.keras")
+    os.environ["LSTM_BUNDLE_PATH"] = str(workdir / "lstm_bundle.joblib")
+    os.environ["LSTM_SERVING_MODEL_PATH"] = str(workdir / "lstm_serving.keras")
+    os.environ["LSTM_COMPACT_BUNDLE_DIR"] = str(workdir / "lstm_bundle")
+
+    from ml.synthetic import candles_for_days, synthetic_candles
+
+    stages = [s.strip() for s in args.stages.split(",") if s.strip()]
+    unknown = [s for s in stages if s not in STAGES]
+    if unknown:
+        ap.error(f"estágios desconhecidos: {', '.join(unknown)}")
+    if args.no_db:
+        stages = [s for s in stages if s not in DB_STAGES]
+    try:
+        import tensorflow  # noqa: F401
+    except ImportError:
+        skipped = [s for s in stages if s in TF_STAGES]
+        if skipped:
+            print(f"tensorflow indisponível; pulando {', '.join(skipped)}", file=sys.stderr)
+        stages = [s for s in stages if s not in TF_STAGES]
+
+    ctx = BenchContext(
+        interval=args.interval,
+        seq_len=args.seq_len,
+        seed=args.seed,
+        workdir=workdir,
+        use_db=any(s in DB_STAGES for s in stages),
+    )
+
+    @contextmanager
+    def _db():
+        if ctx.use_db:
+            with throwaway_database(keep=args.keep_db) as name:
+                print(f"database descartável: {name}", file=sys.stderr)
+                yield
+        else:
+            yield
+
+    results = []
+    with _db():
+        for size in [s.strip() for s in args.sizes.split(",") if s.strip()]:
+            n = candles_for_days(parse_size(size), args.interval)
+            df = synthetic_candles(n, interval=args.interval, seed=args.seed)
+            for stage in stages:
+                print(f"[{size} n={n}] {stage}...", file=sys.stderr)
+                results.append(run_stage(ctx, stage, size, df, args.repeat, args.warmup))
+
+    report = {"meta": _meta(args), "results": results}
+    comparison = []
+    if args.baseline and Path(args.baseline).is_file():
+        baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+        comparison = compare_to_baseline(results, baseline, args.tolerance)
+        report["baseline"] = {"path": args.baseline, "tolerance": args.tolerance, "comparison": comparison}
+
+    text = json.dumps(report, indent=2)
+    if args.out:
+        Path(args.out).write_text(text, encoding="utf-8")
+        _print_table(results, comparison)
+    else:
+        print(text)
+    if args.save_baseline:
+        Path(args.save_baseline).write_text(text, encoding="utf-8")
+
+    regressions = [c for c in comparison if c["time_regression"] or c["memory_regression"]]
+    if regressions:
+        print(f"{len(regressions)} regressão(ões) em relação ao baseline", file=sys.stderr)
+        if args.fail_on_regression:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
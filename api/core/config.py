@@ -58,6 +58,39 @@ class Settings:
         self.BINANCE_LIMIT = _env_int("BINANCE_LIMIT", 1000) or 1000
         self.BINANCE_API_KEY = os.getenv("BINANCE_API_KEY")
 
+        # Pares acompanhados pela ingestão ("SYMBOL:interval", separados por vírgula). O par
+        # BINANCE_SYMBOL/BINANCE_INTERVAL (o do modelo) entra sempre (core/market.py)
+        self.WATCHLIST = [
+            str(x).strip() for x in cfg.get("watchlist", os.getenv("WATCHLIST", "").split(","))
+            if str(x).strip()
+        ]
+        self.INGEST_CONCURRENCY = _env_int("INGEST_CONCURRENCY", 4) or 4
+
+        # Resoluções agregadas (rollups) mantidas a partir de BINANCE_INTERVAL em candle_rollups
+        # (services/rollup_service.py); só múltiplos do intervalo base são usados
+        self.CANDLE_ROLLUP_INTERVALS = [
+            str(x).strip() for x in cfg.get("candle_rollup_intervals", os.getenv("CANDLE_ROLLUP_INTERVALS", "1h,4h,1d").split(","))
+            if str(x).strip()
+        ]
+
+        # Cliente HTTP da Binance (pool keep-alive, timeouts e backoff)
+        self.BINANCE_CONNECT_TIMEOUT = _env_float("BINANCE_CONNECT_TIMEOUT", 5.0) or 5.0
+        self.BINANCE_READ_TIMEOUT = _env_float("BINANCE_READ_TIMEOUT", 30.0) or 30.0
+        self.BINANCE_POOL_SIZE = _env_int("BINANCE_POOL_SIZE", 10) or 10
+        self.BINANCE_MAX_RETRIES = _env_int("BINANCE_MAX_RETRIES", 5)
+        self.BINANCE_BACKOFF_BASE_MS = _env_int("BINANCE_BACKOFF_BASE_MS", 500) or 500
+        self.BINANCE_BACKOFF_MAX_MS = _env_int("BINANCE_BACKOFF_MAX_MS", 30000) or 30000
+        # Limite de peso por minuto (header X-MBX-USED-WEIGHT-1M); pausa ao chegar em 90%
+        self.BINANCE_WEIGHT_LIMIT = _env_int("BINANCE_WEIGHT_LIMIT", 6000) or 6000
+
+        # Fonte de klines: http | record | replay | synthetic (ver services/kline_source.py)
+        self.KLINE_SOURCE = os.getenv("KLINE_SOURCE", "http")
+        self.KLINE_RECORD_DIR = os.getenv("KLINE_RECORD_DIR", "/app/recordings/klines")
+        self.KLINE_SPEED = _env_float("KLINE_SPEED", 1.0) or 1.0
+        self.KLINE_LATENCY_MS = _env_float("KLINE_LATENCY_MS", 0.0) or 0.0
+        self.KLINE_FAULT_429_RATE = _env_float("KLINE_FAULT_429_RATE", 0.0) or 0.0
+        self.KLINE_SEED = _env_int("KLINE_SEED", 42) or 42
+
         # Janela base de dados
         self.LOOKBACK_DAYS = _env_int("LOOKBACK_DAYS", 90) or 90
         self.ALPHA_DECAY = _env_float("ALPHA_DECAY", 0.999) or 0.999
@@ -65,6 +98,10 @@ class Settings:
         # Novos caminhos para LSTM
         self.LSTM_MODEL_PATH = os.getenv("LSTM_MODEL_PATH", "/app/models/lstm_model.keras")
         self.LSTM_BUNDLE_PATH = os.getenv("LSTM_BUNDLE_PATH", "/app/models/lstm_bundle.joblib")
+        # Modelo de serving: normalização de entrada e desnormalização da saída dentro do grafo
+        self.LSTM_SERVING_MODEL_PATH = os.getenv("LSTM_SERVING_MODEL_PATH", "/app/models/lstm_serving.keras")
+        # Bundle compacto (manifest.json + weights.bin mapeável); preferido por load_bundle quando existe
+        self.LSTM_COMPACT_BUNDLE_DIR = os.getenv("LSTM_COMPACT_BUNDLE_DIR", "/app/models/lstm_bundle")
 
         # Hiperparâmetros LSTM (podem vir do arquivo)
         self.LSTM_SEQ_LEN = int(cfg.get("lstm_seq_len", _env_int("LSTM_SEQ_LEN", 48) or 48))
@@ -72,6 +109,9 @@ class Settings:
         self.LSTM_BATCH_SIZE = int(cfg.get("lstm_batch_size", _env_int("LSTM_BATCH_SIZE", 64) or 64))
         self.LSTM_LR = float(cfg.get("lstm_lr", _env_float("LSTM_LR", 1e-3) or 1e-3))
         self.LSTM_PATIENCE = int(cfg.get("lstm_patience", _env_int("LSTM_PATIENCE", 8) or 8))
+        self.LSTM_UNITS = int(cfg.get("lstm_units", _env_int("LSTM_UNITS", 64) or 64))
+        self.LSTM_DENSE_UNITS = int(cfg.get("lstm_dense_units", _env_int("LSTM_DENSE_UNITS", 64) or 64))
+        self.LSTM_DROPOUT = float(cfg.get("lstm_dropout", _env_float("LSTM_DROPOUT", 0.2)))
 
         # Política de retreino (24h ou 12h se MAPE(futures) > limiar)
         self.TRAIN_MAX_HOURS = float(cfg.get("train_max_hours", _env_float("TRAIN_MAX_HOURS", 24.0) or 24.0))
@@ -80,6 +120,69 @@ class Settings:
             cfg.get("futures_mape_threshold", _env_float("FUTURES_MAPE_THRESHOLD", 0.8) or 0.8)
         )
         self.FUTURES_ROLLING_N = int(cfg.get("futures_rolling_n", _env_int("FUTURES_ROLLING_N", 288) or 288))
+        # Janelas (em linhas de futures) com agregados de erro mantidos incrementalmente
+        # (services/error_analytics_service.py); FUTURES_ROLLING_N é sempre incluída
+        self.FUTURES_ERROR_WINDOWS = [
+            int(x) for x in cfg.get("futures_error_windows", os.getenv("FUTURES_ERROR_WINDOWS", "288,2016,8640").split(","))
+            if str(x).strip()
+        ]
+
+        # Buffer circular de candles recentes (0 desativa). CANDLE_RING_SHM = nome do segmento
+        # de memória compartilhada entre workers (vazio: cópia por processo)
+        self.CANDLE_RING_SIZE = _env_int("CANDLE_RING_SIZE", 2048)
+        self.CANDLE_RING_SHM = os.getenv("CANDLE_RING_SHM", "")
+
+        # Agendador de inferência: junta pedidos de vários chamadores em lotes de até
+        # INFERENCE_MAX_BATCH janelas, esperando no máximo INFERENCE_MAX_WAIT_MS (INFERENCE_SCHEDULER=0 desativa)
+        self.INFERENCE_SCHEDULER = _env_int("INFERENCE_SCHEDULER", 1)
+        self.INFERENCE_MAX_BATCH = _env_int("INFERENCE_MAX_BATCH", 1024) or 1024
+        self.INFERENCE_MAX_WAIT_MS = _env_float("INFERENCE_MAX_WAIT_MS", 5.0)
+        self.INFERENCE_MIN_BUCKET = _env_int("INFERENCE_MIN_BUCKET", 8) or 8
+
+        # Backtest walk-forward (services/backtest_service.py): K folds de BACKTEST_VAL_SIZE sequências,
+        # treino "expanding" ou "rolling"; BACKTEST_WORKERS processos com BACKTEST_TF_THREADS threads cada
+        self.BACKTEST_FOLDS = int(cfg.get("backtest_folds", _env_int("BACKTEST_FOLDS", 5) or 5))
+        self.BACKTEST_VAL_SIZE = int(cfg.get("backtest_val_size", _env_int("BACKTEST_VAL_SIZE", 500) or 500))
+        self.BACKTEST_MODE = str(cfg.get("backtest_mode", os.getenv("BACKTEST_MODE", "expanding")))
+        self.BACKTEST_WORKERS = _env_int("BACKTEST_WORKERS", 2) or 2
+        self.BACKTEST_TF_THREADS = _env_int("BACKTEST_TF_THREADS", 1) or 1
+        self.BACKTEST_DATA_DIR = os.getenv("BACKTEST_DATA_DIR", "")
+
+        # Busca de hiperparâmetros (services/tuning_service.py): "random" (poda pela mediana) ou
+        # "halving" (successive halving assíncrono: degraus em TUNING_MIN_EPOCHS * TUNING_ETA^k épocas)
+        self.TUNING_TRIALS = _env_int("TUNING_TRIALS", 20) or 20
+        self.TUNING_STRATEGY = os.getenv("TUNING_STRATEGY", "halving")
+        self.TUNING_MIN_EPOCHS = _env_int("TUNING_MIN_EPOCHS", 3) or 3
+        self.TUNING_ETA = _env_int("TUNING_ETA", 3) or 3
+        self.TUNING_WORKERS = _env_int("TUNING_WORKERS", 2) or 2
+        self.TUNING_TF_THREADS = _env_int("TUNING_TF_THREADS", 1) or 1
+
+        # Exportação/importação Parquet/Arrow (services/export_service.py): linhas por lote lido do
+        # banco (cursor server-side) e escrito no arquivo
+        self.EXPORT_BATCH_ROWS = _env_int("EXPORT_BATCH_ROWS", 50_000) or 50_000
+
+        # Respostas NDJSON (stream=true em /series, /series/cached e /futures): linhas por lote
+        # lido do cursor server-side e por bloco escrito na resposta
+        self.STREAM_BATCH_ROWS = _env_int("STREAM_BATCH_ROWS", 2000) or 2000
+
+        # Push de eventos (GET /events, core/notify.py): comentário de keep-alive a cada N segundos
+        # sem eventos e tamanho da fila por cliente (cliente lento perde as mensagens mais antigas)
+        self.EVENTS_HEARTBEAT_SECONDS = _env_float("EVENTS_HEARTBEAT_SECONDS", 15.0) or 15.0
+        self.EVENTS_CLIENT_QUEUE = _env_int("EVENTS_CLIENT_QUEUE", 256) or 256
+
+        # Migrações do schema (core/migrations.py): 1 = aplica na subida da API; 0 = só pelo
+        # comando "python -m core.migrations" (ex.: passo de deploy antes de subir os workers)
+        self.MIGRATE_ON_STARTUP = (_env_int("MIGRATE_ON_STARTUP", 1) or 0) > 0
+
+        # Particionamento mensal de btc_candles/futures/series_cache (core/partitioning.py).
+        # Retenção em dias por tabela (0 = mantém tudo): apaga partições mensais inteiras
+        self.PARTITION_PREMAKE_MONTHS = _env_int("PARTITION_PREMAKE_MONTHS", 2) or 2
+        self.PARTITION_MAINTENANCE_MINUTES = _env_float("PARTITION_MAINTENANCE_MINUTES", 60.0) or 60.0
+        self.CANDLES_RETENTION_DAYS = int(cfg.get("candles_retention_days", _env_int("CANDLES_RETENTION_DAYS", 0) or 0))
+        self.FUTURES_RETENTION_DAYS = int(cfg.get("futures_retention_days", _env_int("FUTURES_RETENTION_DAYS", 0) or 0))
+        self.SERIES_CACHE_RETENTION_DAYS = int(
+            cfg.get("series_cache_retention_days", _env_int("SERIES_CACHE_RETENTION_DAYS", 180) or 0)
+        )
 
         # Backfill
         self.BACKFILL_DAYS = _env_int("BACKFILL_DAYS", 90) or 90
@@ -0,0 +1,35 @@
+"""Serialização JSON rápida para as respostas grandes (/series, /series/cached, /futures).
+
+- dumps(): orjson; float NaN/Inf vira null no próprio encoder e arrays/escalares NumPy são
+  aceitos direto (OPT_SERIALIZE_NUMPY).
+- FastJSONResponse: as rotas continuam declarando response_model (o schema segue no
+  OpenAPI), mas devolvem esta resposta já pronta; o FastAPI não revalida nem reconverte
+  ponto a ponto um payload que os serviços já montaram no formato do schema.
+- nullable(): coluna float -> lista Python com NaN/Inf -> None numa operação só, para os
+  serviços montarem pontos sem checar valor a valor.
+"""
+from __future__ import annotations
+
+from typing import Any
+
+import numpy as np
+import orjson
+from fastapi.responses import Response
+
+_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+
+def dumps(obj: Any) -> bytes:
+    return orjson.dumps(obj, option=_OPTIONS)
+
+
+def nullable(values) -> list:
+    a = np.asarray(values, dtype="float64")
+    return np.where(np.isfinite(a), a, None).tolist()
+
+
+class FastJSONResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -0,0 +1,46 @@
+"""Pares (symbol, interval) armazenados em btc_candles.
+
+- btc_candles é chaveada por (symbol, interval, time); a PK composta atende às leituras por
+  par e intervalo de tempo (WHERE symbol = ? AND interval = ? AND time ...).
+- primary_pair(): BINANCE_SYMBOL/BINANCE_INTERVAL, o par do modelo. Feature store, buffer de
+  candles, rollups, futures e séries leem só esse par.
+- watchlist(): pares de WATCHLIST ingeridos a cada /ingest; o par principal vem primeiro.
+"""
+from __future__ import annotations
+
+from typing import Optional
+
+from core.config import settings
+
+Pair = tuple[str, str]
+
+# filtro do par nas consultas a btc_candles (parâmetros: symbol, interval)
+PAIR_WHERE = "symbol = %s AND interval = %s"
+
+
+def primary_pair() -> Pair:
+    return (settings.BINANCE_SYMBOL or "BTCUSDT").upper(), settings.BINANCE_INTERVAL or "5m"
+
+
+def parse_pair(text: str) -> Pair:
+    """'ETHUSDT:1m' -> ('ETHUSDT', '1m'); sem ':' usa o intervalo principal."""
+    symbol, _, interval = text.strip().partition(":")
+    return symbol.strip().upper(), (interval.strip() or primary_pair()[1])
+
+
+def watchlist() -> list[Pair]:
+    out = [primary_pair()]
+    for item in settings.WATCHLIST:
+        pair = parse_pair(item)
+        if pair[0] and pair not in out:
+            out.append(pair)
+    return out
+
+
+def is_primary(symbol: Optional[str] = None, interval: Optional[str] = None) -> bool:
+    sym, iv = primary_pair()
+    return (symbol or sym).upper() == sym and (interval or iv) == iv
+
+
+def pair_key(pair: Pair) -> str:
+    return f"{pair[0]}:{pair[1]}"
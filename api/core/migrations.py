@@ -0,0 +1,313 @@
+"""Migrações versionadas do schema (schema.sql + tabelas dos serviços).
+
+- Cada migração tem uma versão inteira crescente e é aplicada uma única vez, na sua própria
+  transação; a versão aplicada fica registrada em schema_migrations.
+- migrate() roda na subida da API (MIGRATE_ON_STARTUP) ou como comando separado
+  (python -m core.migrations), sob advisory lock: vários workers subindo juntos não aplicam
+  a mesma migração duas vezes.
+- Os serviços não executam DDL nas requisições; uma mudança de schema entra aqui como uma
+  nova versão no fim de MIGRATIONS (as já aplicadas não devem ser editadas).
+- Todo o DDL usa IF NOT EXISTS: um banco criado pelas versões anteriores (tabelas criadas
+  sob demanda pelos serviços) é adotado sem erro na primeira execução.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Optional, Union
+
+from core import market, partitioning
+from core.db import pg_conn
+
+_LOCK_KEY = 0x6d696772  # "migr"
+SCHEMA_PATH = Path(__file__).resolve().parent.parent / "schema.sql"
+
+
+def _partitioned_tables(cur) -> None:
+    # btc_candles (já criada pelo schema.sql), futures e series_cache; migra tabelas comuns antigas
+    for table in partitioning.PARTITIONED_TABLES:
+        partitioning.prepare_table(cur, table)
+
+
+def _candle_pairs(cur) -> None:
+    # btc_candles passa a ser chaveada por (symbol, interval, time); linhas existentes são do par principal
+    cur.execute(
+        """SELECT 1 FROM information_schema.columns
+           WHERE table_schema = current_schema() AND table_name = 'btc_candles' AND column_name = 'symbol';"""
+    )
+    if cur.fetchone():
+        return
+    symbol, interval = market.primary_pair()
+    # ADD COLUMN com DEFAULT constante não regrava a tabela; o default sai em seguida
+    cur.execute(
+        """ALTER TABLE btc_candles
+             ADD COLUMN symbol TEXT NOT NULL DEFAULT %s,
+             ADD COLUMN interval TEXT NOT NULL DEFAULT %s;""",
+        (symbol, interval),
+    )
+    cur.execute("ALTER TABLE btc_candles ALTER COLUMN symbol DROP DEFAULT, ALTER COLUMN interval DROP DEFAULT;")
+    cur.execute("SELECT conname FROM pg_constraint WHERE conrelid = 'btc_candles'::regclass AND contype = 'p';")
+    row = cur.fetchone()
+    if row:
+        cur.execute(f'ALTER TABLE btc_candles DROP CONSTRAINT "{row[0]}";')
+    cur.execute("ALTER TABLE btc_candles ADD PRIMARY KEY (symbol, interval, time);")
+
+
+def _partition_brin(cur) -> None:
+    # bancos migrados de tabela comum pela versão 2 ficaram sem o BRIN na mãe (o nome
+    # continuava com a tabela _legacy, apagada junto com ela)
+    for table in partitioning.PARTITIONED_TABLES:
+        partitioning.ensure_brin(cur, table)
+
+
+# (versão, nome, SQL ou função(cur)); só acrescentar no fim
+MIGRATIONS: list[tuple[int, str, Union[str, Callable]]] = [
+    (1, "schema_sql", lambda cur: cur.execute(SCHEMA_PATH.read_text(encoding="utf-8"))),
+    (2, "partitioned_tables", _partitioned_tables),
+    (3, "futures_prev_close", "ALTER TABLE futures ADD COLUMN IF NOT EXISTS prev_close NUMERIC;"),
+    (
+        4,
+        "candle_features",
+        """
+        CREATE TABLE IF NOT EXISTS candle_features (
+          time             TIMESTAMP PRIMARY KEY,
+          feature_version  TEXT NOT NULL,
+          features         DOUBLE PRECISION[] NOT NULL,
+          targets          DOUBLE PRECISION[],
+          dir_next         SMALLINT,
+          computed_at      TIMESTAMP NOT NULL DEFAULT NOW()
+        );
+        """,
+    ),
+    (
+        5,
+        "train_profiles",
+        """
+        CREATE TABLE IF NOT EXISTS train_profiles (
+          id          BIGSERIAL PRIMARY KEY,
+          status      TEXT NOT NULL,
+          days        INTEGER,
+          samples     INTEGER,
+          phases      JSONB NOT NULL,
+          epochs      JSONB,
+          started_at  TIMESTAMP NOT NULL,
+          finished_at TIMESTAMP NOT NULL
+        );
+        """,
+    ),
+    (
+        6,
+        "futures_error_windows",
+        """
+        CREATE TABLE IF NOT EXISTS futures_error_windows (
+          window_n    INTEGER PRIMARY KEY,
+          n           INTEGER NOT NULL,
+          sum_ape     DOUBLE PRECISION NOT NULL,
+          sum_abs     DOUBLE PRECISION NOT NULL,
+          sum_signed  DOUBLE PRECISION NOT NULL,
+          dir_n       INTEGER NOT NULL,
+          dir_hits    INTEGER NOT NULL,
+          hist        INTEGER[] NOT NULL,
+          first_time  TIMESTAMP,
+          last_time   TIMESTAMP,
+          ops         INTEGER NOT NULL DEFAULT 0,
+          updated_at  TIMESTAMP NOT NULL DEFAULT NOW()
+        );
+        """,
+    ),
+    (
+        7,
+        "backtest",
+        """
+        CREATE TABLE IF NOT EXISTS backtest_runs (
+          id           BIGSERIAL PRIMARY KEY,
+          status       TEXT NOT NULL,
+          days         INTEGER NOT NULL,
+          mode         TEXT NOT NULL,
+          folds        INTEGER NOT NULL,
+          params       JSONB NOT NULL,
+          metrics      JSONB,
+          message      TEXT,
+          started_at   TIMESTAMP NOT NULL,
+          finished_at  TIMESTAMP
+        );
+        CREATE TABLE IF NOT EXISTS backtest_folds (
+          run_id       BIGINT NOT NULL REFERENCES backtest_runs(id) ON DELETE CASCADE,
+          fold         INTEGER NOT NULL,
+          train_start  TIMESTAMP NOT NULL,
+          val_start    TIMESTAMP NOT NULL,
+          val_end      TIMESTAMP NOT NULL,
+          n_train      INTEGER NOT NULL,
+          n_val        INTEGER NOT NULL,
+          epochs       INTEGER,
+          val_loss     DOUBLE PRECISION,
+          mae          DOUBLE PRECISION,
+          rmse         DOUBLE PRECISION,
+          mape         DOUBLE PRECISION,
+          smape        DOUBLE PRECISION,
+          dir_acc      DOUBLE PRECISION,
+          wall_s       DOUBLE PRECISION,
+          PRIMARY KEY (run_id, fold)
+        );
+        """,
+    ),
+    (
+        8,
+        "tuning",
+        """
+        CREATE TABLE IF NOT EXISTS tuning_studies (
+          id           BIGSERIAL PRIMARY KEY,
+          status       TEXT NOT NULL,
+          strategy     TEXT NOT NULL,
+          days         INTEGER NOT NULL,
+          n_trials     INTEGER NOT NULL,
+          settings     JSONB NOT NULL,
+          best_trial   INTEGER,
+          promoted_at  TIMESTAMP,
+          message      TEXT,
+          started_at   TIMESTAMP NOT NULL,
+          finished_at  TIMESTAMP
+        );
+        CREATE TABLE IF NOT EXISTS tuning_trials (
+          study_id     BIGINT NOT NULL REFERENCES tuning_studies(id) ON DELETE CASCADE,
+          trial        INTEGER NOT NULL,
+          params       JSONB NOT NULL,
+          status       TEXT NOT NULL,
+          epochs       INTEGER,
+          val_loss     DOUBLE PRECISION,
+          mae          DOUBLE PRECISION,
+          rmse         DOUBLE PRECISION,
+          mape         DOUBLE PRECISION,
+          smape        DOUBLE PRECISION,
+          dir_acc      DOUBLE PRECISION,
+          wall_s       DOUBLE PRECISION,
+          message      TEXT,
+          PRIMARY KEY (study_id, trial)
+        );
+        """,
+    ),
+    (
+        9,
+        "candle_rollups",
+        """
+        CREATE TABLE IF NOT EXISTS candle_rollups (
+          interval   TEXT NOT NULL,
+          time       TIMESTAMP NOT NULL,
+          open       NUMERIC NOT NULL,
+          high       NUMERIC NOT NULL,
+          low        NUMERIC NOT NULL,
+          close      NUMERIC NOT NULL,
+          volume     NUMERIC NOT NULL,
+          n_candles  INTEGER NOT NULL,
+          PRIMARY KEY (interval, time)
+        );
+        """,
+    ),
+    (10, "candle_pairs", _candle_pairs),
+    (11, "partition_brin", _partition_brin),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def _ensure_version_table(cur) -> None:
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+          version     INTEGER PRIMARY KEY,
+          name        TEXT NOT NULL,
+          applied_at  TIMESTAMP NOT NULL DEFAULT NOW(),
+          duration_ms DOUBLE PRECISION
+        );
+        """
+    )
+
+
+def _applied(cur) -> set[int]:
+    cur.execute("SELECT version FROM schema_migrations;")
+    return {int(r[0]) for r in cur.fetchall()}
+
+
+def migrate(target: Optional[int] = None) -> list[dict]:
+    """Aplica, em ordem, as migrações pendentes até 'target' (padrão: a última).
+
+    Retorna as migrações aplicadas nesta chamada ([] se o banco já estava em dia).
+    """
+    target = LATEST_VERSION if target is None else int(target)
+    applied_now: list[dict] = []
+    conn = pg_conn()
+    try:
+        # lock de sessão: segura entre as transações de cada migração
+        with conn.cursor() as cur:
+            cur.execute("SELECT pg_advisory_lock(%s);", (_LOCK_KEY,))
+        conn.commit()
+        try:
+            with conn.cursor() as cur:
+                _ensure_version_table(cur)
+                done = _applied(cur)
+            conn.commit()
+            for version, name, step in MIGRATIONS:
+                if version in done or version > target:
+                    continue
+                t0 = time.perf_counter()
+                try:
+                    with conn.cursor() as cur:
+                        if callable(step):
+                            step(cur)
+                        else:
+                            cur.execute(step)
+                        ms = (time.perf_counter() - t0) * 1000.0
+                        cur.execute(
+                            "INSERT INTO schema_migrations(version, name, duration_ms) VALUES (%s,%s,%s);",
+                            (version, name, ms),
+                        )
+                    conn.commit()
+                except Exception as e:
+                    conn.rollback()
+                    raise RuntimeError(f"Migração {version} ({name}) falhou: {e}") from e
+                applied_now.append({"version": version, "name": name, "duration_ms": round(ms, 1)})
+        finally:
+            with conn.cursor() as cur:
+                cur.execute("SELECT pg_advisory_unlock(%s);", (_LOCK_KEY,))
+            conn.commit()
+    finally:
+        conn.close()
+    return applied_now
+
+
+def status() -> dict:
+    """Versão atual do banco, migrações aplicadas e pendentes."""
+    with pg_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT to_regclass('schema_migrations') IS NOT NULL;")
+            rows = []
+            if cur.fetchone()[0]:
+                cur.execute("SELECT version, name, applied_at FROM schema_migrations ORDER BY version;")
+                rows = cur.fetchall()
+    done = {int(r[0]) for r in rows}
+    return {
+        "current_version": max(done) if done else 0,
+        "latest_version": LATEST_VERSION,
+        "applied": [{"version": int(r[0]), "name": r[1], "applied_at": r[2].isoformat()} for r in rows],
+        "pending": [{"version": v, "name": n} for v, n, _ in MIGRATIONS if v not in done],
+    }
+
+
+def main(argv=None) -> None:
+    ap = argparse.ArgumentParser(description="Aplica as migrações do schema (schema_migrations).")
+    ap.add_argument("--status", action="store_true", help="só mostra versão atual e pendências")
+    ap.add_argument("--target", type=int, default=None, help="aplica até esta versão (padrão: a última)")
+    args = ap.parse_args(argv)
+
+    if not args.status:
+        start = datetime.utcnow()
+        applied = migrate(args.target)
+        print(json.dumps({"applied": applied, "elapsed_s": round((datetime.utcnow() - start).total_seconds(), 3)}))
+    print(json.dumps(status(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
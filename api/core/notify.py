@@ -0,0 +1,124 @@
+"""Push de candles e previsões novos via LISTEN/NOTIFY do Postgres (GET /events, SSE).
+
+- Os gravadores chamam publish(cur, canal, payload) na própria transação: o Postgres só
+  entrega a notificação no COMMIT (rollback não gera evento).
+- Canais: "candles" (upsert_many: um evento por par com candles novos, com o último deles)
+  e "futures" (save_predictions_for_times: os pontos gravados, os mais novos se passarem do
+  limite). Os dois trazem "from"/"to" do lote, para completar lacunas pelos endpoints /page.
+- Cada worker mantém UMA conexão em LISTEN (thread daemon, iniciada no primeiro cliente,
+  reconecta com backoff) e repassa o payload, já em JSON, às filas asyncio dos clientes
+  conectados: N espectadores custam uma assinatura no banco, não N polls.
+- Filas limitadas a EVENTS_CLIENT_QUEUE mensagens: um cliente lento perde as mais antigas
+  em vez de acumular memória no worker. Eventos perdidos (fila cheia, reconexão) podem ser
+  recuperados pelos endpoints /page com o último cursor visto.
+"""
+from __future__ import annotations
+
+import asyncio
+import select
+import threading
+import time
+from typing import Iterable, Optional
+
+from core.config import settings
+from core.db import pg_conn
+from core.fast_json import dumps
+
+CHANNELS = ("candles", "futures")
+# limite do pg_notify é 8000 bytes: eventos grandes (backfill) levam só o último trecho
+MAX_POINTS = 20
+
+_SUBS: set["Subscriber"] = set()
+_SUBS_LOCK = threading.Lock()
+_LISTENER: Optional[threading.Thread] = None
+
+
+def publish(cur, channel: str, payload: dict) -> None:
+    """Enfileira a notificação na transação de 'cur' (entregue no COMMIT)."""
+    cur.execute("SELECT pg_notify(%s, %s);", (channel, dumps(payload).decode("utf-8")))
+
+
+class Subscriber:
+    """Fila de um cliente SSE, ligada ao event loop em que foi criada."""
+
+    __slots__ = ("loop", "queue", "channels")
+
+    def __init__(self, channels: Iterable[str]):
+        self.loop = asyncio.get_running_loop()
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=int(settings.EVENTS_CLIENT_QUEUE))
+        self.channels = frozenset(channels)
+
+    def _deliver(self, item: tuple[str, str]) -> None:
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(item)
+
+
+def subscribe(channels: Iterable[str]) -> Subscriber:
+    """Registra um cliente (chamar de dentro do event loop) e garante o listener do worker."""
+    sub = Subscriber(channels)
+    with _SUBS_LOCK:
+        _SUBS.add(sub)
+    start_listener()
+    return sub
+
+
+def unsubscribe(sub: Subscriber) -> None:
+    with _SUBS_LOCK:
+        _SUBS.discard(sub)
+
+
+def subscriber_count() -> int:
+    with _SUBS_LOCK:
+        return len(_SUBS)
+
+
+def _fan_out(channel: str, payload: str) -> None:
+    with _SUBS_LOCK:
+        subs = [s for s in _SUBS if channel in s.channels]
+    for s in subs:
+        try:
+            s.loop.call_soon_threadsafe(s._deliver, (channel, payload))
+        except RuntimeError:
+            # event loop já encerrado
+            unsubscribe(s)
+
+
+def _listen_loop() -> None:
+    backoff = 1.0
+    while True:
+        conn = None
+        try:
+            conn = pg_conn()
+            conn.autocommit = True
+            with conn.cursor() as cur:
+                for ch in CHANNELS:
+                    cur.execute(f"LISTEN {ch};")
+            backoff = 1.0
+            while True:
+                if select.select([conn], [], [], 5.0) == ([], [], []):
+                    continue
+                conn.poll()
+                while conn.notifies:
+                    n = conn.notifies.pop(0)
+                    _fan_out(n.channel, n.payload)
+        except Exception:
+            time.sleep(backoff)
+            backoff = min(backoff * 2.0, 30.0)
+        finally:
+            if conn is not None:
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+
+
+def start_listener() -> bool:
+    """Dispara a conexão LISTEN deste processo. False se já estiver rodando."""
+    global _LISTENER
+    with _SUBS_LOCK:
+        if _LISTENER is not None and _LISTENER.is_alive():
+            return False
+        _LISTENER = threading.Thread(target=_listen_loop, name="pg-listen", daemon=True)
+        _LISTENER.start()
+    return True
@@ -2,7 +2,7 @@ from __future__ import annotations
 
 import time
 from fastapi import FastAPI, Request
-from prometheus_client import Counter, Histogram
+from prometheus_client import Counter, Gauge, Histogram
 
 
 REQ_COUNT = Counter("http_requests_total", "Total de requests HTTP", ["method", "path", "status"])
@@ -33,3 +33,53 @@ def instrument_app(app: FastAPI) -> None:
 
 
 
+
+
+TRAIN_PHASE_SECONDS = Gauge(
+    "train_phase_seconds", "Duração da fase no último treino (segundos)", ["phase", "clock"]
+)
+TRAIN_PHASE_PEAK_RSS = Gauge(
+    "train_phase_peak_rss_bytes", "Pico de RSS durante a fase no último treino (bytes)", ["phase"]
+)
+TRAIN_EPOCH_SAMPLES_PER_SECOND = Gauge(
+    "train_epoch_samples_per_second", "Amostras de treino por segundo no último treino", ["stat"]
+)
+
+
+def export_train_profile(profile: dict) -> None:
+    """Publica o perfil do último treino (ver training_service) como gauges Prometheus."""
+    try:
+        for phase, m in (profile.get("phases") or {}).items():
+            TRAIN_PHASE_SECONDS.labels(phase, "wall").set(m["wall_s"])
+            TRAIN_PHASE_SECONDS.labels(phase, "cpu").set(m["cpu_s"])
+            TRAIN_PHASE_PEAK_RSS.labels(phase).set(m["peak_rss_mb"] * 2**20)
+        rates = [e["samples_per_s"] for e in (profile.get("epochs") or []) if e.get("samples_per_s")]
+        if rates:
+            TRAIN_EPOCH_SAMPLES_PER_SECOND.labels("mean").set(sum(rates) / len(rates))
+            TRAIN_EPOCH_SAMPLES_PER_SECOND.labels("last").set(rates[-1])
+    except Exception:
+        pass
+
+
+BINANCE_REQ_LATENCY = Histogram(
+    "binance_request_seconds", "Latência das chamadas de klines (segundos)", ["status"]
+)
+BINANCE_RETRIES = Counter("binance_retries_total", "Retentativas de chamadas de klines", ["reason"])
+BINANCE_USED_WEIGHT = Gauge("binance_used_weight_1m", "Peso usado na janela de 1 minuto (Binance)")
+
+
+INFERENCE_BATCH_FILL = Histogram(
+    "inference_batch_fill_ratio", "Janelas reais / tamanho do bucket em cada lote de inferência",
+    buckets=(0.1, 0.25, 0.5, 0.75, 0.9, 1.0),
+)
+INFERENCE_BATCH_ROWS = Histogram(
+    "inference_batch_rows", "Janelas reais por lote de inferência",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 2048),
+)
+INFERENCE_BATCH_REQUESTS = Histogram(
+    "inference_batch_requests", "Pedidos agrupados por lote de inferência", buckets=(1, 2, 4, 8, 16, 32, 64)
+)
+INFERENCE_QUEUE_SECONDS = Histogram(
+    "inference_queue_seconds", "Espera na fila do agendador de inferência (segundos)",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0),
+)
@@ -0,0 +1,83 @@
+"""Paginação keyset por time com cursor opaco (/series/cached/page e /futures/page).
+
+- O cursor é base64url de {"t": time do último ponto entregue, "d": direção}; o cliente só
+  o devolve na chamada seguinte. A direção do cursor prevalece sobre o parâmetro.
+- Próxima página: time > t (asc) ou time < t (desc), ORDER BY time LIMIT n+1. É uma leitura
+  por faixa na PK de cada partição, com custo proporcional ao tamanho da página e não à
+  posição (sem OFFSET); a linha extra só indica has_more.
+- Polling "desde o cursor": em asc, next_cursor volta mesmo com a página vazia; repetindo
+  a chamada com ele, o cliente recebe só os pontos gravados depois do último que já viu.
+"""
+from __future__ import annotations
+
+import base64
+import json
+from datetime import datetime
+from typing import Callable, Optional
+
+from core.db import pg_conn
+
+DIRECTIONS = ("asc", "desc")
+
+
+def encode_cursor(t: datetime, direction: str) -> str:
+    raw = json.dumps({"t": t.isoformat(), "d": direction}, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, str]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        data = json.loads(raw)
+        t, direction = datetime.fromisoformat(data["t"]), data["d"]
+    except Exception:
+        raise ValueError("cursor inválido")
+    if direction not in DIRECTIONS:
+        raise ValueError("cursor inválido")
+    return t, direction
+
+
+def fetch_page(
+    table: str,
+    select: str,
+    to_point: Callable[[tuple], dict],
+    cursor: Optional[str] = None,
+    limit: int = 1000,
+    direction: str = "asc",
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+) -> dict:
+    """Uma página de 'table' (a primeira coluna de 'select' deve ser time)."""
+    after = None
+    if cursor:
+        after, direction = decode_cursor(cursor)
+    elif direction not in DIRECTIONS:
+        raise ValueError(f"direction deve ser um de {list(DIRECTIONS)}")
+    where, params = [], []
+    if start:
+        where.append("time >= %s")
+        params.append(start)
+    if end:
+        where.append("time <= %s")
+        params.append(end)
+    if after is not None:
+        where.append("time > %s" if direction == "asc" else "time < %s")
+        params.append(after)
+    q = f"SELECT {select} FROM {table}"
+    if where:
+        q += " WHERE " + " AND ".join(where)
+    q += f" ORDER BY time {direction.upper()} LIMIT %s"
+    params.append(int(limit) + 1)
+    with pg_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute(q, params)
+            rows = cur.fetchall()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    last = rows[-1][0] if rows else after
+    return {
+        "points": [to_point(r) for r in rows],
+        "direction": direction,
+        "has_more": has_more,
+        "next_cursor": encode_cursor(last, direction) if last is not None else None,
+    }
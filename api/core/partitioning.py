@@ -0,0 +1,316 @@
+"""Particionamento mensal (RANGE em time) de btc_candles, futures e series_cache.
+
+- Cada tabela é uma "mãe" particionada com PK (time) (exigida pelos ON CONFLICT; em
+  btc_candles, (symbol, interval, time) desde a migração candle_pairs) e um
+  índice BRIN em time (pequeno; adequado a dados gravados em ordem de tempo), herdado
+  pelas partições <tabela>_pYYYYMM.
+- Consultas por intervalo de tempo só tocam as partições do intervalo (partition pruning).
+- prepare_table(): cria a mãe se faltar ou migra uma tabela comum existente (renomeia
+  para <tabela>_legacy, cria a mãe + partições do intervalo, copia e apaga a antiga).
+  Roda só pelas migrações (core/migrations.py), nunca no caminho das requisições.
+- premake(): partições do mês atual até PARTITION_PREMAKE_MONTHS à frente (subida da API
+  e manutenção).
+- ensure_partitions_for(): chamado pelos gravadores antes de inserir; as partições
+  existentes são lidas do catálogo uma vez por processo e ficam em cache, então só há DDL
+  quando um backfill grava um mês que ainda não tem partição.
+- apply_retention(): apaga partições inteiras (DROP TABLE) cujo mês terminou antes de
+  hoje - <TABELA>_RETENTION_DAYS (0 = mantém tudo); sem DELETE nem VACUUM.
+- start_maintenance(): thread daemon que roda premake + retenção a cada
+  PARTITION_MAINTENANCE_MINUTES (log em job_logs como "retention").
+"""
+from __future__ import annotations
+
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Iterable, Optional
+
+from core.config import settings
+from core.db import pg_conn
+
+_LOCK_KEY = 0x70617274  # "part"
+
+_COLUMNS = {
+    "btc_candles": """
+        time   TIMESTAMP NOT NULL,
+        open   NUMERIC NOT NULL,
+        high   NUMERIC NOT NULL,
+        low    NUMERIC NOT NULL,
+        close  NUMERIC NOT NULL,
+        volume NUMERIC NOT NULL
+    """,
+    "futures": """
+        time        TIMESTAMP NOT NULL,
+        pred_close  NUMERIC,
+        real_close  NUMERIC,
+        err_close   NUMERIC,
+        prev_close  NUMERIC
+    """,
+    "series_cache": """
+        time                TIMESTAMP NOT NULL,
+        open                NUMERIC,
+        high                NUMERIC,
+        low                 NUMERIC,
+        close               NUMERIC,
+        volume              NUMERIC,
+        pred_open_next      NUMERIC,
+        pred_high_next      NUMERIC,
+        pred_low_next       NUMERIC,
+        pred_close_next     NUMERIC,
+        pred_amp_next       NUMERIC,
+        cls_dir_next        INTEGER,
+        prob_up             NUMERIC,
+        prob_down           NUMERIC,
+        err_close_abs       NUMERIC,
+        err_close_signed    NUMERIC,
+        err_amp_abs         NUMERIC
+    """,
+}
+
+# series_cache é regravada a cada rebuild: folga na página permite updates HOT
+_FILLFACTOR = {"series_cache": 90}
+
+PARTITIONED_TABLES = tuple(_COLUMNS)
+
+_LOADED: set[str] = set()
+_KNOWN: dict[str, set[str]] = {t: set() for t in PARTITIONED_TABLES}
+_STATE_LOCK = threading.Lock()
+_MAINT_THREAD: Optional[threading.Thread] = None
+
+
+def retention_days(table: str) -> int:
+    return int({
+        "btc_candles": settings.CANDLES_RETENTION_DAYS,
+        "futures": settings.FUTURES_RETENTION_DAYS,
+        "series_cache": settings.SERIES_CACHE_RETENTION_DAYS,
+    }[table] or 0)
+
+
+# ---------------- meses ----------------
+def month_start(t: datetime) -> datetime:
+    return datetime(t.year, t.month, 1)
+
+
+def add_months(m: datetime, k: int) -> datetime:
+    y, mo = divmod(m.month - 1 + k, 12)
+    return datetime(m.year + y, mo + 1, 1)
+
+
+def partition_name(table: str, month: datetime) -> str:
+    return f"{table}_p{month:%Y%m}"
+
+
+def _months(start: datetime, end: datetime) -> list[datetime]:
+    out, m = [], month_start(start)
+    last = month_start(end)
+    while m <= last:
+        out.append(m)
+        m = add_months(m, 1)
+    return out
+
+
+# ---------------- DDL ----------------
+def _relkind(cur, name: str) -> Optional[str]:
+    cur.execute("SELECT c.relkind FROM pg_class c WHERE c.oid = to_regclass(%s);", (name,))
+    row = cur.fetchone()
+    return row[0] if row else None
+
+
+def _create_parent(cur, table: str) -> None:
+    cur.execute(
+        f"""
+        CREATE TABLE IF NOT EXISTS {table} (
+          {_COLUMNS[table].strip()},
+          PRIMARY KEY (time)
+        ) PARTITION BY RANGE (time);
+        """
+    )
+    ensure_brin(cur, table)
+
+
+def ensure_brin(cur, table: str) -> None:
+    """Índice BRIN em time na mãe (propagado para as partições)."""
+    cur.execute(
+        f"CREATE INDEX IF NOT EXISTS {table}_time_brin ON {table} USING BRIN (time) WITH (pages_per_range = 32);"
+    )
+
+
+def _create_partition(cur, table: str, month: datetime) -> None:
+    name = partition_name(table, month)
+    ff = _FILLFACTOR.get(table)
+    cur.execute(
+        f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {table} FOR VALUES FROM (%s) TO (%s)"
+        + (f" WITH (fillfactor = {int(ff)})" if ff else "")
+        + ";",
+        (month, add_months(month, 1)),
+    )
+
+
+def _migrate_legacy(cur, table: str) -> None:
+    """Tabela comum -> particionada, na transação corrente (já sob o advisory lock)."""
+    legacy = f"{table}_legacy"
+    cur.execute(f"ALTER TABLE {table} RENAME TO {legacy};")
+    cur.execute(
+        "SELECT conname FROM pg_constraint WHERE conrelid = %s::regclass AND contype = 'p';", (legacy,)
+    )
+    row = cur.fetchone()
+    if row:
+        # o nome da PK (ex.: btc_candles_pkey) passa a ser usado pela tabela nova
+        cur.execute(f'ALTER TABLE {legacy} RENAME CONSTRAINT "{row[0]}" TO {legacy}_pkey;')
+    # idem para o BRIN: se ficasse com o nome antigo, a mãe nova seria criada sem ele
+    cur.execute(f"ALTER INDEX IF EXISTS {table}_time_brin RENAME TO {legacy}_time_brin;")
+    _create_parent(cur, table)
+    cur.execute(f"SELECT MIN(time), MAX(time) FROM {legacy};")
+    lo, hi = cur.fetchone()
+    if lo is not None:
+        for m in _months(lo, hi):
+            _create_partition(cur, table, m)
+    cur.execute(
+        """SELECT column_name FROM information_schema.columns
+           WHERE table_schema = current_schema() AND table_name = %s ORDER BY ordinal_position;""",
+        (legacy,),
+    )
+    old_cols = {r[0] for r in cur.fetchall()}
+    cur.execute(
+        """SELECT column_name FROM information_schema.columns
+           WHERE table_schema = current_schema() AND table_name = %s ORDER BY ordinal_position;""",
+        (table,),
+    )
+    cols = ", ".join(r[0] for r in cur.fetchall() if r[0] in old_cols)
+    cur.execute(f"INSERT INTO {table} ({cols}) SELECT {cols} FROM {legacy};")
+    cur.execute(f"DROP TABLE {legacy};")
+
+
+def prepare_table(cur, table: str) -> str:
+    """Garante a mãe particionada na transação de 'cur'. Retorna 'ready'|'created'|'migrated'."""
+    cur.execute("SELECT pg_advisory_xact_lock(%s);", (_LOCK_KEY,))
+    kind = _relkind(cur, table)
+    if kind is None:
+        _create_parent(cur, table)
+        return "created"
+    if kind == "r":
+        _migrate_legacy(cur, table)
+        return "migrated"
+    # mãe já existia (ex.: criada pelo schema.sql): só garante o BRIN
+    _create_parent(cur, table)
+    return "ready"
+
+
+def premake(now: Optional[datetime] = None) -> None:
+    """Partições do mês atual até PARTITION_PREMAKE_MONTHS à frente, para as três tabelas."""
+    now = now or datetime.utcnow()
+    ahead = _months(now, add_months(month_start(now), int(settings.PARTITION_PREMAKE_MONTHS)))
+    with pg_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT pg_advisory_xact_lock(%s);", (_LOCK_KEY,))
+            for table in PARTITIONED_TABLES:
+                for m in ahead:
+                    _create_partition(cur, table, m)
+    with _STATE_LOCK:
+        for table in PARTITIONED_TABLES:
+            _KNOWN[table].update(partition_name(table, m) for m in ahead)
+
+
+def _load_known(table: str) -> None:
+    """Lê do catálogo as partições existentes (só leitura), uma vez por processo."""
+    with pg_conn() as conn:
+        with conn.cursor() as cur:
+            names = [name for name, _ in list_partitions(cur, table)]
+    with _STATE_LOCK:
+        _KNOWN[table].update(names)
+        _LOADED.add(table)
+
+
+def ensure_partitions_for(table: str, times: Iterable) -> None:
+    """Cria as partições mensais que cobrem 'times' (sem DDL se já existirem)."""
+    import pandas as pd
+
+    ts = pd.to_datetime(pd.Series(list(times)), errors="coerce").dropna()
+    if ts.empty:
+        return
+    if table not in _LOADED:
+        _load_known(table)
+    months = _months(ts.min().to_pydatetime(), ts.max().to_pydatetime())
+    missing = [m for m in months if partition_name(table, m) not in _KNOWN[table]]
+    if not missing:
+        return
+    with pg_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT pg_advisory_xact_lock(%s);", (_LOCK_KEY,))
+            for m in missing:
+                _create_partition(cur, table, m)
+    with _STATE_LOCK:
+        _KNOWN[table].update(partition_name(table, m) for m in missing)
+
+
+# ---------------- retenção ----------------
+def list_partitions(cur, table: str) -> list[tuple[str, datetime]]:
+    """(nome, mês) das partições <tabela>_pYYYYMM existentes, em ordem."""
+    cur.execute(
+        """SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+           WHERE i.inhparent = to_regclass(%s) ORDER BY c.relname;""",
+        (table,),
+    )
+    out = []
+    prefix = f"{table}_p"
+    for (name,) in cur.fetchall():
+        suffix = name[len(prefix):] if name.startswith(prefix) else ""
+        if len(suffix) == 6 and suffix.isdigit():
+            out.append((name, datetime(int(suffix[:4]), int(suffix[4:]), 1)))
+    return out
+
+
+def apply_retention(now: Optional[datetime] = None) -> dict[str, list[str]]:
+    """Apaga as partições inteiramente mais antigas que a retenção de cada tabela."""
+    now = now or datetime.utcnow()
+    dropped: dict[str, list[str]] = {}
+    for table in PARTITIONED_TABLES:
+        days = retention_days(table)
+        if days <= 0:
+            continue
+        cutoff = now - timedelta(days=days)
+        with pg_conn() as conn:
+            with conn.cursor() as cur:
+                cur.execute("SELECT pg_advisory_xact_lock(%s);", (_LOCK_KEY,))
+                for name, month in list_partitions(cur, table):
+                    if add_months(month, 1) <= cutoff:
+                        cur.execute(f"DROP TABLE IF EXISTS {name};")
+                        dropped.setdefault(table, []).append(name)
+                        _KNOWN[table].discard(name)
+    return dropped
+
+
+def maintain() -> dict[str, list[str]]:
+    """Partições à frente + retenção."""
+    premake()
+    return apply_retention()
+
+
+def _maintenance_loop() -> None:
+    from core.logging import log_job
+
+    interval = float(settings.PARTITION_MAINTENANCE_MINUTES) * 60.0
+    while True:
+        time.sleep(interval)
+        start = datetime.utcnow()
+        try:
+            dropped = maintain()
+            if dropped:
+                msg = "; ".join(f"{t}: {', '.join(names)}" for t, names in dropped.items())
+                log_job("retention", "ok", f"Partições removidas: {msg}", start, datetime.utcnow())
+        except Exception as e:
+            try:
+                log_job("retention", "error", str(e), start, datetime.utcnow())
+            except Exception:
+                pass
+
+
+def start_maintenance() -> bool:
+    """Dispara a thread de manutenção deste processo. False se já estiver rodando."""
+    global _MAINT_THREAD
+    with _STATE_LOCK:
+        if _MAINT_THREAD is not None and _MAINT_THREAD.is_alive():
+            return False
+        _MAINT_THREAD = threading.Thread(target=_maintenance_loop, name="partition-maintenance", daemon=True)
+        _MAINT_THREAD.start()
+    return True
@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Optional
+
+import psutil
+
+
+class PeakRssSampler:
+    """Amostra o RSS do processo em uma thread de fundo e guarda o pico.
+
+    Uso:
+        with PeakRssSampler() as s:
+            ...
+        s.peak_rss  # bytes
+    """
+
+    def __init__(self, interval_s: float = 0.005):
+        self.interval_s = interval_s
+        self._proc = psutil.Process()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.start_rss = 0
+        self.peak_rss = 0
+
+    def _sample(self) -> None:
+        try:
+            rss = self._proc.memory_info().rss
+        except Exception:
+            return
+        if rss > self.peak_rss:
+            self.peak_rss = rss
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval_s):
+            self._sample()
+
+    def __enter__(self) -> "PeakRssSampler":
+        self.start_rss = self._proc.memory_info().rss
+        self.peak_rss = self.start_rss
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="rss-sampler", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self._sample()
+
+
+@dataclass
+class Measurement:
+    wall_s: float = 0.0
+    cpu_s: float = 0.0
+    start_rss: int = 0
+    peak_rss: int = 0
+
+    @property
+    def peak_rss_delta(self) -> int:
+        return max(0, self.peak_rss - self.start_rss)
+
+
+class measure:
+    """Context manager que mede wall time, CPU time do processo e pico de RSS."""
+
+    def __init__(self, sample_interval_s: float = 0.005):
+        self.result = Measurement()
+        self._sampler = PeakRssSampler(sample_interval_s)
+
+    def __enter__(self) -> Measurement:
+        self._sampler.__enter__()
+        self._t0 = time.perf_counter()
+        self._c0 = time.process_time()
+        return self.result
+
+    def __exit__(self, *exc) -> None:
+        self.result.wall_s = time.perf_counter() - self._t0
+        self.result.cpu_s = time.process_time() - self._c0
+        self._sampler.__exit__(*exc)
+        self.result.start_rss = self._sampler.start_rss
+        self.result.peak_rss = self._sampler.peak_rss
+
+
+class PhaseProfiler:
+    """Acumula medições (wall/CPU/pico de RSS) por fase nomeada de um job.
+
+    Uso:
+        prof = PhaseProfiler()
+        with prof.phase("db_load"):
+            ...
+        prof.as_dict()
+    """
+
+    def __init__(self, sample_interval_s: float = 0.01):
+        self.sample_interval_s = sample_interval_s
+        self.phases: dict[str, Measurement] = {}
+
+    @contextmanager
+    def phase(self, name: str):
+        m = measure(self.sample_interval_s)
+        try:
+            with m as result:
+                yield result
+        finally:
+            self.phases[name] = m.result
+
+    def as_dict(self) -> dict:
+        return {
+            name: {
+                "wall_s": m.wall_s,
+                "cpu_s": m.cpu_s,
+                "peak_rss_mb": m.peak_rss / 2**20,
+                "peak_rss_delta_mb": m.peak_rss_delta / 2**20,
+            }
+            for name, m in self.phases.items()
+        }
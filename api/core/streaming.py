@@ -0,0 +1,44 @@
+"""Respostas em streaming (NDJSON): leitura por cursor server-side e escrita incremental.
+
+- iter_rows(): linhas de uma consulta em lotes de STREAM_BATCH_ROWS por cursor nomeado;
+  só um lote fica em memória, qualquer que seja o intervalo.
+- ndjson_chunks(): um objeto JSON por linha, agrupados em blocos de ~STREAM_BATCH_ROWS
+  linhas por escrita (o cliente começa a renderizar no primeiro bloco).
+"""
+from __future__ import annotations
+
+from typing import Iterable, Iterator, Optional
+
+from core.config import settings
+from core.db import pg_conn
+from core.fast_json import dumps
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+def iter_rows(query: str, params: Iterable = (), batch_rows: Optional[int] = None, name: str = "stream") -> Iterator[tuple]:
+    batch_rows = int(batch_rows or settings.STREAM_BATCH_ROWS)
+    conn = pg_conn()
+    try:
+        with conn.cursor(name=name) as cur:
+            cur.itersize = batch_rows
+            cur.execute(query, tuple(params))
+            while True:
+                rows = cur.fetchmany(batch_rows)
+                if not rows:
+                    break
+                yield from rows
+    finally:
+        conn.close()
+
+
+def ndjson_chunks(items: Iterable, lines_per_chunk: Optional[int] = None) -> Iterator[bytes]:
+    lines_per_chunk = int(lines_per_chunk or settings.STREAM_BATCH_ROWS)
+    buf: list[bytes] = []
+    for item in items:
+        buf.append(dumps(item))
+        if len(buf) >= lines_per_chunk:
+            yield b"\n".join(buf) + b"\n"
+            buf.clear()
+    if buf:
+        yield b"\n".join(buf) + b"\n"
@@ -0,0 +1,202 @@
+"""Formato compacto do bundle LSTM: manifest.json + weights.bin (mapeável em memória).
+
+Layout do diretório:
+- manifest.json: versão do formato, colunas de features/targets, seq_len, parâmetros dos
+  scalers, arquitetura (unidades/ativações), metadados do treino e, para cada tensor,
+  dtype/shape/offset/sha256;
+- weights.bin: os tensores concatenados (alinhados em 64 bytes), lidos via np.memmap.
+
+Vários workers que carregam o mesmo arquivo compartilham as páginas do page cache, e o
+load não importa tensorflow nem desserializa pickles (ver ml/numpy_lstm.py).
+
+Conversão do par antigo (a partir de api/):
+    python -m ml.bundle_format --joblib /app/models/lstm_bundle.joblib --keras /app/models/lstm_model.keras --out /app/models/lstm_bundle
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sys
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+BUNDLE_FORMAT_VERSION = 1
+MANIFEST_NAME = "manifest.json"
+WEIGHTS_NAME = "weights.bin"
+_ALIGN = 64
+
+# Camadas de ml.lstm_model.build_lstm_multitask_model e os tensores de cada uma
+_KERAS_LAYERS = {
+    "lstm": ("kernel", "recurrent_kernel", "bias"),
+    "dense": ("kernel", "bias"),
+    "reg": ("kernel", "bias"),
+    "cls": ("kernel", "bias"),
+}
+
+
+class BundleFormatError(ValueError):
+    pass
+
+
+class AffineScaler:
+    """Parâmetros de um MinMaxScaler já ajustado (x * scale_ + min_), sem sklearn."""
+
+    def __init__(self, scale, min_):
+        self.scale_ = np.asarray(scale, dtype=np.float64)
+        self.min_ = np.asarray(min_, dtype=np.float64)
+
+    def transform(self, X):
+        return np.asarray(X) * self.scale_ + self.min_
+
+    def inverse_transform(self, X):
+        return (np.asarray(X) - self.min_) / self.scale_
+
+
+def _sha256(a: np.ndarray) -> str:
+    return hashlib.sha256(np.ascontiguousarray(a).view(np.uint8)).hexdigest()
+
+
+def write_bundle(directory: str | Path, tensors: dict[str, np.ndarray], manifest: dict) -> Path:
+    """Grava o bundle num diretório temporário e troca pelo atual com rename.
+
+    Processos que já mapearam o weights.bin anterior continuam lendo o arquivo antigo
+    (o inode só é liberado quando o último mapeamento fecha).
+    """
+    directory = Path(directory)
+    tmp = directory.with_name(f"{directory.name}.tmp-{os.getpid()}")
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+
+    entries = []
+    offset = 0
+    with open(tmp / WEIGHTS_NAME, "wb") as fh:
+        for name, arr in tensors.items():
+            arr = np.ascontiguousarray(arr, dtype=np.float32)
+            pad = (-offset) % _ALIGN
+            fh.write(b"\0" * pad)
+            offset += pad
+            fh.write(arr.tobytes())
+            entries.append({
+                "name": name,
+                "dtype": "float32",
+                "shape": list(arr.shape),
+                "offset": offset,
+                "nbytes": int(arr.nbytes),
+                "sha256": _sha256(arr),
+            })
+            offset += arr.nbytes
+    manifest = {**manifest, "format_version": BUNDLE_FORMAT_VERSION, "weights_file": WEIGHTS_NAME,
+                "weights_nbytes": offset, "tensors": entries}
+    with open(tmp / MANIFEST_NAME, "w", encoding="utf-8") as fh:
+        json.dump(manifest, fh, indent=2)
+
+    old = directory.with_name(f"{directory.name}.old-{os.getpid()}")
+    if directory.exists():
+        os.replace(directory, old)
+    os.replace(tmp, directory)
+    shutil.rmtree(old, ignore_errors=True)
+    return directory
+
+
+def read_bundle(directory: str | Path, verify: bool = True) -> tuple[dict, dict[str, np.ndarray]]:
+    """(manifest, tensores) com os tensores como views somente leitura de um np.memmap."""
+    directory = Path(directory)
+    with open(directory / MANIFEST_NAME, encoding="utf-8") as fh:
+        manifest = json.load(fh)
+    version = manifest.get("format_version")
+    if version != BUNDLE_FORMAT_VERSION:
+        raise BundleFormatError(f"Versão de bundle não suportada: {version} (esperado {BUNDLE_FORMAT_VERSION})")
+    path = directory / manifest.get("weights_file", WEIGHTS_NAME)
+    if os.path.getsize(path) != int(manifest["weights_nbytes"]):
+        raise BundleFormatError(f"{path} com tamanho diferente do manifest")
+    mm = np.memmap(path, dtype=np.uint8, mode="r")
+    tensors = {}
+    for e in manifest["tensors"]:
+        arr = np.ndarray(tuple(e["shape"]), dtype=np.dtype(e["dtype"]), buffer=mm, offset=int(e["offset"]))
+        if verify and _sha256(arr) != e["sha256"]:
+            raise BundleFormatError(f"Checksum inválido para o tensor {e['name']}")
+        tensors[e["name"]] = arr
+    return manifest, tensors
+
+
+def bundle_exists(directory: str | Path) -> bool:
+    return (Path(directory) / MANIFEST_NAME).exists()
+
+
+def tensors_from_keras(model) -> tuple[dict[str, np.ndarray], dict]:
+    """Pesos (por '<camada>/<tensor>') e arquitetura do modelo de ml.lstm_model."""
+    tensors = {}
+    arch = {}
+    for layer_name, names in _KERAS_LAYERS.items():
+        layer = model.get_layer(layer_name)
+        weights = layer.get_weights()
+        if len(weights) != len(names):
+            raise BundleFormatError(f"Camada {layer_name}: esperados {len(names)} tensores, veio {len(weights)}")
+        for n, w in zip(names, weights):
+            tensors[f"{layer_name}/{n}"] = np.asarray(w, dtype=np.float32)
+        cfg = layer.get_config()
+        arch[layer_name] = {"units": int(cfg["units"]), "activation": cfg.get("activation")}
+        if layer_name == "lstm":
+            arch[layer_name]["recurrent_activation"] = cfg.get("recurrent_activation")
+    return tensors, arch
+
+
+def save_compact_bundle(directory: str | Path, model, scaler_x, scaler_y, feature_cols, target_reg_cols,
+                        seq_len: int, training: Optional[dict] = None) -> Path:
+    tensors, arch = tensors_from_keras(model)
+    manifest = {
+        "created_at": datetime.utcnow().isoformat(),
+        "feature_cols": list(feature_cols),
+        "target_reg_cols": list(target_reg_cols),
+        "seq_len": int(seq_len),
+        "scaler_x": {"scale": np.asarray(scaler_x.scale_, dtype=float).tolist(), "min": np.asarray(scaler_x.min_, dtype=float).tolist()},
+        "scaler_y": {"scale": np.asarray(scaler_y.scale_, dtype=float).tolist(), "min": np.asarray(scaler_y.min_, dtype=float).tolist()},
+        "arch": arch,
+        "training": training or {},
+    }
+    return write_bundle(directory, tensors, manifest)
+
+
+def convert(joblib_path: str, keras_path: Optional[str], out_dir: str) -> Path:
+    """Converte o par lstm_bundle.joblib + lstm_model.keras para o formato compacto."""
+    import joblib
+    import tensorflow as tf
+
+    meta = joblib.load(joblib_path)
+    model = tf.keras.models.load_model(keras_path or meta["model_path"], compile=False)
+    return save_compact_bundle(
+        out_dir,
+        model,
+        meta["scaler_x"],
+        meta["scaler_y"],
+        meta["feature_cols"],
+        meta["target_reg_cols"],
+        int(meta["seq_len"]),
+        training={"converted_from": os.path.abspath(joblib_path)},
+    )
+
+
+def main(argv: list[str] | None = None) -> int:
+    from core.config import settings
+
+    ap = argparse.ArgumentParser(description="Converte lstm_bundle.joblib + lstm_model.keras para o bundle compacto.")
+    ap.add_argument("--joblib", default=settings.LSTM_BUNDLE_PATH)
+    ap.add_argument("--keras", default=None, help="padrão: model_path gravado no joblib")
+    ap.add_argument("--out", default=settings.LSTM_COMPACT_BUNDLE_DIR)
+    args = ap.parse_args(argv)
+
+    out = convert(args.joblib, args.keras, args.out)
+    manifest, tensors = read_bundle(out)
+    n_params = sum(int(np.prod(t.shape)) for t in tensors.values())
+    print(f"{out}: {len(tensors)} tensores, {n_params} parâmetros, {manifest['weights_nbytes']} bytes")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
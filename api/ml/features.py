@@ -27,3 +27,13 @@ def build_features_targets(df: pd.DataFrame):
 def exp_sample_weights(n: int, alpha: float):
     t = np.arange(n)
     return alpha ** (n - 1 - t)
+
+# Versão do conjunto de features/targets gravado na feature store (services/feature_store_service.py).
+# Incrementar ao mudar a definição de alguma coluna; mudanças em FEATURE_COLS/TARGET_REG_COLS
+# já alteram o fingerprint automaticamente.
+FEATURE_SET_VERSION = 1
+
+def feature_set_version() -> str:
+    import hashlib
+    cols = ",".join(FEATURE_COLS) + "|" + ",".join(TARGET_REG_COLS)
+    return f"{FEATURE_SET_VERSION}:{hashlib.sha1(cols.encode()).hexdigest()[:8]}"
@@ -87,6 +87,63 @@ def temporal_split_indices(n: int, holdout_max: int = 500, train_ratio: float =
     return split_idx
 
 
+def walk_forward_folds(
+    n: int,
+    folds: int,
+    val_size: int,
+    mode: str = "expanding",
+    train_size: Optional[int] = None,
+) -> list[Tuple[int, int, int]]:
+    """Folds walk-forward sobre n sequências: lista de (train_start, val_start, val_end).
+
+    As K janelas de validação (val_size cada) são consecutivas e terminam na última
+    sequência. "expanding": treino = tudo antes da validação; "rolling": treino = as
+    train_size sequências imediatamente anteriores (padrão: o que sobra antes do 1º fold).
+    """
+    if mode not in ("expanding", "rolling"):
+        raise ValueError("mode deve ser 'expanding' ou 'rolling'")
+    if folds < 1 or val_size < 1:
+        raise ValueError("folds e val_size devem ser >= 1")
+    first_val = n - folds * val_size
+    if first_val < 2:
+        raise ValueError("Dados insuficientes para os folds pedidos")
+    if mode == "rolling":
+        train_size = int(train_size or first_val)
+        if train_size < 2 or train_size > first_val:
+            raise ValueError("train_size fora do intervalo [2, n - folds*val_size]")
+    out = []
+    for k in range(folds):
+        val_start = first_val + k * val_size
+        train_start = 0 if mode == "expanding" else val_start - train_size
+        out.append((train_start, val_start, val_start + val_size))
+    return out
+
+
+def window_slice(X: np.ndarray, seq_len: int, a: int, b: int) -> np.ndarray:
+    """Janelas (b-a, seq_len, F) das sequências [a, b) de X (n, F); copia só esse trecho.
+
+    A sequência i termina na linha i + seq_len - 1 (mesmo alinhamento de build_sequences),
+    então X pode ser um memmap grande sem ser lido inteiro.
+    """
+    view = np.lib.stride_tricks.sliding_window_view(X, seq_len, axis=0)  # (n-L+1, F, L)
+    return np.ascontiguousarray(view[a:b].transpose(0, 2, 1), dtype=np.float32)
+
+
+def save_arrays(data_dir: str, **arrays: np.ndarray) -> None:
+    """Grava arrays como <nome>.npy para serem abertos por memmap em outros processos."""
+    import os
+
+    for name, arr in arrays.items():
+        np.save(os.path.join(data_dir, f"{name}.npy"), np.ascontiguousarray(arr))
+
+
+def open_arrays(data_dir: str, *names: str) -> list[np.ndarray]:
+    """Abre <nome>.npy somente leitura por memmap (páginas compartilhadas via page cache)."""
+    import os
+
+    return [np.load(os.path.join(data_dir, f"{name}.npy"), mmap_mode="r") for name in names]
+
+
 def rolling_mape_from_futures(err_close: np.ndarray, real_close: np.ndarray) -> float:
     """MAPE(%) = mean(|err|/real)*100. Assume real_close > 0."""
     den = np.where(real_close == 0, 1e-9, real_close)
@@ -41,8 +41,96 @@ def build_lstm_multitask_model(cfg: LstmModelConfig):
     return model
 
 
+def make_epoch_throughput_callback(n_samples: int):
+    """Callback Keras que registra duração e amostras de treino/s de cada época.
 
+    O tempo inclui a validação do fim da época (é o custo real por época do fit).
+    """
+    import time
 
+    import tensorflow as tf
+
+    class EpochThroughput(tf.keras.callbacks.Callback):
+        def __init__(self):
+            super().__init__()
+            self.epochs: list[dict] = []
+            self._t0 = 0.0
+
+        def on_epoch_begin(self, epoch, logs=None):
+            self._t0 = time.perf_counter()
+
+        def on_epoch_end(self, epoch, logs=None):
+            dt = time.perf_counter() - self._t0
+            self.epochs.append(
+                {
+                    "epoch": int(epoch) + 1,
+                    "wall_s": dt,
+                    "samples_per_s": (n_samples / dt) if dt > 0 else None,
+                }
+            )
+
+    return EpochThroughput()
+
+
+_FIXED_AFFINE = None
+
+
+def fixed_affine_layer():
+    """Classe da camada y = x * scale + offset (por coluna, pesos fixos), registrada para o load_model.
 
+    Criada sob demanda para não importar tensorflow junto com este módulo.
+    """
+    global _FIXED_AFFINE
+    if _FIXED_AFFINE is None:
+        import tensorflow as tf
 
+        @tf.keras.utils.register_keras_serializable(package="btc_lstm")
+        class FixedAffine(tf.keras.layers.Layer):
+            def __init__(self, units: int, **kwargs):
+                super().__init__(**kwargs)
+                self.units = int(units)
+
+            def build(self, input_shape):
+                self.scale = self.add_weight(name="scale", shape=(self.units,), initializer="ones", trainable=False)
+                self.offset = self.add_weight(name="offset", shape=(self.units,), initializer="zeros", trainable=False)
+                super().build(input_shape)
+
+            def call(self, x):
+                return x * self.scale + self.offset
+
+            def get_config(self):
+                return {**super().get_config(), "units": self.units}
+
+        _FIXED_AFFINE = FixedAffine
+    return _FIXED_AFFINE
+
+
+def build_serving_model(model, scaler_x, scaler_y):
+    """Modelo de serving: features brutas -> (reg no espaço de preço, prob de alta).
+
+    Embute o MinMaxScaler de entrada (x * scale_ + min_) e o inverso do de saída
+    ((y - min_) / scale_) como camadas fixas em volta do modelo treinado. A
+    desnormalização roda em float64 para não perder precisão em preços ~1e5.
+    """
+    import numpy as np
+    import tensorflow as tf
 
+    FixedAffine = fixed_affine_layer()
+    seq_len, n_features = model.input_shape[1], model.input_shape[2]
+    n_targets = len(scaler_y.scale_)
+
+    inp = tf.keras.Input(shape=(seq_len, n_features), name="x_raw")
+    scale_x = FixedAffine(n_features, name="scale_x")
+    x = scale_x(inp)
+    scale_x.set_weights([
+        np.asarray(scaler_x.scale_, dtype="float32"),
+        np.asarray(scaler_x.min_, dtype="float32"),
+    ])
+    out = model(x)
+    unscale_y = FixedAffine(n_targets, dtype="float64", name="unscale_y")
+    reg = unscale_y(out["reg"])
+    unscale_y.set_weights([
+        1.0 / np.asarray(scaler_y.scale_, dtype="float64"),
+        -np.asarray(scaler_y.min_, dtype="float64") / np.asarray(scaler_y.scale_, dtype="float64"),
+    ])
+    return tf.keras.Model(inputs=inp, outputs={"reg": reg, "cls": out["cls"]}, name="btc_lstm_serving")
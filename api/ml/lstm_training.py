@@ -0,0 +1,197 @@
+"""Núcleo de treino/avaliação do LSTM, compartilhado pelo treino de produção
+(services/training_service.py) e pelo backtest walk-forward (services/backtest_service.py).
+
+fit_lstm recebe janelas brutas já separadas em treino/validação e devolve o modelo
+(melhor checkpoint), os scalers e o histórico; evaluate_close mede close_next pelo
+modelo de serving, o mesmo grafo usado na inferência.
+"""
+from __future__ import annotations
+
+import contextlib
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+import numpy as np
+
+from ml.features import TARGET_REG_COLS, exp_sample_weights
+from ml.lstm_model import LstmModelConfig, build_lstm_multitask_model, build_serving_model, make_epoch_throughput_callback
+
+
+@dataclass
+class FitResult:
+    model: Any
+    scaler_x: Any
+    scaler_y: Any
+    epochs: int
+    val_loss_best: Optional[float]
+    throughput: Any = None
+    history: dict = field(default_factory=dict)
+
+
+def _phase(prof, name: str):
+    return prof.phase(name) if prof is not None else contextlib.nullcontext()
+
+
+def limit_tf_threads(n_threads: int) -> None:
+    """Limita as threads do TensorFlow do processo (intra-op = n, inter-op = 1).
+
+    Deve rodar antes do primeiro uso do TensorFlow (initializer de process pool).
+    """
+    import os
+
+    n = str(max(int(n_threads), 1))
+    os.environ["OMP_NUM_THREADS"] = n
+    os.environ["TF_NUM_INTRAOP_THREADS"] = n
+    os.environ["TF_NUM_INTEROP_THREADS"] = "1"
+    os.environ.setdefault("TF_CPP_MIN_LOG_LEVEL", "2")
+    import tensorflow as tf
+
+    try:
+        tf.config.threading.set_intra_op_parallelism_threads(int(n))
+        tf.config.threading.set_inter_op_parallelism_threads(1)
+    except RuntimeError:
+        # runtime já inicializado neste processo: vale o que veio das variáveis de ambiente
+        pass
+
+
+def mean_absolute_percentage_error(y_true, y_pred):
+    y_true = np.asarray(y_true)
+    y_pred = np.asarray(y_pred)
+    den = np.where(y_true == 0, 1e-9, y_true)
+    return float((np.abs((y_true - y_pred) / den)).mean() * 100.0)
+
+
+def symmetric_mape(y_true, y_pred):
+    y_true = np.asarray(y_true)
+    y_pred = np.asarray(y_pred)
+    den = (np.abs(y_true) + np.abs(y_pred))
+    den = np.where(den == 0, 1e-9, den)
+    return float((2.0 * np.abs(y_pred - y_true) / den).mean() * 100.0)
+
+
+def fit_lstm(
+    X_train_raw: np.ndarray,
+    Yreg_train_raw: np.ndarray,
+    Ycls_train: np.ndarray,
+    X_val_raw: np.ndarray,
+    Yreg_val_raw: np.ndarray,
+    Ycls_val: np.ndarray,
+    *,
+    alpha: float,
+    epochs: int,
+    batch_size: int,
+    learning_rate: float,
+    patience: int,
+    checkpoint_path: str,
+    lstm_units: int = 64,
+    dense_units: int = 64,
+    dropout: float = 0.2,
+    callbacks: Optional[list] = None,
+    prof=None,
+) -> FitResult:
+    """Normaliza (fit só no treino), treina com early stopping e recarrega o melhor checkpoint.
+
+    callbacks: callbacks Keras extras (ex.: poda por val_loss na busca de hiperparâmetros).
+    """
+    from sklearn.preprocessing import MinMaxScaler
+    import tensorflow as tf
+
+    # Pesos exponenciais apenas no treino (mais peso ao recente)
+    w_train = exp_sample_weights(len(X_train_raw), alpha).astype("float32")
+
+    with _phase(prof, "scaling"):
+        scaler_x = MinMaxScaler()
+        scaler_y = MinMaxScaler()
+
+        X_train_2d = X_train_raw.reshape((X_train_raw.shape[0] * X_train_raw.shape[1], X_train_raw.shape[2]))
+        scaler_x.fit(X_train_2d)
+        X_train = scaler_x.transform(X_train_2d).reshape(X_train_raw.shape).astype("float32")
+
+        X_val_2d = X_val_raw.reshape((X_val_raw.shape[0] * X_val_raw.shape[1], X_val_raw.shape[2]))
+        X_val = scaler_x.transform(X_val_2d).reshape(X_val_raw.shape).astype("float32")
+
+        scaler_y.fit(Yreg_train_raw)
+        Yreg_train = scaler_y.transform(Yreg_train_raw).astype("float32")
+        Yreg_val = scaler_y.transform(Yreg_val_raw).astype("float32")
+
+    cfg = LstmModelConfig(
+        seq_len=X_train_raw.shape[1],
+        n_features=X_train_raw.shape[2],
+        n_reg_targets=Yreg_train_raw.shape[1],
+        lstm_units=int(lstm_units),
+        dense_units=int(dense_units),
+        dropout=float(dropout),
+        learning_rate=float(learning_rate),
+    )
+    with _phase(prof, "model_build"):
+        model = build_lstm_multitask_model(cfg)
+
+    throughput = make_epoch_throughput_callback(len(X_train))
+    callbacks = [
+        tf.keras.callbacks.EarlyStopping(monitor="val_loss", patience=int(patience), restore_best_weights=True),
+        tf.keras.callbacks.ModelCheckpoint(filepath=checkpoint_path, monitor="val_loss", save_best_only=True),
+        throughput,
+        *(callbacks or []),
+    ]
+
+    with _phase(prof, "fit"):
+        hist = model.fit(
+            X_train,
+            {"reg": Yreg_train, "cls": Ycls_train.astype("float32")},
+            validation_data=(X_val, {"reg": Yreg_val, "cls": Ycls_val.astype("float32")}),
+            epochs=int(epochs),
+            batch_size=int(batch_size),
+            sample_weight={"reg": w_train, "cls": w_train},
+            verbose=0,
+            callbacks=callbacks,
+        )
+    history = getattr(hist, "history", {}) or {}
+    epochs_ran = int(len(history.get("loss", [])) or 0)
+    try:
+        val_loss_best = float(min(history.get("val_loss", []))) if history.get("val_loss") else None
+    except Exception:
+        val_loss_best = None
+
+    # Carregar melhor checkpoint (se o callback salvou)
+    with _phase(prof, "checkpoint_reload"):
+        try:
+            model = tf.keras.models.load_model(checkpoint_path)
+        except Exception:
+            pass
+
+    return FitResult(
+        model=model, scaler_x=scaler_x, scaler_y=scaler_y, epochs=epochs_ran,
+        val_loss_best=val_loss_best, throughput=throughput, history=history,
+    )
+
+
+def evaluate_close(serving, X_val_raw: np.ndarray, Yreg_val_raw: np.ndarray, Ycls_val: Optional[np.ndarray] = None) -> dict:
+    """MAE/RMSE/MAPE/SMAPE de close_next (e acerto do head de direção, se Ycls_val), pelo modelo de serving."""
+    from sklearn.metrics import mean_absolute_error, mean_squared_error
+
+    pred = serving.predict(X_val_raw, verbose=0)
+    reg_pred = np.asarray(pred["reg"], dtype="float64")
+    close_idx = TARGET_REG_COLS.index("close_next")
+    y_true = np.asarray(Yreg_val_raw, dtype="float64")[:, close_idx]
+    y_pred = reg_pred[:, close_idx]
+    out = {
+        "mae": float(mean_absolute_error(y_true, y_pred)),
+        # scikit-learn 1.8+ removeu o parâmetro squared; usar sqrt() mantém compatibilidade
+        "rmse": float(np.sqrt(mean_squared_error(y_true, y_pred))),
+        "mape": mean_absolute_percentage_error(y_true, y_pred),
+        "smape": symmetric_mape(y_true, y_pred),
+    }
+    if Ycls_val is not None:
+        p_up = np.asarray(pred["cls"], dtype="float64").reshape(-1)
+        out["dir_acc"] = float(((p_up >= 0.5).astype(np.int64) == np.asarray(Ycls_val).reshape(-1)).mean())
+    return out
+
+
+def fit_and_evaluate(X_train_raw, Yreg_train_raw, Ycls_train, X_val_raw, Yreg_val_raw, Ycls_val, *,
+                     prof=None, **fit_kwargs) -> tuple[FitResult, Any, dict]:
+    """fit_lstm + modelo de serving + métricas de validação: (fit, serving, metrics)."""
+    fit = fit_lstm(X_train_raw, Yreg_train_raw, Ycls_train, X_val_raw, Yreg_val_raw, Ycls_val, prof=prof, **fit_kwargs)
+    with _phase(prof, "evaluate"):
+        serving = build_serving_model(fit.model, fit.scaler_x, fit.scaler_y)
+        metrics = evaluate_close(serving, X_val_raw, Yreg_val_raw, Ycls_val)
+    return fit, serving, metrics
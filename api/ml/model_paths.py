@@ -1,3 +1,25 @@
+import os
+
 from core.config import settings
 LSTM_MODEL_PATH = settings.LSTM_MODEL_PATH
-LSTM_BUNDLE_PATH = settings.LSTM_BUNDLE_PATH
\ No newline at end of file
+LSTM_BUNDLE_PATH = settings.LSTM_BUNDLE_PATH
+LSTM_SERVING_MODEL_PATH = settings.LSTM_SERVING_MODEL_PATH
+LSTM_COMPACT_BUNDLE_DIR = settings.LSTM_COMPACT_BUNDLE_DIR
+
+
+def _suffixed(path: str, interval: str) -> str:
+    root, ext = os.path.splitext(path)
+    return f"{root}_{interval}{ext}"
+
+
+def model_paths(interval: str | None = None) -> dict:
+    """Caminhos do modelo/bundle; modelos de intervalos agregados (rollups) ganham o sufixo _<interval>."""
+    paths = {
+        "model": LSTM_MODEL_PATH,
+        "bundle": LSTM_BUNDLE_PATH,
+        "serving": LSTM_SERVING_MODEL_PATH,
+        "compact": LSTM_COMPACT_BUNDLE_DIR,
+    }
+    if not interval or interval == (settings.BINANCE_INTERVAL or "5m"):
+        return paths
+    return {k: _suffixed(v, interval) for k, v in paths.items()}
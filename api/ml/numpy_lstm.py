@@ -0,0 +1,84 @@
+"""Forward do modelo de ml.lstm_model em NumPy, a partir do bundle compacto (ml/bundle_format.py).
+
+Equivale ao modelo de serving: normalização da entrada, LSTM (portas na ordem do
+Keras: i, f, c, o), dense ReLU e as cabeças reg (desnormalizada em float64) e cls
+(sigmoide). Dropout não atua na inferência. Os pesos são views do np.memmap.
+"""
+from __future__ import annotations
+
+import numpy as np
+
+from ml.bundle_format import AffineScaler, BundleFormatError
+
+_ACTIVATIONS = {
+    "tanh": np.tanh,
+    "sigmoid": lambda z: 0.5 * (1.0 + np.tanh(0.5 * z)),  # = 1/(1+e^-z), sem overflow
+    "relu": lambda z: np.maximum(z, 0.0),
+    "linear": lambda z: z,
+    None: lambda z: z,
+}
+
+
+def _activation(name):
+    try:
+        return _ACTIVATIONS[name]
+    except KeyError:
+        raise BundleFormatError(f"Ativação não suportada no forward NumPy: {name}") from None
+
+
+class NumpyLstmModel:
+    def __init__(self, manifest: dict, tensors: dict[str, np.ndarray]):
+        self.seq_len = int(manifest["seq_len"])
+        self.scaler_x = AffineScaler(manifest["scaler_x"]["scale"], manifest["scaler_x"]["min"])
+        self.scaler_y = AffineScaler(manifest["scaler_y"]["scale"], manifest["scaler_y"]["min"])
+        self._x_scale = self.scaler_x.scale_.astype(np.float32)
+        self._x_min = self.scaler_x.min_.astype(np.float32)
+        arch = manifest["arch"]
+        self.units = int(arch["lstm"]["units"])
+        self._act = _activation(arch["lstm"].get("activation", "tanh"))
+        self._rec_act = _activation(arch["lstm"].get("recurrent_activation", "sigmoid"))
+        self._dense_act = _activation(arch["dense"].get("activation", "relu"))
+        self._cls_act = _activation(arch["cls"].get("activation", "sigmoid"))
+        self.t = tensors
+        if self.t["lstm/kernel"].shape[1] != 4 * self.units:
+            raise BundleFormatError("lstm/kernel incompatível com o número de unidades")
+
+    def forward(self, X_raw: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """(n, seq_len, F) brutos -> (reg no espaço de preço (n, T) float64, prob de alta (n,))."""
+        X = np.asarray(X_raw, dtype=np.float32) * self._x_scale + self._x_min
+        n, steps, _ = X.shape
+        U = self.units
+        # projeção da entrada de todos os passos numa matmul só
+        zx = (X.reshape((n * steps, -1)) @ self.t["lstm/kernel"] + self.t["lstm/bias"]).reshape((n, steps, 4 * U))
+        U_rec = self.t["lstm/recurrent_kernel"]
+        h = np.zeros((n, U), dtype=np.float32)
+        c = np.zeros((n, U), dtype=np.float32)
+        for s in range(steps):
+            z = zx[:, s, :] + h @ U_rec
+            i = self._rec_act(z[:, :U])
+            f = self._rec_act(z[:, U:2 * U])
+            g = self._act(z[:, 2 * U:3 * U])
+            o = self._rec_act(z[:, 3 * U:])
+            c = f * c + i * g
+            h = o * self._act(c)
+        d = self._dense_act(h @ self.t["dense/kernel"] + self.t["dense/bias"])
+        reg_scaled = d @ self.t["reg/kernel"] + self.t["reg/bias"]
+        prob = self._cls_act(d @ self.t["cls/kernel"] + self.t["cls/bias"]).reshape((-1,))
+        return self.scaler_y.inverse_transform(reg_scaled.astype(np.float64)), prob.astype(np.float32)
+
+    def predict(self, X_raw: np.ndarray, verbose: int = 0, batch_size: int = 4096) -> dict:
+        """Mesma interface do Keras usada em LstmBundle.predict ({"reg", "cls"})."""
+        X_raw = np.asarray(X_raw, dtype=np.float32)
+        regs, probs = [], []
+        for start in range(0, len(X_raw), max(int(batch_size), 1)):
+            reg, prob = self.forward(X_raw[start:start + batch_size])
+            regs.append(reg)
+            probs.append(prob)
+        if not regs:
+            n_targets = len(self.scaler_y.scale_)
+            return {"reg": np.zeros((0, n_targets)), "cls": np.zeros((0, 1), dtype=np.float32)}
+        return {"reg": np.concatenate(regs), "cls": np.concatenate(probs).reshape((-1, 1))}
+
+    def __call__(self, X_raw: np.ndarray, training: bool = False) -> dict:
+        reg, prob = self.forward(X_raw)
+        return {"reg": reg, "cls": prob.reshape((-1, 1))}
@@ -0,0 +1,81 @@
+"""Rollout recursivo de k passos, vetorizado sobre muitas origens.
+
+A cada passo um único forward prevê o próximo candle de todas as origens; o OHLC
+previsto volta como candle "observado" pelas mesmas definições de ml.features:
+- close = close_next previsto; ret/acc a partir dos closes;
+- amp = high_next - low_next previstos;
+- vol_rel: o modelo não prevê volume; assume-se o volume igual à média dos últimos 10
+  (então vol_rel do passo previsto = v / média(9 anteriores + v)).
+"""
+from __future__ import annotations
+
+from typing import Callable
+
+import numpy as np
+
+from ml.streaming_features import VOL_WINDOW
+
+PredictFn = Callable[[np.ndarray], tuple[np.ndarray, np.ndarray]]
+
+
+def origin_windows(X: np.ndarray, ohlcv: np.ndarray, origins: np.ndarray, seq_len: int) -> tuple[np.ndarray, np.ndarray]:
+    """Janelas (N, seq_len, F) e históricos OHLCV (N, VOL_WINDOW, 5) que terminam em cada origem."""
+    X = np.asarray(X, dtype=np.float32)
+    ohlcv = np.asarray(ohlcv, dtype=np.float64)
+    origins = np.asarray(origins, dtype=np.int64)
+    if origins.size and origins.min() < max(seq_len, VOL_WINDOW) - 1:
+        raise ValueError("origem sem histórico suficiente")
+    win_view = np.lib.stride_tricks.sliding_window_view(X, seq_len, axis=0)  # (n-L+1, F, L)
+    hist_view = np.lib.stride_tricks.sliding_window_view(ohlcv, VOL_WINDOW, axis=0)  # (n-W+1, 5, W)
+    windows = np.ascontiguousarray(win_view[origins - (seq_len - 1)].transpose(0, 2, 1))
+    hist = np.ascontiguousarray(hist_view[origins - (VOL_WINDOW - 1)].transpose(0, 2, 1))
+    return windows, hist
+
+
+def rollout(predict: PredictFn, windows: np.ndarray, hist_ohlcv: np.ndarray, feature_cols: list[str],
+            target_cols: list[str], horizon: int) -> tuple[np.ndarray, np.ndarray]:
+    """Caminhos previstos de 'horizon' passos para N origens.
+
+    windows: (N, seq_len, F) features brutas na ordem de feature_cols;
+    hist_ohlcv: (N, VOL_WINDOW, 5) últimos candles reais de cada origem.
+    Retorna (paths (N, horizon, T) na ordem de target_cols, prob_up (N, horizon)).
+    """
+    if horizon < 1:
+        raise ValueError("horizon deve ser >= 1")
+    known = {"close", "ret", "acc", "amp", "vol_rel"}
+    unknown = [c for c in feature_cols if c not in known]
+    if unknown:
+        raise ValueError(f"features sem regra de rollout: {unknown}")
+    t = {c: target_cols.index(c) for c in ("high_next", "low_next", "close_next")}
+
+    win = np.asarray(windows, dtype=np.float32).copy()
+    hist = np.asarray(hist_ohlcv, dtype=np.float64)
+    n = len(win)
+    prev_close = hist[:, -1, 3].copy()
+    prev_ret = hist[:, -1, 3] / hist[:, -2, 3] - 1.0
+    volumes = hist[:, :, 4].copy()
+
+    paths = np.empty((n, horizon, len(target_cols)), dtype=np.float64)
+    probs = np.empty((n, horizon), dtype=np.float32)
+    for k in range(horizon):
+        reg, prob = predict(win)
+        paths[:, k, :] = reg
+        probs[:, k] = prob
+        if k == horizon - 1:
+            break
+        close = reg[:, t["close_next"]]
+        v = volumes.mean(axis=1)
+        volumes = np.concatenate([volumes[:, 1:], v[:, None]], axis=1)
+        ret = close / prev_close - 1.0
+        cols = {
+            "close": close,
+            "ret": ret,
+            "acc": ret - prev_ret,
+            "amp": reg[:, t["high_next"]] - reg[:, t["low_next"]],
+            "vol_rel": v / volumes.mean(axis=1),
+        }
+        feats = np.column_stack([cols[c] for c in feature_cols]).astype(np.float32)
+        win[:, :-1, :] = win[:, 1:, :]
+        win[:, -1, :] = feats
+        prev_close, prev_ret = close, ret
+    return paths, probs
@@ -0,0 +1,129 @@
+"""Cálculo de features sem DataFrame: incremental (O(1) por candle) e em lote (NumPy).
+
+Mesmas definições de ml.features.build_features_targets:
+- ret     = close / close[t-1] - 1          (pct_change)
+- acc     = ret - ret[t-1]                  (diff)
+- amp     = high - low
+- vol_rel = volume / média(volume[t-9..t])  (rolling(10).mean)
+
+ret/acc/amp são idênticos bit a bit à versão pandas. vol_rel difere no máximo em
+arredondamento (~1e-15 relativo): o pandas mantém uma soma corrente compensada,
+aqui a soma das 10 janelas é refeita a cada ponto. Ver bench/parity.py.
+"""
+from __future__ import annotations
+
+from collections import deque
+from typing import Optional
+
+import numpy as np
+
+from ml.features import FEATURE_COLS, TARGET_REG_COLS
+
+VOL_WINDOW = 10
+
+
+class StreamingFeatureEngine:
+    """Estado mínimo para calcular as features do próximo candle em O(1)."""
+
+    def __init__(self):
+        self.prev_close: Optional[float] = None
+        self.prev_ret: Optional[float] = None
+        self.volumes: deque = deque(maxlen=VOL_WINDOW)
+
+    @classmethod
+    def from_history(cls, close: np.ndarray, volume: np.ndarray) -> "StreamingFeatureEngine":
+        """Reconstrói o estado a partir dos últimos candles (bastam os 10 mais recentes)."""
+        eng = cls()
+        close = np.asarray(close, dtype=np.float64)[-VOL_WINDOW:]
+        volume = np.asarray(volume, dtype=np.float64)[-VOL_WINDOW:]
+        if len(close) >= 1:
+            eng.prev_close = float(close[-1])
+        if len(close) >= 2:
+            eng.prev_ret = float(close[-1] / close[-2] - 1.0)
+        eng.volumes.extend(float(v) for v in volume)
+        return eng
+
+    def copy(self) -> "StreamingFeatureEngine":
+        eng = StreamingFeatureEngine()
+        eng.prev_close, eng.prev_ret = self.prev_close, self.prev_ret
+        eng.volumes.extend(self.volumes)
+        return eng
+
+    def peek(self, open_: float, high: float, low: float, close: float, volume: float) -> np.ndarray:
+        """Features (float64, ordem de FEATURE_COLS) do candle informado, sem alterar o estado."""
+        ret = acc = vol_rel = np.nan
+        if self.prev_close is not None:
+            ret = close / self.prev_close - 1.0
+            if self.prev_ret is not None:
+                acc = ret - self.prev_ret
+        if len(self.volumes) >= VOL_WINDOW - 1:
+            window = list(self.volumes)[-(VOL_WINDOW - 1):] + [volume]
+            vol_rel = volume / (float(np.sum(window)) / VOL_WINDOW)
+        values = {"close": close, "ret": ret, "acc": acc, "amp": high - low, "vol_rel": vol_rel}
+        return np.asarray([values[c] for c in FEATURE_COLS], dtype=np.float64)
+
+    def update(self, open_: float, high: float, low: float, close: float, volume: float) -> np.ndarray:
+        """Incorpora o candle e devolve suas features."""
+        feats = self.peek(open_, high, low, close, volume)
+        if self.prev_close is not None:
+            self.prev_ret = close / self.prev_close - 1.0
+        self.prev_close = close
+        self.volumes.append(float(volume))
+        return feats
+
+
+def compute_features_batch(close: np.ndarray, high: np.ndarray, low: np.ndarray, volume: np.ndarray) -> np.ndarray:
+    """Features (n, len(FEATURE_COLS)) float64 para arrays brutos; NaN onde não há histórico."""
+    close = np.asarray(close, dtype=np.float64)
+    high = np.asarray(high, dtype=np.float64)
+    low = np.asarray(low, dtype=np.float64)
+    volume = np.asarray(volume, dtype=np.float64)
+    n = len(close)
+    ret = np.full(n, np.nan)
+    acc = np.full(n, np.nan)
+    vol_rel = np.full(n, np.nan)
+    if n >= 2:
+        ret[1:] = close[1:] / close[:-1] - 1.0
+    if n >= 3:
+        acc[2:] = ret[2:] - ret[1:-1]
+    if n >= VOL_WINDOW:
+        sums = np.lib.stride_tricks.sliding_window_view(volume, VOL_WINDOW).sum(axis=1)
+        vol_rel[VOL_WINDOW - 1:] = volume[VOL_WINDOW - 1:] / (sums / VOL_WINDOW)
+    cols = {"close": close, "ret": ret, "acc": acc, "amp": high - low, "vol_rel": vol_rel}
+    return np.column_stack([cols[c] for c in FEATURE_COLS])
+
+
+def compute_targets_batch(open_: np.ndarray, high: np.ndarray, low: np.ndarray, close: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Targets do próximo candle: (Yreg (n, len(TARGET_REG_COLS)), dir_next (n,)). Última linha = NaN."""
+    open_ = np.asarray(open_, dtype=np.float64)
+    high = np.asarray(high, dtype=np.float64)
+    low = np.asarray(low, dtype=np.float64)
+    close = np.asarray(close, dtype=np.float64)
+    n = len(close)
+
+    def shift(a):
+        out = np.full(n, np.nan)
+        out[:-1] = a[1:]
+        return out
+
+    cols = {
+        "open_next": shift(open_),
+        "high_next": shift(high),
+        "low_next": shift(low),
+        "close_next": shift(close),
+        "amp_next": shift(high) - shift(low),
+    }
+    dir_next = np.zeros(n, dtype=np.int64)
+    dir_next[:-1] = (close[1:] > close[:-1]).astype(np.int64)
+    return np.column_stack([cols[c] for c in TARGET_REG_COLS]), dir_next
+
+
+def build_features_targets_np(open_, high, low, close, volume):
+    """Equivalente em NumPy de build_features_targets (inclui o dropna).
+
+    Retorna (keep, X, Yreg, Ycls): 'keep' são os índices das linhas de entrada mantidas.
+    """
+    X = compute_features_batch(close, high, low, volume)
+    Yreg, Ycls = compute_targets_batch(open_, high, low, close)
+    keep = np.flatnonzero(~(np.isnan(X).any(axis=1) | np.isnan(Yreg).any(axis=1)))
+    return keep, X[keep], Yreg[keep], Ycls[keep]
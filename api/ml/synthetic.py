@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+
+_INTERVAL_SECONDS = {"m": 60, "h": 3600, "d": 86400, "w": 7 * 86400}
+
+
+def interval_seconds(interval: str) -> int:
+    """'5m' -> 300, '1h' -> 3600 etc. (mesma convenção da Binance)."""
+    return _INTERVAL_SECONDS[interval[-1]] * int(interval[:-1])
+
+
+def candles_for_days(days: float, interval: str = "5m") -> int:
+    """Número de candles que cabem em 'days' dias no intervalo informado."""
+    return max(1, int(round(days * 86400 / interval_seconds(interval))))
+
+
+def synthetic_candles(
+    n: int,
+    interval: str = "5m",
+    end: Optional[datetime] = None,
+    seed: int = 42,
+    start_price: float = 60_000.0,
+    volatility: float = 0.0015,
+) -> pd.DataFrame:
+    """Gera uma série OHLCV sintética e determinística (mesma seed => mesmos dados).
+
+    O close segue um passeio aleatório log-normal com regimes de volatilidade;
+    high/low envolvem open/close e o volume é log-normal correlacionado com |ret|.
+    O último candle termina em 'end' (padrão: agora, arredondado ao intervalo),
+    para que consultas do tipo "NOW() - N days" enxerguem a série inteira.
+
+    Retorna DataFrame com colunas time, open, high, low, close, volume
+    (mesmo formato de normalize_klines_payload / btc_candles).
+    """
+    if n <= 0:
+        raise ValueError("n deve ser > 0")
+    rng = np.random.default_rng(seed)
+    step = interval_seconds(interval)
+
+    # regimes de volatilidade (blocos de ~1 dia) para não gerar uma série "plana" demais
+    block = max(1, 86400 // step)
+    n_blocks = (n + block - 1) // block
+    regime = np.repeat(rng.uniform(0.5, 2.0, size=n_blocks), block)[:n]
+    log_ret = rng.standard_normal(n) * volatility * regime
+    close = start_price * np.exp(np.cumsum(log_ret))
+    open_ = np.empty(n)
+    open_[0] = start_price
+    open_[1:] = close[:-1]
+    wick = np.abs(rng.standard_normal((2, n))) * volatility * regime * close * 0.5
+    high = np.maximum(open_, close) + wick[0]
+    low = np.minimum(open_, close) - wick[1]
+    volume = rng.lognormal(mean=3.0, sigma=0.5, size=n) * (1.0 + 200.0 * np.abs(log_ret))
+
+    end_ts = pd.Timestamp(end if end is not None else datetime.utcnow())
+    if end_ts.tzinfo is not None:
+        end_ts = end_ts.tz_convert(None)
+    times = pd.date_range(end=end_ts.floor(f"{step}s"), periods=n, freq=f"{step}s")
+
+    return pd.DataFrame(
+        {
+            "time": times,
+            "open": np.round(open_, 2),
+            "high": np.round(high, 2),
+            "low": np.round(low, 2),
+            "close": np.round(close, 2),
+            "volume": np.round(volume, 5),
+        }
+    )
+
+
+
+def synthetic_klines_payload(df: pd.DataFrame, interval: str = "5m") -> list:
+    """Converte um DataFrame OHLCV no payload bruto de /api/v3/klines da Binance."""
+    step_ms = interval_seconds(interval) * 1000
+    open_ms = (pd.to_datetime(df["time"]).to_numpy(dtype="datetime64[ms]").astype(np.int64)).tolist()
+    cols = [df[k].to_numpy(dtype=float).tolist() for k in ("open", "high", "low", "close", "volume")]
+    out = []
+    for t, o, h, l, c, v in zip(open_ms, *cols):
+        out.append([
+            t, f"{o:.2f}", f"{h:.2f}", f"{l:.2f}", f"{c:.2f}", f"{v:.5f}",
+            t + step_ms - 1, f"{v * c:.2f}", 100, f"{v / 2:.5f}", f"{v * c / 2:.2f}", "0",
+        ])
+    return out
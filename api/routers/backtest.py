@@ -0,0 +1,31 @@
+from fastapi import APIRouter, Query
+from typing import List, Literal, Optional
+from schemas.backtest import BacktestFold, BacktestRunResponse, BacktestRunSummary
+from services.backtest_service import get_run_folds, list_runs, run_backtest
+
+router = APIRouter(prefix="/backtest", tags=["backtest"])
+
+@router.post("", response_model=BacktestRunResponse, summary="Backtest walk-forward", description="Treina e avalia o LSTM em K folds walk-forward (treino expanding ou rolling) sobre a janela de dias, em processos paralelos. Grava métricas por fold e agregadas (média/desvio) em backtest_runs/backtest_folds.")
+def backtest(
+	days: int = Query(90, ge=1, le=90),
+	folds: Optional[int] = Query(None, ge=1, le=20),
+	mode: Optional[Literal["expanding", "rolling"]] = Query(None),
+	val_size: Optional[int] = Query(None, ge=50),
+	train_size: Optional[int] = Query(None, ge=100),
+	alpha: Optional[float] = Query(None, gt=0, le=1),
+	epochs: Optional[int] = Query(None, ge=1),
+	workers: Optional[int] = Query(None, ge=1, le=16),
+	tf_threads: Optional[int] = Query(None, ge=1, le=64),
+):
+	return run_backtest(
+		days=days, folds=folds, mode=mode, val_size=val_size, train_size=train_size,
+		alpha=alpha, epochs=epochs, workers=workers, tf_threads=tf_threads,
+	)
+
+@router.get("/runs", response_model=List[BacktestRunSummary], summary="Runs de backtest", description="Últimos runs com parâmetros e métricas agregadas, para comparar políticas de retreino.")
+def runs(limit: int = Query(20, ge=1, le=200)):
+	return list_runs(limit)
+
+@router.get("/runs/{run_id}/folds", response_model=List[BacktestFold], summary="Folds de um run de backtest")
+def run_folds(run_id: int):
+	return get_run_folds(run_id)
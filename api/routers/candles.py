@@ -0,0 +1,17 @@
+from fastapi import APIRouter, Query
+from typing import Optional
+from schemas.candles import CandlesResponse
+from services.candles_service import list_pairs, load_candles
+
+router = APIRouter(prefix="/candles", tags=["candles"])
+
+@router.get("", response_model=CandlesResponse, summary="Candles por par", description="Candles de um par (symbol, interval) da WATCHLIST, lidos de btc_candles pela PK (symbol, interval, time), ou de uma resolução agregada do par principal (candle_rollups). Sem start/end, retorna os 'limit' mais recentes.")
+def candles(symbol: Optional[str]=Query(None, description="Ex.: ETHUSDT (padrão: BINANCE_SYMBOL)"), interval: Optional[str]=Query(None, description="Ex.: 1m (padrão: BINANCE_INTERVAL)"), start: Optional[str]=Query(None), end: Optional[str]=Query(None), limit: int=Query(1000, ge=1, le=10000)):
+	try:
+		return load_candles(symbol, interval, start=start, end=end, limit=limit)
+	except Exception as e:
+		return {"status":"error","message": str(e)}
+
+@router.get("/pairs", summary="Pares disponíveis", description="Par principal, pares da WATCHLIST e resoluções agregadas disponíveis em /candles.")
+def candles_pairs():
+	return list_pairs()
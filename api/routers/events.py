@@ -0,0 +1,32 @@
+import asyncio
+from fastapi import APIRouter, Query, Request
+from fastapi.responses import StreamingResponse
+from typing import Optional
+from core import notify
+from core.config import settings
+
+router = APIRouter(prefix="/events", tags=["events"])
+
+@router.get("", summary="Eventos de candles e previsões novos (SSE)", description="Server-Sent Events: 'candles' a cada candle novo gravado (por par, com até 20 candles) e 'futures' a cada previsão gravada em 'futures'. Os eventos vêm do LISTEN/NOTIFY do Postgres por uma única conexão por worker, compartilhada por todos os clientes. Substitui o polling de /series/cached e /futures.")
+async def events(request: Request, channels: Optional[str]=Query(None, description="Canais separados por vírgula (candles,futures); padrão: todos")):
+	chans = [c.strip() for c in channels.split(",") if c.strip()] if channels else list(notify.CHANNELS)
+	unknown = [c for c in chans if c not in notify.CHANNELS]
+	if unknown or not chans:
+		return {"status":"error","message": f"canais inválidos: {unknown}; use {list(notify.CHANNELS)}"}
+	sub = notify.subscribe(chans)
+
+	async def stream():
+		try:
+			yield b"retry: 5000\n\n"
+			while not await request.is_disconnected():
+				try:
+					channel, payload = await asyncio.wait_for(sub.queue.get(), timeout=float(settings.EVENTS_HEARTBEAT_SECONDS))
+				except asyncio.TimeoutError:
+					# mantém a conexão viva através de proxies e detecta cliente desconectado
+					yield b": ping\n\n"
+					continue
+				yield f"event: {channel}\ndata: {payload}\n\n".encode("utf-8")
+		finally:
+			notify.unsubscribe(sub)
+
+	return StreamingResponse(stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
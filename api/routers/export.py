@@ -0,0 +1,19 @@
+from fastapi import APIRouter, Query
+from fastapi.responses import StreamingResponse
+from typing import Optional
+from services.export_service import DATASETS, FORMATS, MEDIA_TYPES, stream_dataset
+
+router = APIRouter(prefix="/export", tags=["export"])
+
+@router.get("/{dataset}", summary="Exporta um dataset em Parquet/Arrow", description="Transmite candles (btc_candles), features (candle_features), series_cache ou futures do intervalo [start, end] como Parquet ou Arrow IPC (stream), lidos do banco em lotes (EXPORT_BATCH_ROWS) por cursor server-side e escritos na resposta à medida que chegam.")
+def export_dataset(dataset: str, start: Optional[str]=Query(None), end: Optional[str]=Query(None), format: str=Query("parquet", description="parquet | arrow")):
+	if dataset not in DATASETS:
+		return {"status":"error","message": f"dataset inválido; use um de {sorted(DATASETS)}"}
+	if format not in FORMATS:
+		return {"status":"error","message": f"format inválido; use um de {sorted(FORMATS)}"}
+	filename = dataset + FORMATS[format]
+	return StreamingResponse(
+		stream_dataset(dataset, format, start, end),
+		media_type=MEDIA_TYPES[format],
+		headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+	)
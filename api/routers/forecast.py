@@ -0,0 +1,20 @@
+from fastapi import APIRouter, Query
+from typing import Optional
+from schemas.forecast import ForecastBacktestResponse, ForecastResponse
+from services.forecast_service import backtest, forecast
+
+router = APIRouter(prefix="/forecast", tags=["forecast"])
+
+@router.get("", response_model=ForecastResponse, summary="Previsão de k passos", description="Rola o modelo recursivamente a partir do último candle: cada OHLC previsto volta como entrada pelas mesmas definições de features. O volume futuro é assumido igual à média dos últimos 10 candles.")
+def forecast_route(horizon: int = Query(12, ge=1, le=288)):
+	try:
+		return forecast(horizon)
+	except Exception as e:
+		return {"status":"error","message": str(e)}
+
+@router.get("/backtest", response_model=ForecastBacktestResponse, summary="Backtest multi-horizonte do rollout", description="Roda o rollout de k passos a partir de todas as origens da janela (um forward em lote por passo) e retorna MAE, MAPE e acerto de direção de close por passo.")
+def forecast_backtest(horizon: int = Query(12, ge=1, le=288), days: Optional[int] = Query(None, ge=1, le=90), stride: int = Query(1, ge=1)):
+	try:
+		return backtest(horizon, days=days, stride=stride)
+	except Exception as e:
+		return {"status":"error","message": str(e)}
@@ -1,17 +1,23 @@
 from fastapi import APIRouter, Query
+from fastapi.responses import StreamingResponse
 from typing import Optional
-from services.futures_service import save_predictions_for_times, load_futuros_series
+from core.fast_json import FastJSONResponse
+from core.streaming import NDJSON_MEDIA_TYPE, ndjson_chunks
+from services.futures_service import save_predictions_for_times, load_futuros_series, iter_futuros_series, page_futuros_series
 from models.schemas import FuturesResponse, FutUpdateResponse
+from schemas.futures import FuturesErrorsResponse, FuturesPageResponse
+from services import error_analytics_service
 
 router = APIRouter(prefix="/futures", tags=["futures"])
 
 @router.post("/update", response_model=FutUpdateResponse, summary="Atualiza 'futures' para o último timestamp", description="Calcula a previsão prospectiva (t→t+1) para o último candle disponível e persiste em 'futures'.")
 def futures_update():
 	# Atualiza somente o último timestamp disponível para evitar retro-preenchimento
+	from core import market
 	from core.db import pg_conn
 	with pg_conn() as conn:
 		with conn.cursor() as cur:
-			cur.execute("SELECT MAX(time) FROM btc_candles")
+			cur.execute(f"SELECT MAX(time) FROM btc_candles WHERE {market.PAIR_WHERE}", market.primary_pair())
 			row = cur.fetchone()
 			last_time = row[0] if row else None
 	if not last_time:
@@ -23,6 +29,30 @@ def futures_update():
 		# Se o modelo ainda não está pronto, não derruba o endpoint (ajuda monitoramento)
 		return {"status":"ok","updated": 0, "message": str(e)}
 
-@router.get("", response_model=FuturesResponse, summary="Série prospectiva 'futures'", description="Retorna a série de previsões prospectivas (pred_close × real_close × err_close) alinhadas por timestamp.")
-def futures_series(start: Optional[str]=Query(None), end: Optional[str]=Query(None), limit: Optional[int]=Query(None, ge=1, le=10000)):
-    return load_futuros_series(start, end, limit=limit)
+@router.get("", response_model=FuturesResponse, summary="Série prospectiva 'futures'", description="Retorna a série de previsões prospectivas (pred_close × real_close × err_close) alinhadas por timestamp. Com stream=true responde NDJSON (um ponto por linha), lido do banco em lotes.")
+def futures_series(start: Optional[str]=Query(None), end: Optional[str]=Query(None), limit: Optional[int]=Query(None, ge=1, le=10000), stream: bool=Query(False, description="true = resposta NDJSON (application/x-ndjson)")):
+    if stream:
+        return StreamingResponse(ndjson_chunks(iter_futuros_series(start, end, limit=limit)), media_type=NDJSON_MEDIA_TYPE)
+    return FastJSONResponse(load_futuros_series(start, end, limit=limit))
+
+@router.get("/page", response_model=FuturesPageResponse, summary="Série 'futures' paginada (keyset)", description="Página de 'futures' ordenada por time, a partir de um cursor opaco (time > cursor em asc, time < cursor em desc). Sem cursor começa do início (asc) ou do fim (desc). Em asc, repetir a chamada com next_cursor retorna só as previsões novas (polling barato).")
+def futures_page(cursor: Optional[str]=Query(None, description="next_cursor da página anterior (opaco)"), limit: int=Query(1000, ge=1, le=10000), direction: str=Query("asc", description="asc | desc (ignorado quando há cursor)"), start: Optional[str]=Query(None), end: Optional[str]=Query(None)):
+    try:
+        return FastJSONResponse(page_futuros_series(cursor, limit=limit, direction=direction, start=start, end=end))
+    except ValueError as e:
+        return {"status":"error","message": str(e),"points":[]}
+
+@router.get("/errors", response_model=FuturesErrorsResponse, summary="Agregados de erro de 'futures'", description="MAPE, MAE, viés (pred - real), taxa de acerto de direção e quantis de |err_close| (p50/p90/p99) nas últimas N linhas de 'futures', para cada janela configurada (FUTURES_ERROR_WINDOWS + FUTURES_ROLLING_N). Os agregados são atualizados a cada gravação em 'futures'; a leitura não varre a tabela.")
+def futures_errors(windows: Optional[str] = Query(None, description="Janelas separadas por vírgula (ex.: 288,2016); padrão: as configuradas")):
+    try:
+        ns = [int(x) for x in windows.split(",") if x.strip()] if windows else None
+        return {"status":"ok","windows": error_analytics_service.get_all_stats(ns)}
+    except Exception as e:
+        return {"status":"error","message": str(e)}
+
+@router.post("/errors/rebuild", response_model=FuturesErrorsResponse, summary="Recalcula os agregados de erro", description="Recalcula todas as janelas configuradas a partir de 'futures' (ex.: após mudar FUTURES_ERROR_WINDOWS).")
+def futures_errors_rebuild():
+    try:
+        return {"status":"ok","windows": error_analytics_service.rebuild_all()}
+    except Exception as e:
+        return {"status":"error","message": str(e)}
@@ -1,18 +1,27 @@
 from fastapi import APIRouter
-from services.ingestion_service import fetch_binance_klines, upsert_candles
+from services.ingestion_service import fetch_watchlist, upsert_many
 from services.futures_service import save_predictions_for_times
+from core import market
 from core.logging import log_job
 from datetime import datetime
-from models.schemas import IngestResponse
+from schemas.ingest import IngestWatchlistResponse
 
 router = APIRouter(prefix="/ingest", tags=["ingest"])
 
-@router.post("", response_model=IngestResponse, summary="Ingestão de candles recentes", description="Busca klines na Binance e upserta em btc_candles. Atualiza a série prospectiva 'futuros' para o último timestamp válido.")
+
+@router.post("", response_model=IngestWatchlistResponse, summary="Ingestão de candles recentes", description="Busca klines na Binance para todos os pares da WATCHLIST em paralelo e upserta em btc_candles num único INSERT em lote. Atualiza a série prospectiva 'futuros' (par principal) para o último timestamp válido.")
 def ingest():
 	start = datetime.utcnow()
 	try:
-		df = fetch_binance_klines()
-		inserted = upsert_candles(df)
+		primary = market.primary_pair()
+		fetched = fetch_watchlist()
+		if isinstance(fetched.get(primary), Exception):
+			raise fetched[primary]
+		failed = {market.pair_key(p): str(v) for p, v in fetched.items() if isinstance(v, Exception)}
+		frames = {p: v for p, v in fetched.items() if not isinstance(v, Exception)}
+		counts = upsert_many(frames)
+		inserted = counts.get(primary, 0)
+		df = frames[primary]
 		# Usar penúltimo timestamp (tem par com T-1 nas features)
 		last_valid_time = df["time"].iloc[-2] if len(df) >= 2 else None
 		updated = 0
@@ -24,8 +33,14 @@ def ingest():
 				# Se o modelo ainda não foi treinado, não derruba a ingestão
 				warn = f"futures_update_failed: {e}"
 				updated = 0
-		log_job("ingest","ok",f"Inserted {inserted}; futures_updated {updated}" + (f"; {warn}" if warn else ""),start,datetime.utcnow())
-		out = {"status":"ok","inserted":inserted, "futures_updated": updated}
+		pairs = {market.pair_key(p): n for p, n in counts.items()}
+		msg = f"Inserted {inserted}; futures_updated {updated}"
+		if len(pairs) > 1:
+			msg += "; pairs " + ", ".join(f"{k}={n}" for k, n in pairs.items())
+		if failed:
+			msg += "; failed " + ", ".join(failed)
+		log_job("ingest","ok",msg + (f"; {warn}" if warn else ""),start,datetime.utcnow())
+		out = {"status":"ok","inserted":inserted, "futures_updated": updated, "pairs": pairs, "failed": failed}
 		if warn:
 			out["message"] = warn
 		return out
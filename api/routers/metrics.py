@@ -1,7 +1,7 @@
 from fastapi import APIRouter
 from datetime import datetime
 from core.db import pg_conn
-from ml.features import build_features_targets
+from services.feature_store_service import load_feature_window
 from core.config import settings
 from models.schemas import MetricsResponse
 
@@ -39,22 +39,10 @@ def parse_metrics(msg: str):
 
 def compute_validation_start_iso() -> str | None:
 	# Reconstroi a janela usada no treino (LOOKBACK_DAYS) e aplica a mesma regra de split
-	from pandas import read_sql
 	try:
-		with pg_conn() as conn:
-			df = read_sql(
-				"""
-				SELECT time, open, high, low, close, volume
-				FROM btc_candles
-				WHERE time >= NOW() - INTERVAL %s
-				ORDER BY time
-				""",
-				conn,
-				params=(f"{settings.LOOKBACK_DAYS} days",),
-			)
-		if df.empty:
+		df2, X, _, _, n_candles = load_feature_window(days=settings.LOOKBACK_DAYS)
+		if n_candles == 0:
 			return None
-		df2, X, *_ = build_features_targets(df)
 		n = len(X)
 		if n == 0:
 			return None
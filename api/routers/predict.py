@@ -0,0 +1,19 @@
+from fastapi import APIRouter
+from schemas.predict import PredictLiteInput, PredictResponse
+from services.realtime_service import predict_candle, predict_latest
+
+router = APIRouter(prefix="/predict", tags=["predict"])
+
+@router.post("", response_model=PredictResponse, summary="Previsão para um candle novo/hipotético", description="Acrescenta o candle informado a uma cópia da janela em memória (últimas seq_len features) e retorna a previsão OHLC/amplitude e direção do candle seguinte, sem acessar o Postgres.")
+def predict(inp: PredictLiteInput):
+	try:
+		return predict_candle(inp.open, inp.high, inp.low, inp.close, inp.volume)
+	except Exception as e:
+		return {"status":"error","message": str(e)}
+
+@router.get("/latest", response_model=PredictResponse, summary="Previsão do próximo candle", description="Previsão do candle seguinte ao último candle conhecido, a partir da janela em memória.")
+def predict_latest_route():
+	try:
+		return predict_latest()
+	except Exception as e:
+		return {"status":"error","message": str(e)}
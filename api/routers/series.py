@@ -1,19 +1,49 @@
 from fastapi import APIRouter, Query
+from fastapi.responses import StreamingResponse
 from typing import Optional
-from services.prediction_service import series_data
-from services.series_cache_service import load_series_cached
+from core.fast_json import FastJSONResponse
+from core.streaming import NDJSON_MEDIA_TYPE, ndjson_chunks
+from services import rollup_service
+from services.prediction_service import series_data, iter_series_points
+from services.series_cache_service import load_series_cached, iter_series_cached, page_series_cached
 from models.schemas import SeriesResponse
+from schemas.series import SeriesPageResponse
 
 router = APIRouter(prefix="/series", tags=["series"])
 
-@router.get("", response_model=SeriesResponse, summary="Série consolidada para gráficos (on-demand)", description="Calcula on-demand a série consolidada (real × previsto). Para produção, prefira /series_cached.")
-def series(start: Optional[str]=Query(None), end: Optional[str]=Query(None), fallback_days: int=90):
-    return series_data(start, end, fallback_days)
+_INTERVAL_DOC = "Resolução dos candles: omitido = BINANCE_INTERVAL; ou uma de CANDLE_ROLLUP_INTERVALS (lida de candle_rollups)."
+_CURSOR_DOC = "next_cursor da página anterior (opaco). Em direction=asc também serve para polling: retorna só os pontos gravados depois dele."
+_STREAM_DOC = "true = resposta NDJSON (application/x-ndjson), um ponto por linha, emitida em blocos à medida que é lida do banco."
 
+@router.get("", response_model=SeriesResponse, summary="Série consolidada para gráficos (on-demand)", description="Calcula on-demand a série consolidada (real × previsto). Para produção, prefira /series_cached. Com interval agregado usa o modelo treinado nesse intervalo (POST /train?interval=...); sem ele, só os candles.")
+def series(start: Optional[str]=Query(None), end: Optional[str]=Query(None), fallback_days: int=90, interval: Optional[str]=Query(None, description=_INTERVAL_DOC), stream: bool=Query(False, description=_STREAM_DOC)):
+    try:
+        if stream:
+            # valida antes de abrir o stream: depois do primeiro byte não há como devolver erro
+            rollup_service.check_interval(interval)
+            return StreamingResponse(ndjson_chunks(iter_series_points(start, end, fallback_days, interval=interval)), media_type=NDJSON_MEDIA_TYPE)
+        return FastJSONResponse(series_data(start, end, fallback_days, interval=interval))
+    except ValueError as e:
+        return {"status":"error","message": str(e),"points":[]}
 
-@router.get("/cached", response_model=SeriesResponse, summary="Série consolidada materializada", description="Retorna a série já materializada em banco (series_cache), gerada pelo job de treino.")
-def series_cached(start: Optional[str]=Query(None), end: Optional[str]=Query(None), fallback_days: int=90):
-    return load_series_cached(start, end, fallback_days)
+
+@router.get("/cached", response_model=SeriesResponse, summary="Série consolidada materializada", description="Retorna a série já materializada em banco (series_cache), gerada pelo job de treino. Com interval agregado retorna os candles de candle_rollups, sem previsões.")
+def series_cached(start: Optional[str]=Query(None), end: Optional[str]=Query(None), fallback_days: int=90, interval: Optional[str]=Query(None, description=_INTERVAL_DOC), stream: bool=Query(False, description=_STREAM_DOC)):
+    try:
+        if stream:
+            rollup_service.check_interval(interval)
+            return StreamingResponse(ndjson_chunks(iter_series_cached(start, end, fallback_days, interval=interval)), media_type=NDJSON_MEDIA_TYPE)
+        return FastJSONResponse(load_series_cached(start, end, fallback_days, interval=interval))
+    except ValueError as e:
+        return {"status":"error","message": str(e),"points":[]}
+
+
+@router.get("/cached/page", response_model=SeriesPageResponse, summary="Série materializada paginada (keyset)", description="Página de series_cache ordenada por time, a partir de um cursor opaco (time > cursor em asc, time < cursor em desc). Cada página é uma leitura por faixa na PK, sem OFFSET.")
+def series_cached_page(cursor: Optional[str]=Query(None, description=_CURSOR_DOC), limit: int=Query(1000, ge=1, le=10000), direction: str=Query("asc", description="asc | desc (ignorado quando há cursor)"), start: Optional[str]=Query(None), end: Optional[str]=Query(None)):
+    try:
+        return FastJSONResponse(page_series_cached(cursor, limit=limit, direction=direction, start=start, end=end))
+    except ValueError as e:
+        return {"status":"error","message": str(e),"points":[]}
 
 
 @router.post("/rebuild", summary="Recalcula e materializa a série consolidada")
@@ -1,18 +1,23 @@
 from datetime import datetime, timezone
+from typing import Optional
 
 from fastapi import APIRouter, Query
 
 from core.config import settings
 from core.db import pg_conn
-from models.schemas import TrainResponse
+from schemas.train import TrainProfiledResponse
 from services.series_cache_service import build_series_cache
+from services import error_analytics_service, rollup_service
 from services.training_service import train_job
 
 router = APIRouter(prefix="/train", tags=["train"])
 
-@router.post("", response_model=TrainResponse, summary="Treino de modelos (LSTM)", description="Treina um modelo LSTM (multi-saída) para prever OHLC/amp do próximo candle e um head de classificação para direção. Retorna métricas de validação para close_next.")
-def train(days: int = Query(90, ge=1, le=90)):
-    return train_job(days=days)
+@router.post("", response_model=TrainProfiledResponse, summary="Treino de modelos (LSTM)", description="Treina um modelo LSTM (multi-saída) para prever OHLC/amp do próximo candle e um head de classificação para direção. Retorna métricas de validação para close_next e o perfil de tempo/CPU/memória por fase do treino. Com interval agregado (ex.: 1h) treina sobre candle_rollups, sem nova ingestão.")
+def train(days: int = Query(90, ge=1, le=3650), interval: Optional[str] = Query(None, description="Resolução do treino: omitido = BINANCE_INTERVAL; ou uma de CANDLE_ROLLUP_INTERVALS (candles de candle_rollups, modelo salvo com sufixo _<interval>).")):
+    # intervalo base: mesma janela máxima de antes (90d); agregados precisam de mais dias para ~500 candles
+    if rollup_service.is_base(interval) and days > 90:
+        return {"status":"error","message":"days > 90 só é aceito com interval agregado"}
+    return train_job(days=days, interval=interval)
 
 
 def _last_train_finished_at() -> datetime | None:
@@ -32,27 +37,8 @@ def _last_train_finished_at() -> datetime | None:
 
 
 def _rolling_futures_mape(n: int) -> float | None:
-	# MAPE(%) = mean(err_close / real_close) * 100 nos últimos N pontos com real_close válido
-	n = int(max(1, n))
-	with pg_conn() as conn:
-		with conn.cursor() as cur:
-			cur.execute(
-				"""
-				SELECT err_close::float8, real_close::float8
-				FROM futures
-				WHERE real_close IS NOT NULL AND err_close IS NOT NULL AND real_close <> 0
-				ORDER BY time DESC
-				LIMIT %s;
-				""",
-				(n,),
-			)
-			rows = cur.fetchall()
-	if not rows:
-		return None
-	import numpy as np
-	err = np.asarray([r[0] for r in rows], dtype="float64")
-	real = np.asarray([r[1] for r in rows], dtype="float64")
-	return float(np.mean(np.abs(err) / real) * 100.0)
+	# MAPE(%) das últimas N linhas de futures, já agregado a cada gravação (leitura O(1))
+	return error_analytics_service.rolling_mape(int(max(1, n)))
 
 
 @router.post(
@@ -0,0 +1,37 @@
+from fastapi import APIRouter, Query
+from typing import List, Literal, Optional
+from schemas.tuning import TuningSearchResponse, TuningStudySummary, TuningTrial
+from services.tuning_service import get_trials, list_studies, promote_trial, run_search
+
+router = APIRouter(prefix="/tuning", tags=["tuning"])
+
+@router.post("", response_model=TuningSearchResponse, summary="Busca de hiperparâmetros", description="Sorteia configurações (units, dense, dropout, lr, seq_len, batch) e treina os trials em processos paralelos sobre um dataset compartilhado, podando cedo os fracos pelo val_loss por época (random: mediana; halving: successive halving). Grava os trials em tuning_trials; promote=true grava o melhor em train_policy.json.")
+def search(
+	days: int = Query(90, ge=1, le=90),
+	trials: Optional[int] = Query(None, ge=1, le=200),
+	strategy: Optional[Literal["random", "halving"]] = Query(None),
+	max_epochs: Optional[int] = Query(None, ge=1),
+	workers: Optional[int] = Query(None, ge=1, le=16),
+	tf_threads: Optional[int] = Query(None, ge=1, le=64),
+	seed: Optional[int] = Query(None),
+	promote: bool = Query(False),
+):
+	return run_search(
+		days=days, trials=trials, strategy=strategy, max_epochs=max_epochs,
+		workers=workers, tf_threads=tf_threads, seed=seed, promote=promote,
+	)
+
+@router.get("/studies", response_model=List[TuningStudySummary], summary="Estudos de busca de hiperparâmetros")
+def studies(limit: int = Query(20, ge=1, le=200)):
+	return list_studies(limit)
+
+@router.get("/studies/{study_id}/trials", response_model=List[TuningTrial], summary="Trials de um estudo")
+def trials(study_id: int):
+	return get_trials(study_id)
+
+@router.post("/studies/{study_id}/promote", summary="Promove um trial para train_policy.json", description="Grava os hiperparâmetros do trial (padrão: o melhor do estudo) em train_policy.json, mantendo as demais chaves. Vale a partir do próximo treino.")
+def promote(study_id: int, trial: Optional[int] = Query(None, ge=0)):
+	try:
+		return {"status": "ok", **promote_trial(study_id, trial)}
+	except Exception as e:
+		return {"status":"error","message": str(e)}
@@ -1,12 +1,18 @@
 
+-- Migração 1 de core/migrations.py (também aplicada pelo initdb do Postgres no compose).
+-- Particionada por mês; as partições btc_candles_pYYYYMM são criadas pela API
+-- (core/partitioning.py) na subida e, para meses sem partição, antes da gravação.
+-- O índice BRIN em time é criado pela migração 2 (numa tabela comum antiga, depois de
+-- convertê-la), não aqui.
 CREATE TABLE IF NOT EXISTS btc_candles (
-  time   TIMESTAMP PRIMARY KEY,
+  time   TIMESTAMP NOT NULL,
   open   NUMERIC NOT NULL,
   high   NUMERIC NOT NULL,
   low    NUMERIC NOT NULL,
   close  NUMERIC NOT NULL,
-  volume NUMERIC NOT NULL
-);
+  volume NUMERIC NOT NULL,
+  PRIMARY KEY (time)
+) PARTITION BY RANGE (time);
 
 CREATE TABLE IF NOT EXISTS job_logs (
   id          BIGSERIAL PRIMARY KEY,
@@ -0,0 +1,49 @@
+from pydantic import BaseModel
+from typing import Any, Dict, List, Optional
+
+
+class MetricSummary(BaseModel):
+	mean: float
+	std: float
+
+
+class BacktestFold(BaseModel):
+	fold: int
+	train_start: str
+	val_start: str
+	val_end: str
+	n_train: int
+	n_val: int
+	epochs: Optional[int] = None
+	val_loss: Optional[float] = None
+	mae: Optional[float] = None
+	rmse: Optional[float] = None
+	mape: Optional[float] = None
+	smape: Optional[float] = None
+	dir_acc: Optional[float] = None
+	wall_s: Optional[float] = None
+
+
+class BacktestRunResponse(BaseModel):
+	status: str
+	run_id: Optional[int] = None
+	days: Optional[int] = None
+	mode: Optional[str] = None
+	params: Optional[Dict[str, Any]] = None
+	elapsed_s: Optional[float] = None
+	metrics: Dict[str, MetricSummary] = {}
+	folds: List[BacktestFold] = []
+	message: Optional[str] = None
+
+
+class BacktestRunSummary(BaseModel):
+	run_id: int
+	status: str
+	days: int
+	mode: str
+	folds: int
+	params: Dict[str, Any] = {}
+	metrics: Optional[Dict[str, MetricSummary]] = None
+	message: Optional[str] = None
+	started_at: str
+	finished_at: Optional[str] = None
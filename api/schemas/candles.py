@@ -0,0 +1,20 @@
+from pydantic import BaseModel
+from typing import List, Optional
+
+
+class CandleRow(BaseModel):
+	time: str
+	open: float
+	high: float
+	low: float
+	close: float
+	volume: float
+
+
+class CandlesResponse(BaseModel):
+	status: str = "ok"
+	symbol: Optional[str] = None
+	interval: Optional[str] = None
+	source: Optional[str] = None
+	candles: List[CandleRow] = []
+	message: Optional[str] = None
@@ -0,0 +1,34 @@
+from pydantic import BaseModel
+from typing import Dict, List, Optional
+
+
+class ForecastPoint(BaseModel):
+	step: int
+	time: str
+	pred: Dict[str, float]
+	prob_up: float
+
+
+class ForecastResponse(BaseModel):
+	status: str
+	base_time: Optional[str] = None
+	horizon: Optional[int] = None
+	points: List[ForecastPoint] = []
+	message: Optional[str] = None
+
+
+class BacktestStep(BaseModel):
+	step: int
+	mae: float
+	mape: float
+	dir_acc: float
+
+
+class ForecastBacktestResponse(BaseModel):
+	status: str
+	days: Optional[int] = None
+	horizon: Optional[int] = None
+	origins: Optional[int] = None
+	elapsed_s: Optional[float] = None
+	steps: List[BacktestStep] = []
+	message: Optional[str] = None
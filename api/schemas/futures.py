@@ -0,0 +1,29 @@
+from pydantic import BaseModel
+from typing import Dict, List, Optional
+
+from models.schemas import FuturesResponse
+
+
+class FuturesErrorWindow(BaseModel):
+	window: int
+	n: int
+	mape: Optional[float] = None
+	mae: Optional[float] = None
+	bias: Optional[float] = None
+	dir_hit_rate: Optional[float] = None
+	dir_n: int = 0
+	quantiles: Dict[str, Optional[float]] = {}
+	first_time: Optional[str] = None
+	last_time: Optional[str] = None
+
+
+class FuturesErrorsResponse(BaseModel):
+	status: str
+	windows: List[FuturesErrorWindow] = []
+	message: Optional[str] = None
+
+
+class FuturesPageResponse(FuturesResponse):
+	direction: str = "asc"
+	has_more: bool = False
+	next_cursor: Optional[str] = None
@@ -0,0 +1,9 @@
+from typing import Dict
+
+from models.schemas import IngestResponse
+
+
+class IngestWatchlistResponse(IngestResponse):
+	# candles inseridos por par ("SYMBOL:interval"); 'inserted' continua sendo o do par principal
+	pairs: Dict[str, int] = {}
+	failed: Dict[str, str] = {}
@@ -16,3 +16,24 @@ class PredictLiteInput(BaseModel):
 	volume: float
 	high: Optional[float] = None
 	low: Optional[float] = None
+
+class PredictedCandle(BaseModel):
+	open_next: float
+	high_next: float
+	low_next: float
+	close_next: float
+	amp_next: float
+
+class DirectionForecast(BaseModel):
+	dir_next: int
+	prob_up: float
+	prob_down: float
+
+class PredictResponse(BaseModel):
+	status: str
+	base_time: Optional[str] = None
+	target_time: Optional[str] = None
+	hypothetical: bool = False
+	pred: Optional[PredictedCandle] = None
+	cls: Optional[DirectionForecast] = None
+	message: Optional[str] = None
@@ -0,0 +1,10 @@
+from typing import Optional
+
+from models.schemas import SeriesResponse
+
+
+class SeriesPageResponse(SeriesResponse):
+	# cursor opaco para a próxima página (ou para o polling em direction=asc)
+	direction: str = "asc"
+	has_more: bool = False
+	next_cursor: Optional[str] = None
@@ -0,0 +1,26 @@
+from pydantic import BaseModel
+from typing import Dict, List, Optional
+
+from models.schemas import TrainResponse
+
+
+class TrainPhaseProfile(BaseModel):
+	wall_s: float
+	cpu_s: float
+	peak_rss_mb: float
+	peak_rss_delta_mb: float
+
+
+class TrainEpochProfile(BaseModel):
+	epoch: int
+	wall_s: float
+	samples_per_s: Optional[float] = None
+
+
+class TrainProfile(BaseModel):
+	phases: Dict[str, TrainPhaseProfile] = {}
+	epochs: List[TrainEpochProfile] = []
+
+
+class TrainProfiledResponse(TrainResponse):
+	profile: Optional[TrainProfile] = None
@@ -0,0 +1,50 @@
+from pydantic import BaseModel
+from typing import Any, Dict, List, Optional
+
+
+class TuningTrial(BaseModel):
+	trial: int
+	params: Dict[str, Any]
+	status: str
+	epochs: Optional[int] = None
+	val_loss: Optional[float] = None
+	mae: Optional[float] = None
+	rmse: Optional[float] = None
+	mape: Optional[float] = None
+	smape: Optional[float] = None
+	dir_acc: Optional[float] = None
+	wall_s: Optional[float] = None
+	message: Optional[str] = None
+
+
+class TuningPromotion(BaseModel):
+	study_id: int
+	trial: int
+	policy_path: str
+	policy: Dict[str, Any]
+
+
+class TuningSearchResponse(BaseModel):
+	status: str
+	study_id: Optional[int] = None
+	strategy: Optional[str] = None
+	days: Optional[int] = None
+	elapsed_s: Optional[float] = None
+	counts: Dict[str, int] = {}
+	best: Optional[TuningTrial] = None
+	trials: List[TuningTrial] = []
+	promoted: Optional[TuningPromotion] = None
+	message: Optional[str] = None
+
+
+class TuningStudySummary(BaseModel):
+	study_id: int
+	status: str
+	strategy: str
+	days: int
+	n_trials: int
+	best_trial: Optional[int] = None
+	promoted_at: Optional[str] = None
+	message: Optional[str] = None
+	started_at: str
+	finished_at: Optional[str] = None
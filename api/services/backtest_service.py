@@ -0,0 +1,300 @@
+"""Backtest walk-forward: treina e avalia o LSTM em K folds sobre o histórico gravado.
+
+Em vez do único split temporal do treino (temporal_split_indices), a janela de dias é
+cortada em K validações consecutivas (ml.lstm_dataset.walk_forward_folds), com treino
+"expanding" (todo o passado) ou "rolling" (as train_size sequências anteriores). Cada
+fold treina um modelo do zero pelo mesmo núcleo do treino de produção (ml.lstm_training).
+
+Execução:
+- X/Yreg/Ycls da janela vão uma vez para arquivos .npy num diretório temporário; cada
+  worker abre com mmap_mode="r" (páginas compartilhadas pelo page cache, sem cópia por
+  processo) e monta só as janelas do seu fold;
+- folds rodam num ProcessPoolExecutor (spawn) com BACKTEST_WORKERS processos, cada um
+  limitado a BACKTEST_TF_THREADS threads de TensorFlow (intra-op; inter-op = 1), para
+  que os folds paralelos não disputem todos os núcleos;
+- resultados por fold (backtest_folds) e agregados médios/desvio (backtest_runs) ficam
+  no Postgres, com os parâmetros do run, para comparar mudanças de política em lote.
+
+CLI: python -m services.backtest_service --folds 5 --mode rolling --workers 3
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import multiprocessing as mp
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from typing import Optional
+
+import numpy as np
+
+from core.config import settings
+from core.db import pg_conn
+from core.logging import log_job
+from ml.lstm_dataset import open_arrays, save_arrays, walk_forward_folds, window_slice
+from ml.lstm_training import limit_tf_threads
+
+_METRICS = ("mae", "rmse", "mape", "smape", "dir_acc")
+
+
+# ---------------- worker ----------------
+def _run_fold(data_dir: str, fold: int, train_start: int, val_start: int, val_end: int, params: dict) -> dict:
+    from ml.lstm_training import fit_and_evaluate
+
+    t0 = time.perf_counter()
+    X, Yreg, Ycls = open_arrays(data_dir, "X", "Yreg", "Ycls")
+    L = int(params["seq_len"])
+    # sequência i termina na linha i + L - 1 (mesmo alinhamento de build_sequences)
+    fit, _, metrics = fit_and_evaluate(
+        window_slice(X, L, train_start, val_start),
+        np.asarray(Yreg[train_start + L - 1 : val_start + L - 1], dtype=np.float32),
+        np.asarray(Ycls[train_start + L - 1 : val_start + L - 1]),
+        window_slice(X, L, val_start, val_end),
+        np.asarray(Yreg[val_start + L - 1 : val_end + L - 1], dtype=np.float32),
+        np.asarray(Ycls[val_start + L - 1 : val_end + L - 1]),
+        alpha=float(params["alpha"]),
+        epochs=int(params["epochs"]),
+        batch_size=int(params["batch_size"]),
+        learning_rate=float(params["learning_rate"]),
+        patience=int(params["patience"]),
+        lstm_units=int(params["lstm_units"]),
+        dense_units=int(params["dense_units"]),
+        dropout=float(params["dropout"]),
+        checkpoint_path=os.path.join(data_dir, f"fold_{fold}.keras"),
+    )
+    return {
+        "fold": fold,
+        "n_train": val_start - train_start,
+        "n_val": val_end - val_start,
+        "epochs": fit.epochs,
+        "val_loss": fit.val_loss_best,
+        **metrics,
+        "wall_s": time.perf_counter() - t0,
+    }
+
+
+# ---------------- persistência ----------------
+def _insert_run(days: int, mode: str, folds: int, params: dict, started_at: datetime) -> int:
+    with pg_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                """INSERT INTO backtest_runs(status, days, mode, folds, params, started_at)
+                   VALUES ('running',%s,%s,%s,%s::jsonb,%s) RETURNING id;""",
+                (days, mode, folds, json.dumps(params), started_at),
+            )
+            return int(cur.fetchone()[0])
+
+
+def _insert_fold(run_id: int, r: dict) -> None:
+    with pg_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                """INSERT INTO backtest_folds(run_id, fold, train_start, val_start, val_end, n_train, n_val,
+                                              epochs, val_loss, mae, rmse, mape, smape, dir_acc, wall_s)
+                   VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s);""",
+                (run_id, r["fold"], r["train_start"], r["val_start"], r["val_end"], r["n_train"], r["n_val"],
+                 r["epochs"], r["val_loss"], r["mae"], r["rmse"], r["mape"], r["smape"], r.get("dir_acc"), r["wall_s"]),
+            )
+
+
+def _finish_run(run_id: int, status: str, metrics: Optional[dict], message: str) -> None:
+    with pg_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                """UPDATE backtest_runs SET status=%s, metrics=%s::jsonb, message=%s, finished_at=%s
+                   WHERE id=%s;""",
+                (status, json.dumps(metrics) if metrics is not None else None, message, datetime.utcnow(), run_id),
+            )
+
+
+def aggregate_folds(results: list[dict]) -> dict:
+    """Média e desvio-padrão de cada métrica entre os folds."""
+    out = {}
+    for m in _METRICS:
+        vals = np.asarray([r[m] for r in results if r.get(m) is not None], dtype=np.float64)
+        if vals.size:
+            out[m] = {"mean": float(vals.mean()), "std": float(vals.std(ddof=0))}
+    return out
+
+
+# ---------------- API ----------------
+def run_backtest(
+    days: Optional[int] = None,
+    folds: Optional[int] = None,
+    mode: Optional[str] = None,
+    val_size: Optional[int] = None,
+    train_size: Optional[int] = None,
+    alpha: Optional[float] = None,
+    epochs: Optional[int] = None,
+    workers: Optional[int] = None,
+    tf_threads: Optional[int] = None,
+) -> dict:
+    from services.feature_store_service import load_feature_window
+
+    days = days or settings.LOOKBACK_DAYS
+    folds = int(folds or settings.BACKTEST_FOLDS)
+    mode = mode or settings.BACKTEST_MODE
+    val_size = int(val_size or settings.BACKTEST_VAL_SIZE)
+    workers = max(min(int(workers or settings.BACKTEST_WORKERS), folds), 1)
+    tf_threads = int(tf_threads or settings.BACKTEST_TF_THREADS)
+    params = {
+        "seq_len": int(settings.LSTM_SEQ_LEN),
+        "alpha": float(alpha or settings.ALPHA_DECAY),
+        "epochs": int(epochs or settings.LSTM_EPOCHS),
+        "batch_size": int(settings.LSTM_BATCH_SIZE),
+        "learning_rate": float(settings.LSTM_LR),
+        "patience": int(settings.LSTM_PATIENCE),
+        "lstm_units": int(settings.LSTM_UNITS),
+        "dense_units": int(settings.LSTM_DENSE_UNITS),
+        "dropout": float(settings.LSTM_DROPOUT),
+        "val_size": val_size,
+        "train_size": train_size,
+        "workers": workers,
+        "tf_threads": tf_threads,
+    }
+    start = datetime.utcnow()
+    run_id = None
+    data_dir = None
+    try:
+        df2, X, Yreg, Ycls, n_candles = load_feature_window(days=days)
+        L = params["seq_len"]
+        n_seq = len(X) - (L - 1)
+        splits = walk_forward_folds(n_seq, folds, val_size, mode=mode, train_size=train_size)
+
+        run_id = _insert_run(days, mode, folds, params, start)
+
+        data_dir = tempfile.mkdtemp(prefix="backtest_", dir=settings.BACKTEST_DATA_DIR or None)
+        save_arrays(
+            data_dir,
+            X=X.to_numpy(dtype=np.float32),
+            Yreg=Yreg.to_numpy(dtype=np.float32),
+            Ycls=Ycls.to_numpy(dtype=np.int64),
+        )
+        times = df2["time"].to_numpy()
+
+        results = []
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=mp.get_context("spawn"),
+            initializer=limit_tf_threads,
+            initargs=(tf_threads,),
+        ) as pool:
+            pending = {
+                pool.submit(_run_fold, data_dir, k, a, b, c, params): (a, b, c)
+                for k, (a, b, c) in enumerate(splits)
+            }
+            for fut in as_completed(pending):
+                a, b, c = pending[fut]
+                r = fut.result()
+                # tempos do candle que fecha a primeira/última janela de cada trecho
+                r.update({
+                    "train_start": _ts(times[a + L - 1]),
+                    "val_start": _ts(times[b + L - 1]),
+                    "val_end": _ts(times[c + L - 2]),
+                })
+                _insert_fold(run_id, r)
+                results.append(r)
+
+        results.sort(key=lambda r: r["fold"])
+        agg = aggregate_folds(results)
+        elapsed = (datetime.utcnow() - start).total_seconds()
+        msg = (
+            f"Backtest {mode} {days}d, {folds} folds x {val_size}, {workers} workers. "
+            + ", ".join(f"{m.upper()}={v['mean']:.4f}±{v['std']:.4f}" for m, v in agg.items())
+        )
+        _finish_run(run_id, "ok", agg, msg)
+        log_job("backtest", "ok", msg, start, datetime.utcnow())
+        return {
+            "status": "ok",
+            "run_id": run_id,
+            "days": days,
+            "mode": mode,
+            "params": params,
+            "elapsed_s": elapsed,
+            "metrics": agg,
+            "folds": [_fold_out(r) for r in results],
+        }
+    except Exception as e:
+        if run_id is not None:
+            try:
+                _finish_run(run_id, "error", None, str(e))
+            except Exception:
+                pass
+        log_job("backtest", "error", str(e), start, datetime.utcnow())
+        return {"status": "error", "message": str(e), "run_id": run_id}
+    finally:
+        if data_dir:
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+
+def _ts(t) -> datetime:
+    import pandas as pd
+
+    return pd.Timestamp(t).to_pydatetime()
+
+
+def _fold_out(r: dict) -> dict:
+    out = dict(r)
+    for k in ("train_start", "val_start", "val_end"):
+        out[k] = out[k].isoformat()
+    return out
+
+
+def list_runs(limit: int = 20) -> list[dict]:
+    with pg_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                """SELECT id, status, days, mode, folds, params, metrics, message, started_at, finished_at
+                   FROM backtest_runs ORDER BY id DESC LIMIT %s;""",
+                (int(limit),),
+            )
+            rows = cur.fetchall()
+    return [
+        {
+            "run_id": r[0], "status": r[1], "days": r[2], "mode": r[3], "folds": r[4],
+            "params": r[5], "metrics": r[6], "message": r[7],
+            "started_at": r[8].isoformat(), "finished_at": r[9].isoformat() if r[9] else None,
+        }
+        for r in rows
+    ]
+
+
+def get_run_folds(run_id: int) -> list[dict]:
+    with pg_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                """SELECT fold, train_start, val_start, val_end, n_train, n_val, epochs, val_loss,
+                          mae, rmse, mape, smape, dir_acc, wall_s
+                   FROM backtest_folds WHERE run_id=%s ORDER BY fold;""",
+                (int(run_id),),
+            )
+            cols = [d[0] for d in cur.description]
+            rows = cur.fetchall()
+    return [_fold_out(dict(zip(cols, r))) for r in rows]
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Backtest walk-forward do LSTM (K folds em paralelo).")
+    ap.add_argument("--days", type=int, default=None)
+    ap.add_argument("--folds", type=int, default=None)
+    ap.add_argument("--mode", choices=["expanding", "rolling"], default=None)
+    ap.add_argument("--val-size", type=int, default=None, help="sequências de validação por fold")
+    ap.add_argument("--train-size", type=int, default=None, help="sequências de treino por fold (rolling)")
+    ap.add_argument("--alpha", type=float, default=None)
+    ap.add_argument("--epochs", type=int, default=None)
+    ap.add_argument("--workers", type=int, default=None)
+    ap.add_argument("--tf-threads", type=int, default=None, help="threads de TensorFlow por worker")
+    args = ap.parse_args()
+    out = run_backtest(
+        days=args.days, folds=args.folds, mode=args.mode, val_size=args.val_size, train_size=args.train_size,
+        alpha=args.alpha, epochs=args.epochs, workers=args.workers, tf_threads=args.tf_threads,
+    )
+    print(json.dumps(out, indent=2, default=str))
+
+
+if __name__ == "__main__":
+    main()
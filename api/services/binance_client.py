@@ -0,0 +1,160 @@
+"""Cliente compartilhado de klines: retry com backoff exponencial + jitter, Retry-After,
+controle de peso por minuto e métricas Prometheus.
+
+A camada de transporte é a KlineSource do processo (HTTP keep-alive, replay ou sintética),
+então o mesmo retry vale para execuções offline com 429 injetados.
+"""
+from __future__ import annotations
+
+import random
+import threading
+import time
+from typing import Optional
+
+import requests
+
+from core.config import settings
+from core.observability import BINANCE_REQ_LATENCY, BINANCE_RETRIES, BINANCE_USED_WEIGHT
+from services.kline_source import KlinePage, KlineSource, get_kline_source
+
+
+RETRY_STATUS = {418, 429, 500, 502, 503, 504}
+
+
+def klines_request_weight(limit: int) -> int:
+    """Peso de GET /api/v3/klines conforme o limit (tabela da Binance)."""
+    if limit <= 100:
+        return 1
+    if limit <= 500:
+        return 2
+    if limit <= 1000:
+        return 5
+    return 10
+
+
+class BinanceClient:
+    def __init__(
+        self,
+        source: Optional[KlineSource] = None,
+        max_retries: int | None = None,
+        backoff_base_s: float | None = None,
+        backoff_max_s: float | None = None,
+        weight_limit: int | None = None,
+        seed: int | None = None,
+    ):
+        self._source = source
+        self.max_retries = settings.BINANCE_MAX_RETRIES if max_retries is None else max_retries
+        self.backoff_base_s = backoff_base_s if backoff_base_s is not None else settings.BINANCE_BACKOFF_BASE_MS / 1000.0
+        self.backoff_max_s = backoff_max_s if backoff_max_s is not None else settings.BINANCE_BACKOFF_MAX_MS / 1000.0
+        self.weight_limit = weight_limit or settings.BINANCE_WEIGHT_LIMIT
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._used_weight = 0
+        self._weight_minute = int(time.time() // 60)
+        self.retries = 0
+
+    @property
+    def source(self) -> KlineSource:
+        # resolvido a cada chamada para respeitar set_kline_source() em benchmarks
+        return self._source or get_kline_source()
+
+    @property
+    def used_weight(self) -> int:
+        with self._lock:
+            self._roll_minute()
+            return self._used_weight
+
+    def _roll_minute(self) -> None:
+        minute = int(time.time() // 60)
+        if minute != self._weight_minute:
+            self._weight_minute = minute
+            self._used_weight = 0
+
+    def _reserve_weight(self, weight: int) -> None:
+        """Aguarda a virada do minuto se a requisição estourar 90% do limite de peso."""
+        while True:
+            with self._lock:
+                self._roll_minute()
+                if self._used_weight + weight <= 0.9 * self.weight_limit:
+                    self._used_weight += weight
+                    BINANCE_USED_WEIGHT.set(self._used_weight)
+                    return
+                wait = 60.0 - (time.time() % 60.0) + 0.05
+            BINANCE_RETRIES.labels("weight_throttle").inc()
+            time.sleep(wait)
+
+    def _observe_weight(self, page: KlinePage) -> None:
+        used = None
+        for k, v in (page.headers or {}).items():
+            if k.lower() == "x-mbx-used-weight-1m":
+                try:
+                    used = int(v)
+                except (TypeError, ValueError):
+                    used = None
+                break
+        if used is None:
+            return
+        with self._lock:
+            self._roll_minute()
+            # o header é a fonte da verdade (inclui outros clientes do mesmo IP)
+            self._used_weight = max(self._used_weight, used)
+            BINANCE_USED_WEIGHT.set(self._used_weight)
+
+    def _backoff(self, attempt: int, retry_after: Optional[float]) -> float:
+        cap = min(self.backoff_max_s, self.backoff_base_s * (2 ** attempt))
+        delay = self._rng.uniform(0, cap)  # "full jitter"
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        return delay
+
+    @staticmethod
+    def _retry_after(page: KlinePage) -> Optional[float]:
+        for k, v in (page.headers or {}).items():
+            if k.lower() == "retry-after":
+                try:
+                    return float(v)
+                except (TypeError, ValueError):
+                    return None
+        return None
+
+    def klines(self, params: dict, api_key: str | None = None) -> list:
+        """GET /api/v3/klines com retry. Retorna o payload (lista de klines) ou levanta HTTPError."""
+        weight = klines_request_weight(int(params.get("limit") or 500))
+        attempt = 0
+        while True:
+            self._reserve_weight(weight)
+            t0 = time.perf_counter()
+            try:
+                page = self.source.fetch(params, api_key=api_key)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                BINANCE_REQ_LATENCY.labels("network_error").observe(time.perf_counter() - t0)
+                if attempt >= self.max_retries:
+                    raise
+                BINANCE_RETRIES.labels(type(e).__name__).inc()
+                self.retries += 1
+                time.sleep(self._backoff(attempt, None))
+                attempt += 1
+                continue
+            BINANCE_REQ_LATENCY.labels(str(page.status)).observe(time.perf_counter() - t0)
+            self._observe_weight(page)
+            if page.status in RETRY_STATUS and attempt < self.max_retries:
+                BINANCE_RETRIES.labels(str(page.status)).inc()
+                self.retries += 1
+                time.sleep(self._backoff(attempt, self._retry_after(page)))
+                attempt += 1
+                continue
+            page.raise_for_status()
+            return page.payload or []
+
+
+_CLIENT: Optional[BinanceClient] = None
+_CLIENT_LOCK = threading.Lock()
+
+
+def get_binance_client() -> BinanceClient:
+    global _CLIENT
+    if _CLIENT is None:
+        with _CLIENT_LOCK:
+            if _CLIENT is None:
+                _CLIENT = BinanceClient()
+    return _CLIENT
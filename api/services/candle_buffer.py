@@ -0,0 +1,286 @@
+"""Buffer circular (por processo ou em memória compartilhada) dos últimos N candles.
+
+Guarda OHLCV (float64) e as FEATURE_COLS (float32) calculadas incrementalmente a cada
+candle novo, para que a previsão do candle mais recente não precise ler o Postgres nem
+montar DataFrames. É semeado a partir do banco no startup e alimentado por
+upsert_candles (ingest/backfill).
+
+Com CANDLE_RING_SHM definido, o buffer vive em multiprocessing.shared_memory e é
+compartilhado entre os workers do uvicorn: escritas são serializadas por flock e
+leituras usam um contador de sequência (seqlock) para nunca ver um estado parcial.
+Sem CANDLE_RING_SHM, cada worker mantém a própria cópia; quem não encontra o
+timestamp pedido no buffer cai no caminho antigo (banco).
+"""
+from __future__ import annotations
+
+import fcntl
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from core.config import settings
+from ml.features import FEATURE_COLS
+from ml.streaming_features import VOL_WINDOW, StreamingFeatureEngine
+
+# Header (int64): seq (seqlock), count, head (próxima posição de escrita), capacity
+_H_SEQ, _H_COUNT, _H_HEAD, _H_CAP = range(4)
+_HEADER_LEN = 8
+_N_OHLCV = 5
+
+
+def _to_ms(t) -> int:
+    return int(pd.Timestamp(t).value // 1_000_000)
+
+
+class CandleRing:
+    def __init__(self, capacity: int, shm_name: Optional[str] = None):
+        self.capacity = int(capacity)
+        self.n_features = len(FEATURE_COLS)
+        self._tlock = threading.Lock()
+        self._shm = None
+        nbytes = self._nbytes()
+        if shm_name:
+            buf = self._attach_shm(f"{shm_name}_{self.capacity}_{self.n_features}", nbytes)
+        else:
+            buf = bytearray(nbytes)
+        self._map(buf)
+        if self.header[_H_CAP] == 0:
+            self.header[_H_CAP] = self.capacity
+        lock_name = (self._shm.name if self._shm is not None else f"candle_ring_{os.getpid()}_{id(self)}")
+        self._lock_path = os.path.join(tempfile.gettempdir(), f"{lock_name}.lock")
+
+    # ---------------- layout ----------------
+    def _nbytes(self) -> int:
+        cap = self.capacity
+        return 8 * _HEADER_LEN + 8 * cap + 8 * cap * _N_OHLCV + 4 * cap * self.n_features
+
+    def _map(self, buf) -> None:
+        cap = self.capacity
+        off = 0
+        self.header = np.ndarray((_HEADER_LEN,), dtype=np.int64, buffer=buf, offset=off)
+        off += 8 * _HEADER_LEN
+        self.times = np.ndarray((cap,), dtype=np.int64, buffer=buf, offset=off)
+        off += 8 * cap
+        self.ohlcv = np.ndarray((cap, _N_OHLCV), dtype=np.float64, buffer=buf, offset=off)
+        off += 8 * cap * _N_OHLCV
+        self.features = np.ndarray((cap, self.n_features), dtype=np.float32, buffer=buf, offset=off)
+
+    def _attach_shm(self, name: str, nbytes: int):
+        from multiprocessing import resource_tracker, shared_memory
+
+        try:
+            shm = shared_memory.SharedMemory(name=name, create=True, size=nbytes)
+            # memória nova vem zerada: count=0, seq=0
+        except FileExistsError:
+            shm = shared_memory.SharedMemory(name=name, create=False)
+        # O segmento deve sobreviver ao worker que o criou (outros workers continuam usando).
+        try:
+            resource_tracker.unregister(shm._name, "shared_memory")
+        except Exception:
+            pass
+        self._shm = shm
+        return shm.buf
+
+    # ---------------- sincronização ----------------
+    @contextmanager
+    def _write_lock(self):
+        with self._tlock:
+            with open(self._lock_path, "a+") as fh:
+                fcntl.flock(fh, fcntl.LOCK_EX)
+                try:
+                    # ímpar = escrita em andamento (|1 recupera de um writer que morreu no meio)
+                    self.header[_H_SEQ] |= 1
+                    yield
+                finally:
+                    self.header[_H_SEQ] += 1
+                    fcntl.flock(fh, fcntl.LOCK_UN)
+
+    def _read(self, fn, max_spins: int = 100_000):
+        """Executa fn() (que copia dados) até obter uma leitura consistente (seqlock).
+
+        Desiste após max_spins e devolve None (o chamador cai no caminho via banco).
+        """
+        for _ in range(max_spins):
+            s1 = int(self.header[_H_SEQ])
+            if s1 % 2:
+                continue
+            out = fn()
+            if int(self.header[_H_SEQ]) == s1:
+                return out
+        return None
+
+    # ---------------- leitura ----------------
+    def __len__(self) -> int:
+        return int(self.header[_H_COUNT])
+
+    def _order(self, count: int, head: int) -> np.ndarray:
+        """Índices físicos do mais antigo ao mais novo."""
+        start = (head - count) % self.capacity
+        return (start + np.arange(count)) % self.capacity
+
+    def last_time(self) -> Optional[int]:
+        def fn():
+            count, head = int(self.header[_H_COUNT]), int(self.header[_H_HEAD])
+            return int(self.times[(head - 1) % self.capacity]) if count else None
+        return self._read(fn)
+
+    def snapshot(self, last_n: Optional[int] = None) -> Optional[tuple[np.ndarray, np.ndarray, np.ndarray]]:
+        """Cópia ordenada (times_ms, ohlcv, features) dos últimos last_n candles."""
+        def fn():
+            count, head = int(self.header[_H_COUNT]), int(self.header[_H_HEAD])
+            idx = self._order(count, head)
+            if last_n is not None:
+                idx = idx[-last_n:]
+            return self.times[idx].copy(), self.ohlcv[idx].copy(), self.features[idx].copy()
+        return self._read(fn)
+
+    def window_before(self, t, seq_len: int) -> Optional[tuple[np.ndarray, float, float]]:
+        """Janela de features (seq_len, F) que termina no candle anterior a 't' + close real de 't'
+        + close do candle anterior (base da direção).
+
+        Mesma regra de save_predictions_for_times no caminho via banco: exige features
+        completas na janela e um candle depois de 't' (build_features_targets descarta a
+        última linha por não ter target).
+        """
+        t_ms = _to_ms(t)
+
+        def fn():
+            count, head = int(self.header[_H_COUNT]), int(self.header[_H_HEAD])
+            idx = self._order(count, head)
+            times = self.times[idx]
+            pos = int(np.searchsorted(times, t_ms))
+            if pos >= count or times[pos] != t_ms or pos + 1 >= count or pos < seq_len:
+                return None
+            win_idx = idx[pos - seq_len: pos]
+            return self.features[win_idx].copy(), float(self.ohlcv[idx[pos], 3]), float(self.ohlcv[idx[pos - 1], 3])
+
+        out = self._read(fn)
+        if out is None or not np.isfinite(out[0]).all():
+            return None
+        return out
+
+    # ---------------- escrita ----------------
+    def _append_locked(self, t_ms: int, o: float, h: float, l: float, c: float, v: float) -> None:
+        cap = self.capacity
+        count, head = int(self.header[_H_COUNT]), int(self.header[_H_HEAD])
+        # estado do motor incremental reconstruído dos últimos 10 candles do buffer: O(1)
+        tail = self._order(min(count, VOL_WINDOW), head)
+        engine = StreamingFeatureEngine.from_history(self.ohlcv[tail, 3], self.ohlcv[tail, 4])
+        feats = engine.update(o, h, l, c, v)
+        self.times[head] = t_ms
+        self.ohlcv[head] = (o, h, l, c, v)
+        self.features[head] = feats.astype(np.float32)
+        self.header[_H_HEAD] = (head + 1) % cap
+        self.header[_H_COUNT] = min(count + 1, cap)
+
+    def _reset_locked(self) -> None:
+        self.header[_H_COUNT] = 0
+        self.header[_H_HEAD] = 0
+
+    def append_df(self, df: pd.DataFrame) -> str:
+        """Incorpora candles (colunas time/open/high/low/close/volume).
+
+        Retorna "appended" (só candles novos), "noop" ou "resync" (veio candle antigo que
+        não está no buffer, ou há lacuna entre o último do buffer e o primeiro novo; o
+        buffer precisa ser ressemeado a partir do banco).
+        """
+        if df is None or df.empty:
+            return "noop"
+        df = df.sort_values("time")
+        t_ms = (pd.to_datetime(df["time"]).to_numpy(dtype="datetime64[ms]").astype(np.int64))
+        vals = df[["open", "high", "low", "close", "volume"]].to_numpy(dtype=np.float64)
+        with self._write_lock():
+            count, head = int(self.header[_H_COUNT]), int(self.header[_H_HEAD])
+            if count:
+                times = self.times[self._order(count, head)]
+                last, first = int(times[-1]), int(times[0])
+                old = t_ms[(t_ms <= last) & (t_ms >= first)]
+                if old.size and not np.isin(old, times).all():
+                    return "resync"
+                new_mask = t_ms > last
+                step = int(times[-1] - times[-2]) if count >= 2 else None
+                if new_mask.any() and step and int(t_ms[new_mask][0]) - last > step:
+                    return "resync"
+            else:
+                new_mask = np.ones(len(t_ms), dtype=bool)
+            if not new_mask.any():
+                return "noop"
+            for tm, row in zip(t_ms[new_mask], vals[new_mask]):
+                self._append_locked(int(tm), *row)
+        return "appended"
+
+    def replace_df(self, df: pd.DataFrame) -> None:
+        with self._write_lock():
+            self._reset_locked()
+            if df is None or df.empty:
+                return
+            df = df.sort_values("time").tail(self.capacity)
+            t_ms = pd.to_datetime(df["time"]).to_numpy(dtype="datetime64[ms]").astype(np.int64)
+            vals = df[["open", "high", "low", "close", "volume"]].to_numpy(dtype=np.float64)
+            for tm, row in zip(t_ms, vals):
+                self._append_locked(int(tm), *row)
+
+
+def load_recent_candles(n: int) -> pd.DataFrame:
+    from core import market
+    from core.db import pg_conn
+
+    with pg_conn() as conn:
+        df = pd.read_sql(
+            """
+            SELECT time, open, high, low, close, volume FROM (
+              SELECT time, open, high, low, close, volume
+              FROM btc_candles WHERE symbol = %s AND interval = %s ORDER BY time DESC LIMIT %s
+            ) t ORDER BY time
+            """,
+            conn,
+            params=(*market.primary_pair(), int(n)),
+        )
+    return df
+
+
+_RING: Optional[CandleRing] = None
+_RING_LOCK = threading.Lock()
+
+
+def get_ring() -> Optional[CandleRing]:
+    global _RING
+    if settings.CANDLE_RING_SIZE <= 0:
+        return None
+    if _RING is None:
+        with _RING_LOCK:
+            if _RING is None:
+                _RING = CandleRing(settings.CANDLE_RING_SIZE, settings.CANDLE_RING_SHM or None)
+    return _RING
+
+
+def seed_from_db() -> int:
+    """Sincroniza o buffer com os últimos N candles do banco. Retorna o tamanho final."""
+    ring = get_ring()
+    if ring is None:
+        return 0
+    df = load_recent_candles(ring.capacity)
+    if df.empty:
+        return len(ring)
+    # Se outro worker já semeou (memória compartilhada), basta anexar o que faltar.
+    if ring.append_df(df) == "resync":
+        ring.replace_df(df)
+    return len(ring)
+
+
+def on_candles_upserted(df: pd.DataFrame) -> None:
+    """Hook de upsert_candles: anexa candles novos; ressemeia se vierem lacunas antigas."""
+    ring = get_ring()
+    if ring is None:
+        return
+    try:
+        if ring.append_df(df) == "resync":
+            seed_from_db()
+    except Exception:
+        # o buffer é um cache: nunca derruba a ingestão
+        pass
@@ -0,0 +1,62 @@
+"""Leitura de candles por par (symbol, interval) para GET /candles.
+
+Pares da watchlist vêm de btc_candles (PK symbol, interval, time); resoluções agregadas do
+par principal (CANDLE_ROLLUP_INTERVALS) vêm de candle_rollups.
+"""
+from __future__ import annotations
+
+from typing import Optional
+
+import pandas as pd
+
+from core import market
+from core.db import pg_conn
+from services import rollup_service
+
+
+def list_pairs() -> dict:
+    return {
+        "primary": market.pair_key(market.primary_pair()),
+        "watchlist": [market.pair_key(p) for p in market.watchlist()],
+        "rollups": [market.pair_key((market.primary_pair()[0], iv)) for iv in rollup_service.rollup_intervals()],
+    }
+
+
+def load_candles(symbol: Optional[str], interval: Optional[str], start: Optional[str] = None,
+                 end: Optional[str] = None, limit: int = 1000) -> dict:
+    """Candles do par em [start, end]; sem intervalo, os 'limit' mais recentes."""
+    sym, iv = market.primary_pair()
+    pair = ((symbol or sym).upper(), interval or iv)
+    if pair not in market.watchlist():
+        if pair[0] == sym and pair[1] in rollup_service.rollup_intervals():
+            df = rollup_service.load_candles(pair[1], start=start, end=end, days=None if start else 3650)
+            df = df.tail(int(limit)) if not (start and end) else df
+            return _response(pair, "candle_rollups", df)
+        raise ValueError(f"par {market.pair_key(pair)} fora da WATCHLIST e dos rollups")
+
+    where, params = [market.PAIR_WHERE], list(pair)
+    if start:
+        where.append("time >= %s")
+        params.append(start)
+    if end:
+        where.append("time <= %s")
+        params.append(end)
+    with pg_conn() as conn:
+        df = pd.read_sql(
+            f"""SELECT time, open, high, low, close, volume FROM (
+                  SELECT time, open, high, low, close, volume FROM btc_candles
+                  WHERE {' AND '.join(where)} ORDER BY time DESC LIMIT %s
+                ) t ORDER BY time""",
+            conn,
+            params=(*params, int(limit)),
+        )
+    return _response(pair, "btc_candles", df)
+
+
+def _response(pair: market.Pair, source: str, df: pd.DataFrame) -> dict:
+    candles = [
+        {"time": pd.Timestamp(t).isoformat(), "open": float(o), "high": float(h), "low": float(l),
+         "close": float(c), "volume": float(v)}
+        for t, o, h, l, c, v in df[["time", "open", "high", "low", "close", "volume"]].itertuples(index=False, name=None)
+    ]
+    return {"status": "ok", "symbol": pair[0], "interval": pair[1], "source": source, "candles": candles}
@@ -0,0 +1,266 @@
+"""Agregados móveis de erro da série 'futures', mantidos incrementalmente.
+
+Para cada janela N (as N linhas válidas mais recentes de futures; FUTURES_ERROR_WINDOWS
++ FUTURES_ROLLING_N) a tabela futures_error_windows guarda somas e contagens:
+- soma de APE (MAPE), de |erro| (MAE) e de erro com sinal pred - real (viés);
+- acertos de direção (sinal de pred - prev_close igual ao de real - prev_close), só nas
+  linhas com prev_close;
+- histograma de |err_close| em bins log-espaçados (ERR_BIN_EDGES): quantis aproximados
+  (p50/p90/p99) com erro relativo de ~1 bin (~12%).
+
+apply_upsert() roda na mesma transação do upsert em futures (save_predictions_for_times),
+sob advisory lock: linhas novas mais recentes que a janela entram e as mais antigas saem
+(uma leitura por índice de k+1 linhas); linhas já existentes dentro da janela trocam a
+contribuição antiga pela nova. Inserções no meio da janela recalculam aquela janela
+(uma consulta de N linhas), assim como a cada N operações, para limitar o acúmulo de
+erro de ponto flutuante das somas.
+
+Leitura (get_window_stats) é um SELECT por chave primária, qualquer que seja N.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Iterable, Optional
+
+import numpy as np
+
+from core.config import settings
+from core.db import pg_conn
+
+_LOCK_KEY = 0x66657272  # "ferr"
+# |err_close| em USD: bin 0 = [0, 0.01), 1..80 log-espaçados até 1e5, 81 = >= 1e5
+ERR_BIN_EDGES = np.geomspace(0.01, 1e5, 81)
+N_BINS = len(ERR_BIN_EDGES) + 1
+QUANTILES = (0.5, 0.9, 0.99)
+
+_VALID = "real_close IS NOT NULL AND real_close <> 0 AND pred_close IS NOT NULL"
+
+
+def configured_windows() -> list[int]:
+    return sorted({int(n) for n in settings.FUTURES_ERROR_WINDOWS if int(n) > 0} | {int(settings.FUTURES_ROLLING_N)})
+
+
+# ---------------- estado ----------------
+@dataclass
+class WindowState:
+    window_n: int
+    n: int = 0
+    sum_ape: float = 0.0
+    sum_abs: float = 0.0
+    sum_signed: float = 0.0
+    dir_n: int = 0
+    dir_hits: int = 0
+    hist: np.ndarray = field(default_factory=lambda: np.zeros(N_BINS, dtype=np.int64))
+    first_time: Optional[datetime] = None
+    last_time: Optional[datetime] = None
+    ops: int = 0
+
+    def apply(self, rows: np.ndarray, sign: int) -> None:
+        """Soma (sign=+1) ou remove (sign=-1) linhas (pred, real, prev_close) das somas."""
+        if len(rows) == 0:
+            return
+        pred, real, prev = rows[:, 0], rows[:, 1], rows[:, 2]
+        d = pred - real
+        ae = np.abs(d)
+        self.n += sign * len(rows)
+        self.sum_ape += sign * float((ae / np.abs(real)).sum() * 100.0)
+        self.sum_abs += sign * float(ae.sum())
+        self.sum_signed += sign * float(d.sum())
+        has_prev = np.isfinite(prev)
+        hits = np.sign(pred[has_prev] - prev[has_prev]) == np.sign(real[has_prev] - prev[has_prev])
+        self.dir_n += sign * int(has_prev.sum())
+        self.dir_hits += sign * int(hits.sum())
+        np.add.at(self.hist, np.searchsorted(ERR_BIN_EDGES, ae, side="right"), sign)
+        self.ops += len(rows)
+
+    def quantile(self, q: float) -> Optional[float]:
+        if self.n <= 0:
+            return None
+        cum = np.cumsum(self.hist)
+        target = q * self.n
+        i = int(np.searchsorted(cum, target, side="left"))
+        if i == 0:
+            return float(ERR_BIN_EDGES[0] * target / max(cum[0], 1))
+        if i >= len(ERR_BIN_EDGES):
+            return float(ERR_BIN_EDGES[-1])
+        lo, hi = ERR_BIN_EDGES[i - 1], ERR_BIN_EDGES[i]
+        inside = (target - cum[i - 1]) / max(self.hist[i], 1)
+        return float(lo * (hi / lo) ** inside)  # interpolação geométrica dentro do bin
+
+    def as_dict(self) -> dict:
+        n = self.n
+        return {
+            "window": self.window_n,
+            "n": n,
+            "mape": self.sum_ape / n if n else None,
+            "mae": self.sum_abs / n if n else None,
+            "bias": self.sum_signed / n if n else None,
+            "dir_hit_rate": self.dir_hits / self.dir_n if self.dir_n else None,
+            "dir_n": self.dir_n,
+            "quantiles": {f"p{int(round(q * 100))}": self.quantile(q) for q in QUANTILES},
+            "first_time": self.first_time.isoformat() if self.first_time else None,
+            "last_time": self.last_time.isoformat() if self.last_time else None,
+        }
+
+
+def _as_array(rows: Iterable[tuple]) -> np.ndarray:
+    """(pred, real, prev_close) -> float64 (n, 3); prev_close ausente vira NaN."""
+    out = [(float(p), float(r), float(pc) if pc is not None else np.nan) for p, r, pc in rows]
+    return np.asarray(out, dtype=np.float64).reshape(-1, 3)
+
+
+def _is_valid(pred, real) -> bool:
+    return pred is not None and real is not None and float(real) != 0.0
+
+
+_STATE_COLS = "window_n, n, sum_ape, sum_abs, sum_signed, dir_n, dir_hits, hist, first_time, last_time, ops"
+
+
+def _state_from_row(r) -> WindowState:
+    return WindowState(
+        window_n=int(r[0]), n=int(r[1]), sum_ape=float(r[2]), sum_abs=float(r[3]), sum_signed=float(r[4]),
+        dir_n=int(r[5]), dir_hits=int(r[6]), hist=np.asarray(r[7], dtype=np.int64),
+        first_time=r[8], last_time=r[9], ops=int(r[10]),
+    )
+
+
+def _load_states(cur) -> dict[int, WindowState]:
+    cur.execute(f"SELECT {_STATE_COLS} FROM futures_error_windows;")
+    return {int(r[0]): _state_from_row(r) for r in cur.fetchall()}
+
+
+def _save_state(cur, st: WindowState) -> None:
+    cur.execute(
+        """
+        INSERT INTO futures_error_windows(window_n, n, sum_ape, sum_abs, sum_signed, dir_n, dir_hits, hist,
+                                          first_time, last_time, ops, updated_at)
+        VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,NOW())
+        ON CONFLICT (window_n) DO UPDATE SET
+          n = EXCLUDED.n, sum_ape = EXCLUDED.sum_ape, sum_abs = EXCLUDED.sum_abs,
+          sum_signed = EXCLUDED.sum_signed, dir_n = EXCLUDED.dir_n, dir_hits = EXCLUDED.dir_hits,
+          hist = EXCLUDED.hist, first_time = EXCLUDED.first_time, last_time = EXCLUDED.last_time,
+          ops = EXCLUDED.ops, updated_at = NOW();
+        """,
+        (st.window_n, st.n, st.sum_ape, st.sum_abs, st.sum_signed, st.dir_n, st.dir_hits,
+         st.hist.astype(int).tolist(), st.first_time, st.last_time, st.ops),
+    )
+
+
+def _recompute(cur, window_n: int) -> WindowState:
+    """Estado da janela a partir das N linhas válidas mais recentes (O(N))."""
+    cur.execute(
+        f"""SELECT time, pred_close::float8, real_close::float8, prev_close::float8
+            FROM futures WHERE {_VALID} ORDER BY time DESC LIMIT %s;""",
+        (int(window_n),),
+    )
+    rows = cur.fetchall()
+    st = WindowState(window_n=int(window_n))
+    if rows:
+        st.apply(_as_array((r[1], r[2], r[3]) for r in rows), +1)
+        st.first_time, st.last_time = rows[-1][0], rows[0][0]
+    st.ops = 0
+    return st
+
+
+# ---------------- escrita ----------------
+def apply_upsert(cur, rows: list[tuple], old: dict) -> None:
+    """Atualiza os agregados após um upsert em futures, na mesma transação.
+
+    rows: (time, pred_close, real_close, err_close, prev_close) gravados;
+    old: time -> (pred_close, real_close, prev_close) das linhas que já existiam antes.
+    """
+    if not rows:
+        return
+    cur.execute("SELECT pg_advisory_xact_lock(%s);", (_LOCK_KEY,))
+    windows = configured_windows()
+    # janelas que saíram da configuração deixam de ser mantidas: remove os agregados congelados
+    cur.execute("DELETE FROM futures_error_windows WHERE window_n <> ALL(%s);", (windows,))
+    states = _load_states(cur)
+    appended = sorted((r for r in rows if r[0] not in old), key=lambda r: r[0])
+    updated = [r for r in rows if r[0] in old]
+    for window_n in windows:
+        st = states.get(window_n)
+        if st is None or st.n == 0 or st.ops >= window_n or not _apply_incremental(cur, st, appended, updated, old):
+            st = _recompute(cur, window_n)
+        _save_state(cur, st)
+
+
+def _apply_incremental(cur, st: WindowState, appended: list[tuple], updated: list[tuple], old: dict) -> bool:
+    """Aplica as linhas ao estado; False quando só um recálculo da janela resolve."""
+    if len(appended) > st.window_n:
+        return False
+    if appended and (appended[0][0] <= st.last_time or any(not _is_valid(r[1], r[2]) for r in appended)):
+        return False  # inserção no meio da janela
+    for r in updated:
+        if r[0] < st.first_time:
+            continue  # fora da janela
+        o = old[r[0]]
+        if not (_is_valid(o[0], o[1]) and _is_valid(r[1], r[2])):
+            return False  # muda quais linhas pertencem à janela
+        st.apply(_as_array([o]), -1)
+        st.apply(_as_array([(r[1], r[2], r[4])]), +1)
+    if not appended:
+        return True
+    st.apply(_as_array((r[1], r[2], r[4]) for r in appended), +1)
+    st.last_time = appended[-1][0]
+    evict = st.n - st.window_n
+    if evict > 0:
+        # as 'evict' linhas mais antigas saem; a seguinte passa a ser o início da janela
+        cur.execute(
+            f"""SELECT time, pred_close::float8, real_close::float8, prev_close::float8
+                FROM futures WHERE time >= %s AND {_VALID} ORDER BY time LIMIT %s;""",
+            (st.first_time, evict + 1),
+        )
+        out = cur.fetchall()
+        if len(out) < evict + 1:
+            return False
+        st.apply(_as_array((r[1], r[2], r[3]) for r in out[:evict]), -1)
+        st.first_time = out[evict][0]
+    return True
+
+
+# ---------------- leitura ----------------
+def get_window_stats(window_n: int) -> Optional[dict]:
+    """Agregados da janela N (uma leitura por chave); calcula e grava na primeira vez.
+
+    Janelas fora de configured_windows() não são mantidas pelos upserts: são calculadas
+    na hora (O(N)) e não gravadas.
+    """
+    with pg_conn() as conn:
+        with conn.cursor() as cur:
+            if int(window_n) not in configured_windows():
+                # uma linha gravada de quando a janela estava configurada está congelada
+                return _recompute(cur, window_n).as_dict()
+            cur.execute(f"SELECT {_STATE_COLS} FROM futures_error_windows WHERE window_n=%s;", (int(window_n),))
+            r = cur.fetchone()
+            if r is not None:
+                return _state_from_row(r).as_dict()
+            cur.execute("SELECT pg_advisory_xact_lock(%s);", (_LOCK_KEY,))
+            st = _recompute(cur, window_n)
+            _save_state(cur, st)
+    return st.as_dict()
+
+
+def get_all_stats(windows: Optional[list[int]] = None) -> list[dict]:
+    return [get_window_stats(n) for n in (windows or configured_windows())]
+
+
+def rolling_mape(window_n: int) -> Optional[float]:
+    """MAPE(%) das últimas N linhas de futures, lido dos agregados (usado pela política de retreino)."""
+    stats = get_window_stats(window_n)
+    return stats["mape"] if stats else None
+
+
+def rebuild_all() -> list[dict]:
+    """Recalcula todas as janelas configuradas a partir de futures."""
+    out = []
+    with pg_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT pg_advisory_xact_lock(%s);", (_LOCK_KEY,))
+            cur.execute("DELETE FROM futures_error_windows;")
+            for n in configured_windows():
+                st = _recompute(cur, n)
+                _save_state(cur, st)
+                out.append(st.as_dict())
+    return out
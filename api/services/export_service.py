@@ -0,0 +1,331 @@
+"""Exportação/importação colunar (Parquet ou Arrow IPC) de candles, features, series_cache e futures.
+
+- Leitura em lotes de EXPORT_BATCH_ROWS por cursor nomeado (server-side): o processo nunca
+  tem mais que um lote na memória, qualquer que seja o intervalo de tempo.
+- Cada lote vira um RecordBatch escrito direto no destino (arquivo, ou os bytes vão sendo
+  entregues pela resposta HTTP); NUMERIC sai como float64, arrays como list<float64>.
+- export_dir() grava um arquivo por dataset + manifest.json (intervalo, linhas, versão das
+  features); import_dir() lê os arquivos em lotes, COPY FROM STDIN numa tabela temporária e
+  INSERT ... ON CONFLICT DO NOTHING no destino (as partições dos meses
+  importados são criadas antes, numa primeira leitura só da coluna time).
+  Depois recalcula o que é derivado: rollups, agregados de erro e, se as features não
+  vieram na versão atual, a feature store.
+
+pyarrow só é importado aqui, nas funções que precisam dele.
+
+CLI (a partir de api/):
+  python -m services.export_service export --out /tmp/snap --start 2025-01-01 --format parquet
+  python -m services.export_service import --dir /tmp/snap
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+import io
+import json
+import os
+from datetime import datetime
+from typing import Iterator, Optional
+
+from core import partitioning
+from core.config import settings
+from core.db import pg_conn
+from core.logging import log_job
+
+FORMATS = {"parquet": ".parquet", "arrow": ".arrow"}
+MEDIA_TYPES = {"parquet": "application/vnd.apache.parquet", "arrow": "application/vnd.apache.arrow.stream"}
+
+# dataset -> (tabela, [(coluna, tipo)]); tipos: text, ts, float, int, float[]
+DATASETS: dict[str, tuple[str, list[tuple[str, str]]]] = {
+    "candles": ("btc_candles", [
+        ("symbol", "text"), ("interval", "text"), ("time", "ts"),
+        ("open", "float"), ("high", "float"), ("low", "float"), ("close", "float"), ("volume", "float"),
+    ]),
+    "features": ("candle_features", [
+        ("time", "ts"), ("feature_version", "text"), ("features", "float[]"), ("targets", "float[]"),
+        ("dir_next", "int"), ("computed_at", "ts"),
+    ]),
+    "series_cache": ("series_cache", [
+        ("time", "ts"), ("open", "float"), ("high", "float"), ("low", "float"), ("close", "float"),
+        ("volume", "float"), ("pred_open_next", "float"), ("pred_high_next", "float"),
+        ("pred_low_next", "float"), ("pred_close_next", "float"), ("pred_amp_next", "float"),
+        ("cls_dir_next", "int"), ("prob_up", "float"), ("prob_down", "float"),
+        ("err_close_abs", "float"), ("err_close_signed", "float"), ("err_amp_abs", "float"),
+    ]),
+    "futures": ("futures", [
+        ("time", "ts"), ("pred_close", "float"), ("real_close", "float"), ("err_close", "float"),
+        ("prev_close", "float"),
+    ]),
+}
+
+_SQL_CAST = {"float": "::double precision", "float[]": "::double precision[]"}
+
+
+def _arrow_schema(dataset: str):
+    import pyarrow as pa
+
+    types = {
+        "text": pa.string(), "ts": pa.timestamp("us"), "float": pa.float64(),
+        "int": pa.int32(), "float[]": pa.list_(pa.float64()),
+    }
+    return pa.schema([(name, types[kind]) for name, kind in DATASETS[dataset][1]])
+
+
+def _where(start, end) -> tuple[str, list]:
+    parts, params = [], []
+    if start:
+        parts.append("time >= %s")
+        params.append(start)
+    if end:
+        parts.append("time <= %s")
+        params.append(end)
+    return ("WHERE " + " AND ".join(parts)) if parts else "", params
+
+
+# ---------------- exportação ----------------
+def iter_batches(dataset: str, start=None, end=None, batch_rows: Optional[int] = None):
+    """RecordBatches do dataset em ordem de tempo, lidos por cursor server-side."""
+    import pyarrow as pa
+
+    table, cols = DATASETS[dataset]
+    schema = _arrow_schema(dataset)
+    batch_rows = int(batch_rows or settings.EXPORT_BATCH_ROWS)
+    where, params = _where(start, end)
+    select = ", ".join(f"{name}{_SQL_CAST.get(kind, '')}" for name, kind in cols)
+    conn = pg_conn()
+    try:
+        with conn.cursor(name=f"export_{dataset}") as cur:
+            cur.itersize = batch_rows
+            cur.execute(f"SELECT {select} FROM {table} {where} ORDER BY time", params)
+            while True:
+                rows = cur.fetchmany(batch_rows)
+                if not rows:
+                    break
+                columns = list(zip(*rows))
+                yield pa.RecordBatch.from_arrays(
+                    [pa.array(columns[i], type=schema.field(i).type) for i in range(len(cols))], schema=schema
+                )
+    finally:
+        conn.close()
+
+
+def _open_writer(sink, dataset: str, fmt: str):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = _arrow_schema(dataset)
+    if fmt == "parquet":
+        return pq.ParquetWriter(sink, schema, compression="zstd")
+    return pa.ipc.new_stream(sink, schema)
+
+
+def write_dataset(path: str, dataset: str, fmt: str, start=None, end=None) -> int:
+    """Grava o dataset em 'path' lote a lote. Retorna o número de linhas."""
+    n = 0
+    writer = _open_writer(path, dataset, fmt)
+    try:
+        for batch in iter_batches(dataset, start, end):
+            writer.write_batch(batch)
+            n += batch.num_rows
+    finally:
+        writer.close()
+    return n
+
+
+class _ChunkSink:
+    """Destino 'arquivo' que acumula bytes até serem drenados pela resposta HTTP."""
+
+    def __init__(self):
+        self._chunks: list[bytes] = []
+        self._pos = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        b = bytes(data)
+        self._chunks.append(b)
+        self._pos += len(b)
+        return len(b)
+
+    def tell(self) -> int:
+        return self._pos
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def drain(self) -> bytes:
+        out = b"".join(self._chunks)
+        self._chunks.clear()
+        return out
+
+
+def stream_dataset(dataset: str, fmt: str, start=None, end=None) -> Iterator[bytes]:
+    """Bytes do arquivo Parquet/Arrow gerados lote a lote (para StreamingResponse)."""
+    import pyarrow as pa
+
+    sink = _ChunkSink()
+    writer = _open_writer(pa.PythonFile(sink, mode="w"), dataset, fmt)
+    try:
+        for batch in iter_batches(dataset, start, end):
+            writer.write_batch(batch)
+            chunk = sink.drain()
+            if chunk:
+                yield chunk
+    finally:
+        writer.close()
+    tail = sink.drain()
+    if tail:
+        yield tail
+
+
+def export_dir(out_dir: str, start=None, end=None, fmt: str = "parquet", datasets: Optional[list[str]] = None) -> dict:
+    from ml.features import feature_set_version
+
+    os.makedirs(out_dir, exist_ok=True)
+    manifest = {
+        "format": fmt,
+        "start": str(start) if start else None,
+        "end": str(end) if end else None,
+        "created_at": datetime.utcnow().isoformat(),
+        "feature_set_version": feature_set_version(),
+        "datasets": {},
+    }
+    for name in datasets or list(DATASETS):
+        fname = name + FORMATS[fmt]
+        rows = write_dataset(os.path.join(out_dir, fname), name, fmt, start, end)
+        manifest["datasets"][name] = {"file": fname, "rows": rows}
+    with open(os.path.join(out_dir, "manifest.json"), "w", encoding="utf-8") as fh:
+        json.dump(manifest, fh, indent=2)
+    return manifest
+
+
+# ---------------- importação ----------------
+def _read_batches(path: str, fmt: str, columns: Optional[list[str]] = None):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    if fmt == "parquet":
+        yield from pq.ParquetFile(path).iter_batches(batch_size=int(settings.EXPORT_BATCH_ROWS), columns=columns)
+        return
+    with pa.OSFile(path, "rb") as fh:
+        for batch in pa.ipc.open_stream(fh):
+            yield batch.select(columns) if columns else batch
+
+
+def _time_range(path: str, fmt: str):
+    """(min, max) da coluna time do arquivo, sem supor ordem; (None, None) se vazio."""
+    import pyarrow.compute as pc
+
+    lo = hi = None
+    for batch in _read_batches(path, fmt, columns=["time"]):
+        if batch.num_rows == 0:
+            continue
+        mm = pc.min_max(batch.column(0))
+        b_lo, b_hi = mm["min"].as_py(), mm["max"].as_py()
+        if b_lo is None:
+            continue
+        lo = b_lo if lo is None else min(lo, b_lo)
+        hi = b_hi if hi is None else max(hi, b_hi)
+    return lo, hi
+
+
+def _csv_value(v, kind: str):
+    if v is None:
+        return None
+    if kind == "float[]":
+        return "{" + ",".join("NULL" if x is None else repr(float(x)) for x in v) + "}"
+    if kind == "ts":
+        return v.isoformat()
+    return v
+
+
+def _copy_batch(cur, table: str, cols: list[tuple[str, str]], batch) -> int:
+    """COPY do lote para a tabela temporária e INSERT no destino ignorando chaves já existentes."""
+    names = [name for name, _ in cols]
+    data = batch.to_pydict()
+    buf = io.StringIO()
+    w = csv.writer(buf)
+    for row in zip(*(data[name] for name in names)):
+        w.writerow([_csv_value(v, kind) for v, (_, kind) in zip(row, cols)])
+    buf.seek(0)
+    col_list = ", ".join(names)
+    cur.execute("TRUNCATE _import_stage;")
+    cur.copy_expert(f"COPY _import_stage ({col_list}) FROM STDIN WITH (FORMAT csv)", buf)
+    cur.execute(f"INSERT INTO {table} ({col_list}) SELECT {col_list} FROM _import_stage ON CONFLICT DO NOTHING;")
+    return cur.rowcount
+
+
+def import_file(path: str, dataset: str, fmt: str) -> int:
+    """Importa um arquivo exportado; retorna as linhas inseridas (existentes são mantidas)."""
+    table, cols = DATASETS[dataset]
+    if table in partitioning.PARTITIONED_TABLES:
+        # antes da transação: o CREATE TABLE ... PARTITION OF de ensure_partitions_for roda em
+        # outra conexão e ficaria esperando para sempre pelos locks que a importação segura na mãe
+        lo, hi = _time_range(path, fmt)
+        if lo is not None:
+            partitioning.ensure_partitions_for(table, [lo, hi])
+    inserted = 0
+    with pg_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute(f"CREATE TEMP TABLE _import_stage (LIKE {table} INCLUDING DEFAULTS) ON COMMIT DROP;")
+            for batch in _read_batches(path, fmt):
+                if batch.num_rows == 0:
+                    continue
+                inserted += _copy_batch(cur, table, cols, batch)
+    return inserted
+
+
+def import_dir(in_dir: str) -> dict:
+    from ml.features import feature_set_version
+    from services import error_analytics_service, feature_store_service, rollup_service
+
+    with open(os.path.join(in_dir, "manifest.json"), encoding="utf-8") as fh:
+        manifest = json.load(fh)
+    fmt = manifest["format"]
+    datasets = manifest["datasets"]
+    # features de outra versão de FEATURE_COLS seriam descartadas: recalcula a partir dos candles
+    same_version = manifest.get("feature_set_version") == feature_set_version()
+    out = {}
+    for name in ("candles", "features", "series_cache", "futures"):
+        if name not in datasets or (name == "features" and not same_version):
+            continue
+        out[name] = import_file(os.path.join(in_dir, datasets[name]["file"]), name, fmt)
+    if out.get("candles"):
+        rollup_service.rebuild()
+        if "features" not in out:
+            feature_store_service.recompute_features()
+    if out.get("futures"):
+        error_analytics_service.rebuild_all()
+    return {"inserted": out, "feature_set_version_match": same_version}
+
+
+def main(argv=None) -> None:
+    ap = argparse.ArgumentParser(description="Exporta/importa candles, features, series_cache e futures (Parquet/Arrow).")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    ex = sub.add_parser("export")
+    ex.add_argument("--out", required=True)
+    ex.add_argument("--start", default=None)
+    ex.add_argument("--end", default=None)
+    ex.add_argument("--format", choices=sorted(FORMATS), default="parquet")
+    ex.add_argument("--dataset", action="append", choices=sorted(DATASETS), default=None)
+    im = sub.add_parser("import")
+    im.add_argument("--dir", required=True)
+    args = ap.parse_args(argv)
+
+    start = datetime.utcnow()
+    if args.cmd == "export":
+        result = export_dir(args.out, args.start, args.end, args.format, args.dataset)
+    else:
+        try:
+            result = import_dir(args.dir)
+        except Exception as e:
+            log_job("import", "error", str(e), start, datetime.utcnow())
+            raise
+        log_job("import", "ok", json.dumps(result["inserted"]), start, datetime.utcnow())
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
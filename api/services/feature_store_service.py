@@ -0,0 +1,281 @@
+"""Feature store: features e targets calculados uma vez por candle e gravados no Postgres.
+
+Tabela candle_features (time PK; só o par principal de btc_candles, core/market.py), com a versão do conjunto de features
+(ml.features.feature_set_version) e os valores em arrays na ordem de
+FEATURE_COLS / TARGET_REG_COLS:
+- sync_features(): chamado a cada upsert_candles; calcula só os candles novos (com os
+  10 anteriores como histórico) e completa os targets do candle que ganhou sucessor;
+- recompute_features(): recálculo em blocos, em background (start_background_recompute)
+  quando a versão gravada difere da atual ou após um backfill que preencheu lacunas;
+- load_feature_window(): entrega (df2, X, Yreg, Ycls) de um intervalo de tempo no mesmo
+  formato de build_features_targets. Se alguma linha do intervalo ainda não estiver na
+  store (recompute em andamento, lacuna), calcula na hora a partir dos candles já lidos.
+
+Recompute e sync usam o mesmo advisory lock, então só um processo escreve por vez.
+"""
+from __future__ import annotations
+
+import threading
+from datetime import datetime
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from core.db import pg_conn
+from core.logging import log_job
+from core.market import PAIR_WHERE, primary_pair
+from ml.features import FEATURE_COLS, TARGET_REG_COLS, build_features_targets, feature_set_version
+from ml.streaming_features import VOL_WINDOW, compute_features_batch, compute_targets_batch
+
+_LOCK_KEY = 0x66656174  # "feat"
+_CANDLE_COLS = ["time", "open", "high", "low", "close", "volume"]
+
+
+# ---------------- escrita ----------------
+def _feature_rows(df: pd.DataFrame, version: str, after=None) -> list[tuple]:
+    """Linhas (time, version, features, targets, dir_next) para os candles de df com histórico completo.
+
+    O último candle de df fica sem targets (NULL) até o próximo chegar.
+    """
+    if df.empty:
+        return []
+    o, h, l, c, v = (df[k].to_numpy(dtype=np.float64) for k in ("open", "high", "low", "close", "volume"))
+    X = compute_features_batch(c, h, l, v)
+    Y, d = compute_targets_batch(o, h, l, c)
+    ok = np.isfinite(X).all(axis=1)
+    if after is not None:
+        ok &= (pd.to_datetime(df["time"]) > pd.Timestamp(after)).to_numpy()
+    times = pd.to_datetime(df["time"]).dt.to_pydatetime()
+    last = len(df) - 1
+    rows = []
+    for i in np.flatnonzero(ok):
+        has_next = i < last
+        rows.append((
+            times[i],
+            version,
+            X[i].tolist(),
+            Y[i].tolist() if has_next else None,
+            int(d[i]) if has_next else None,
+        ))
+    return rows
+
+
+def _upsert_rows(conn, rows: list[tuple]) -> None:
+    if not rows:
+        return
+    from psycopg2.extras import execute_values
+
+    with conn.cursor() as cur:
+        execute_values(
+            cur,
+            """
+            INSERT INTO candle_features (time, feature_version, features, targets, dir_next)
+            VALUES %s
+            ON CONFLICT (time) DO UPDATE SET
+              feature_version = EXCLUDED.feature_version,
+              features = EXCLUDED.features,
+              targets = EXCLUDED.targets,
+              dir_next = EXCLUDED.dir_next,
+              computed_at = NOW()
+            """,
+            rows,
+            page_size=1000,
+        )
+
+
+def sync_features() -> int:
+    """Calcula features dos candles posteriores ao último com targets na versão atual."""
+    version = feature_set_version()
+    with pg_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT pg_try_advisory_xact_lock(%s)", (_LOCK_KEY,))
+            if not cur.fetchone()[0]:
+                # recompute (ou outro sync) em andamento; ele cobre estes candles
+                return 0
+            cur.execute(
+                "SELECT max(time) FROM candle_features WHERE feature_version = %s AND targets IS NOT NULL",
+                (version,),
+            )
+            anchor = cur.fetchone()[0]
+        rows = []
+        if anchor is not None:
+            df = pd.read_sql(
+                """
+                SELECT time, open, high, low, close, volume
+                FROM btc_candles
+                WHERE symbol = %s AND interval = %s AND time >= COALESCE(
+                  (SELECT time FROM btc_candles WHERE symbol = %s AND interval = %s AND time <= %s
+                   ORDER BY time DESC OFFSET %s LIMIT 1), %s)
+                ORDER BY time
+                """,
+                conn,
+                params=(*primary_pair(), *primary_pair(), anchor, VOL_WINDOW, anchor),
+            )
+            rows = _feature_rows(df, version, after=anchor)
+            _upsert_rows(conn, rows)
+    if anchor is None:
+        # store vazia ou de outra versão: recalcula tudo fora da requisição. Só depois do
+        # COMMIT acima, que solta o xact lock; antes, o recompute não o pegaria e desistiria.
+        start_background_recompute()
+        return 0
+    return len(rows)
+
+
+def recompute_features(since: Optional[datetime] = None, chunk_size: int = 50_000) -> int:
+    """Recalcula a store (toda ou a partir de 'since') em blocos de chunk_size candles."""
+    version = feature_set_version()
+    total = 0
+    with pg_conn() as conn:
+        lower = None
+        if since is not None:
+            with conn.cursor() as cur:
+                # VOL_WINDOW candles antes de 'since' como histórico (e para completar os targets do anterior)
+                cur.execute(
+                    f"SELECT time FROM btc_candles WHERE {PAIR_WHERE} AND time < %s ORDER BY time DESC OFFSET %s LIMIT 1",
+                    (*primary_pair(), since, VOL_WINDOW - 1),
+                )
+                row = cur.fetchone()
+                lower = row[0] if row else None
+        carry = pd.DataFrame(columns=_CANDLE_COLS)
+        first = True
+        while True:
+            if lower is None:
+                where, params = f"WHERE {PAIR_WHERE}", (*primary_pair(), chunk_size)
+            else:
+                where, params = f"WHERE {PAIR_WHERE} AND time {'>=' if first else '>'} %s", (*primary_pair(), lower, chunk_size)
+            chunk = pd.read_sql(
+                f"SELECT time, open, high, low, close, volume FROM btc_candles {where} ORDER BY time LIMIT %s",
+                conn,
+                params=params,
+            )
+            if chunk.empty:
+                break
+            combined = chunk if carry.empty else pd.concat([carry, chunk], ignore_index=True)
+            rows = _feature_rows(combined, version)
+            _upsert_rows(conn, rows)
+            conn.commit()
+            total += len(rows)
+            carry = combined.tail(VOL_WINDOW).reset_index(drop=True)
+            lower, first = chunk["time"].iloc[-1], False
+            if len(chunk) < chunk_size:
+                break
+    return total
+
+
+_BG_THREAD: Optional[threading.Thread] = None
+_BG_LOCK = threading.Lock()
+
+
+def _recompute_guarded(since: Optional[datetime]) -> None:
+    start = datetime.utcnow()
+    lock_conn = pg_conn()
+    lock_conn.autocommit = True
+    try:
+        with lock_conn.cursor() as cur:
+            cur.execute("SELECT pg_try_advisory_lock(%s)", (_LOCK_KEY,))
+            if not cur.fetchone()[0]:
+                return
+        try:
+            n = recompute_features(since)
+            log_job("features", "ok", f"Feature store {feature_set_version()}: {n} linhas recalculadas", start, datetime.utcnow())
+        except Exception as e:
+            log_job("features", "error", str(e), start, datetime.utcnow())
+        finally:
+            with lock_conn.cursor() as cur:
+                cur.execute("SELECT pg_advisory_unlock(%s)", (_LOCK_KEY,))
+    finally:
+        lock_conn.close()
+
+
+def start_background_recompute(since: Optional[datetime] = None) -> bool:
+    """Dispara o recálculo numa thread daemon. False se já houver um em andamento neste processo."""
+    global _BG_THREAD
+    with _BG_LOCK:
+        if _BG_THREAD is not None and _BG_THREAD.is_alive():
+            return False
+        _BG_THREAD = threading.Thread(
+            target=_recompute_guarded, args=(since,), name="feature-store-recompute", daemon=True
+        )
+        _BG_THREAD.start()
+    return True
+
+
+def ensure_feature_store() -> bool:
+    """Startup: agenda o recálculo se a store estiver vazia ou gravada com outra versão."""
+    version = feature_set_version()
+    with pg_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                SELECT EXISTS (SELECT 1 FROM candle_features WHERE feature_version <> %s)
+                    OR (NOT EXISTS (SELECT 1 FROM candle_features)
+                        AND EXISTS (SELECT 1 FROM btc_candles WHERE symbol = %s AND interval = %s))
+                """,
+                (version, *primary_pair()),
+            )
+            stale = bool(cur.fetchone()[0])
+    if stale:
+        return start_background_recompute()
+    return False
+
+
+def on_candles_upserted(df: pd.DataFrame) -> None:
+    """Hook de upsert_candles. A store é derivada dos candles: falhas nunca derrubam a ingestão."""
+    if df is None or df.empty:
+        return
+    try:
+        sync_features()
+    except Exception:
+        pass
+
+
+# ---------------- leitura ----------------
+def _frame_from_store(df: pd.DataFrame):
+    """(df2, X, Yreg, Ycls) com as mesmas linhas que build_features_targets manteria, ou None."""
+    n = len(df)
+    lo = VOL_WINDOW - 1  # primeiras linhas sem rolling(10) completo no intervalo
+    if n - 1 <= lo:
+        return None
+    part = df.iloc[lo:n - 1]  # a última linha do intervalo não tem target dentro dele
+    if part["features"].isna().any() or part["targets"].isna().any():
+        return None
+    feats = np.array(part["features"].tolist(), dtype=np.float64)
+    targets = np.array(part["targets"].tolist(), dtype=np.float64)
+    df2 = part[_CANDLE_COLS].reset_index(drop=True)
+    for j, col in enumerate(FEATURE_COLS):
+        df2[col] = feats[:, j]
+    for j, col in enumerate(TARGET_REG_COLS):
+        df2[col] = targets[:, j]
+    df2["dir_next"] = part["dir_next"].to_numpy(dtype=np.int64)
+    return df2, df2[FEATURE_COLS].copy(), df2[TARGET_REG_COLS].copy(), df2["dir_next"].copy()
+
+
+def load_feature_window(start=None, end=None, days: Optional[int] = None):
+    """Features/targets de um intervalo: start+end (BETWEEN), só start (>=) ou os últimos 'days'.
+
+    Retorna (df2, X, Yreg, Ycls, n_candles); n_candles é o total de candles do intervalo
+    (antes do descarte das linhas sem histórico/target), para os limites mínimos dos chamadores.
+    """
+    if start is not None and end is not None:
+        where, params = "c.time BETWEEN %s AND %s", (start, end)
+    elif start is not None:
+        where, params = "c.time >= %s", (start,)
+    else:
+        where, params = "c.time >= NOW() - %s::interval", (f"{days} days",)
+    with pg_conn() as conn:
+        df = pd.read_sql(
+            f"""
+            SELECT c.time, c.open, c.high, c.low, c.close, c.volume, f.features, f.targets, f.dir_next
+            FROM btc_candles c
+            LEFT JOIN candle_features f ON f.time = c.time AND f.feature_version = %s
+            WHERE c.symbol = %s AND c.interval = %s AND {where}
+            ORDER BY c.time
+            """,
+            conn,
+            params=(feature_set_version(), *primary_pair(), *params),
+        )
+    out = _frame_from_store(df)
+    if out is None:
+        out = build_features_targets(df[_CANDLE_COLS])
+    return (*out, len(df))
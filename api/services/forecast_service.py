@@ -0,0 +1,111 @@
+"""Previsão de k passos (rollout recursivo, ml/rollout.py) e backtest multi-horizonte."""
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from core.config import settings
+from ml.features import FEATURE_COLS
+from ml.rollout import origin_windows, rollout
+from ml.streaming_features import VOL_WINDOW, compute_features_batch
+from services import candle_buffer, inference_scheduler
+from services.feature_store_service import load_feature_window
+from services.lstm_bundle_service import load_bundle
+
+_OHLCV = ["open", "high", "low", "close", "volume"]
+
+
+def _latest_arrays(n: int):
+    """(times_ms, ohlcv, features) dos últimos n candles: buffer em memória ou, sem ele, banco."""
+    ring = candle_buffer.get_ring()
+    snap = ring.snapshot(last_n=n) if ring is not None else None
+    if snap is not None and len(snap[0]) >= n:
+        return snap[0], snap[1], snap[2].astype(np.float64)
+    df = candle_buffer.load_recent_candles(n + VOL_WINDOW)
+    if len(df) < n:
+        raise RuntimeError(f"Dados insuficientes: {len(df)} candles, são necessários {n}.")
+    ohlcv = df[_OHLCV].to_numpy(dtype=np.float64)
+    feats = compute_features_batch(ohlcv[:, 3], ohlcv[:, 1], ohlcv[:, 2], ohlcv[:, 4])
+    times = pd.to_datetime(df["time"]).to_numpy(dtype="datetime64[ms]").astype(np.int64)
+    return times[-n:], ohlcv[-n:], feats[-n:]
+
+
+def forecast(horizon: int) -> dict:
+    """Caminho previsto de 'horizon' candles a partir do último candle conhecido."""
+    bundle = load_bundle()
+    seq_len = int(bundle.seq_len)
+    times, ohlcv, feats = _latest_arrays(max(seq_len, VOL_WINDOW))
+    idx = [FEATURE_COLS.index(c) for c in bundle.feature_cols]
+    window = feats[-seq_len:, idx].astype(np.float32)
+    if not np.isfinite(window).all():
+        raise RuntimeError("Janela com features incompletas.")
+    paths, probs = rollout(
+        inference_scheduler.predict, window[None], ohlcv[None, -VOL_WINDOW:], bundle.feature_cols,
+        bundle.target_reg_cols, horizon,
+    )
+    step_ms = int(times[-1] - times[-2])
+    points = []
+    for k in range(horizon):
+        t = pd.Timestamp(int(times[-1]) + (k + 1) * step_ms, unit="ms")
+        p_up = float(probs[0, k])
+        points.append({
+            "step": k + 1,
+            "time": t.isoformat(),
+            "pred": {c: float(paths[0, k, j]) for j, c in enumerate(bundle.target_reg_cols)},
+            "prob_up": p_up,
+        })
+    return {
+        "status": "ok",
+        "base_time": pd.Timestamp(int(times[-1]), unit="ms").isoformat(),
+        "horizon": horizon,
+        "points": points,
+    }
+
+
+def backtest(horizon: int, days: Optional[int] = None, stride: int = 1) -> dict:
+    """Rollout de 'horizon' passos a partir de cada origem da janela (a cada 'stride' candles).
+
+    Todas as origens andam juntas: 'horizon' forwards em lote no total. Métricas por passo
+    sobre close: MAE, MAPE (%) e acerto de direção em relação ao close da origem.
+    """
+    start = datetime.utcnow()
+    days = days or settings.LOOKBACK_DAYS
+    bundle = load_bundle()
+    seq_len = int(bundle.seq_len)
+    df2, X, _, _, _ = load_feature_window(days=days)
+    n = len(df2)
+    first = max(seq_len, VOL_WINDOW) - 1
+    origins = np.arange(first, n - horizon, max(int(stride), 1))
+    if origins.size == 0:
+        return {"status": "error", "message": "Dados insuficientes para o horizonte pedido."}
+
+    ohlcv = df2[_OHLCV].to_numpy(dtype=np.float64)
+    windows, hist = origin_windows(X[bundle.feature_cols].to_numpy(), ohlcv, origins, seq_len)
+    paths, probs = rollout(inference_scheduler.predict, windows, hist, bundle.feature_cols,
+                           bundle.target_reg_cols, horizon)
+
+    close = ohlcv[:, 3]
+    close_idx = bundle.target_reg_cols.index("close_next")
+    base = close[origins]
+    steps = []
+    for k in range(horizon):
+        real = close[origins + k + 1]
+        pred = paths[:, k, close_idx]
+        err = np.abs(pred - real)
+        steps.append({
+            "step": k + 1,
+            "mae": float(err.mean()),
+            "mape": float((err / np.abs(real)).mean() * 100.0),
+            "dir_acc": float((np.sign(pred - base) == np.sign(real - base)).mean()),
+        })
+    return {
+        "status": "ok",
+        "days": days,
+        "horizon": horizon,
+        "origins": int(origins.size),
+        "elapsed_s": (datetime.utcnow() - start).total_seconds(),
+        "steps": steps,
+    }
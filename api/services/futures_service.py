@@ -1,66 +1,109 @@
-from datetime import datetime
+from datetime import datetime, timedelta
 from typing import Iterable, List, Optional
+import numpy as np
 import pandas as pd
+from core import notify, pagination, partitioning
 from core.db import pg_conn
-from ml.features import build_features_targets
+from core.streaming import iter_rows
+from ml.features import FEATURE_COLS
+from services import candle_buffer
+from services.feature_store_service import load_feature_window
+from services import error_analytics_service, inference_scheduler
 from services.lstm_bundle_service import load_bundle
 
 
-def ensure_table():
-    conn = pg_conn()
-    old_autocommit = conn.autocommit
-    try:
-        conn.autocommit = True
-        with conn.cursor() as cur:
-            cur.execute(
-                """
-                CREATE TABLE IF NOT EXISTS futures (
-                  time        TIMESTAMP PRIMARY KEY,
-                  pred_close  NUMERIC,
-                  real_close  NUMERIC,
-                  err_close   NUMERIC
-                );
-                """
-            )
-    finally:
-        conn.autocommit = old_autocommit
-        conn.close()
-
-
 def save_predictions_for_times(times: Iterable[datetime]):
     """Para cada time em 'times', calcula a previsão de close_next baseada no candle anterior
-    e insere (pred, real, erro) em 'futuros'. Ignora tempos já existentes.
+    e grava (pred, real, erro, close anterior) em 'futures' (regrava tempos já existentes).
+    Os agregados de erro (error_analytics_service) são atualizados na mesma transação.
     """
     times = sorted(set([t if isinstance(t, datetime) else pd.to_datetime(t).to_pydatetime() for t in times]))
     if not times:
         return 0
-    ensure_table()
-    min_time = min(times)
-    with pg_conn() as conn:
-        df = pd.read_sql(
-            """
-            SELECT time, open, high, low, close, volume
-            FROM btc_candles
-            WHERE time >= %s - INTERVAL '3 days'
-            ORDER BY time
-            """,
-            conn,
-            params=(min_time,),
-        )
-    if df.empty or len(df) < 3:
+    bundle = load_bundle()
+    # Caminho rápido: janelas já prontas no buffer em memória (sem banco nem pandas)
+    inserts, times = _predictions_from_ring(times, bundle)
+    if times:
+        inserts.extend(_predictions_from_db(times, bundle))
+    if not inserts:
         return 0
-    # Monta features com dropna (remove o último da janela consultada, mantendo pares prev->next)
-    df2, X, Yreg, _ = build_features_targets(df)
+    partitioning.ensure_partitions_for("futures", [r[0] for r in inserts])
+    with pg_conn() as conn:
+        with conn.cursor() as cur:
+            # valores anteriores das linhas regravadas: os agregados de erro trocam a contribuição
+            cur.execute(
+                "SELECT time, pred_close::float8, real_close::float8, prev_close::float8 FROM futures WHERE time = ANY(%s)",
+                ([r[0] for r in inserts],),
+            )
+            old = {r[0]: (r[1], r[2], r[3]) for r in cur.fetchall()}
+            cur.executemany(
+                """
+                INSERT INTO futures(time, pred_close, real_close, err_close, prev_close)
+                VALUES (%s,%s,%s,%s,%s)
+                ON CONFLICT (time) DO UPDATE SET
+                  pred_close = EXCLUDED.pred_close,
+                  real_close = EXCLUDED.real_close,
+                  err_close = EXCLUDED.err_close,
+                  prev_close = EXCLUDED.prev_close
+                """,
+                inserts,
+            )
+            written = cur.rowcount
+            error_analytics_service.apply_upsert(cur, inserts, old)
+            # GET /events (core/notify.py): entregue aos clientes no COMMIT
+            # buffer + fallback do banco não vêm em ordem: os pontos enviados são os mais novos
+            points = sorted(inserts, key=lambda r: r[0])
+            notify.publish(cur, "futures", {
+                "n": len(points),
+                "from": points[0][0].isoformat(), "to": points[-1][0].isoformat(),
+                "points": [
+                    {"time": t.isoformat(), "pred_close": pred, "real_close": real, "err_close": err}
+                    for t, pred, real, err, _ in points[-notify.MAX_POINTS:]
+                ],
+            })
+            return written
+
+
+def _predictions_from_ring(times: List[datetime], bundle) -> tuple[List[tuple], List[datetime]]:
+    """Previsões para os 'times' cobertos pelo buffer de candles; devolve (inserts, pendentes)."""
+    ring = candle_buffer.get_ring()
+    if ring is None or list(bundle.feature_cols) != list(FEATURE_COLS):
+        return [], list(times)
+    seq_len = int(bundle.seq_len)
+    close_idx = bundle.target_reg_cols.index("close_next")
+    found, pending = [], []
+    for T in times:
+        w = ring.window_before(T, seq_len)
+        if w is None:
+            pending.append(T)
+        else:
+            found.append((T, w))
+    if not found:
+        return [], pending
+    reg, _ = inference_scheduler.predict(np.stack([w[0] for _, w in found]))
+    inserts = []
+    for j, (T, (_, real_close, prev_close)) in enumerate(found):
+        pred_close = float(reg[j][close_idx])
+        inserts.append((T, pred_close, real_close, abs(pred_close - real_close), prev_close))
+    return inserts, pending
+
+
+def _predictions_from_db(times: List[datetime], bundle) -> List[tuple]:
+    min_time = min(times)
+    # Features com dropna (remove o último da janela consultada, mantendo pares prev->next)
+    df2, X, Yreg, _, n_candles = load_feature_window(start=min_time - timedelta(days=3))
+    if n_candles < 3:
+        return []
     # Mapa: time_next -> idx_prev (features em T-1 geram target em T)
     next_to_prev = {}
     for i in range(len(df2)-1):
         T_next = df2.iloc[i+1]["time"]
         next_to_prev[T_next] = i
-    bundle = load_bundle()
     seq_len = int(bundle.seq_len)
     close_idx = bundle.target_reg_cols.index("close_next")
-    # Construir inserts apenas quando houver par (T-1, T)
-    inserts: List[tuple] = []
+    # Construir inserts apenas quando houver par (T-1, T); todas as janelas num lote só
+    Xv = X[bundle.feature_cols].to_numpy(dtype="float32")
+    pairs: List[tuple] = []
     for T in times:
         T = pd.to_datetime(T).to_pydatetime()
         idx_prev = next_to_prev.get(pd.Timestamp(T))
@@ -69,73 +112,56 @@ def save_predictions_for_times(times: Iterable[datetime]):
         # Sem janela suficiente, não conseguimos prever
         if idx_prev < seq_len - 1:
             continue
-        idx_next = idx_prev + 1
-        win = X.iloc[idx_prev - seq_len + 1 : idx_prev + 1][bundle.feature_cols].to_numpy(dtype="float32")
-        win_scaled = bundle.scaler_x.transform(win).reshape((1, seq_len, len(bundle.feature_cols)))
-        p = bundle.model.predict(win_scaled, verbose=0)
-        reg = bundle.scaler_y.inverse_transform(p["reg"])[0]
-        pred_close = float(reg[close_idx])
-        real_close = float(df2.iloc[idx_next]["close"])
+        pairs.append((T, idx_prev))
+    if not pairs:
+        return []
+    wins = np.stack([Xv[i - seq_len + 1 : i + 1] for _, i in pairs])
+    reg, _ = inference_scheduler.predict(wins)
+    inserts: List[tuple] = []
+    for j, (T, idx_prev) in enumerate(pairs):
+        pred_close = float(reg[j][close_idx])
+        real_close = float(df2.iloc[idx_prev + 1]["close"])
+        prev_close = float(df2.iloc[idx_prev]["close"])
         err = abs(pred_close - real_close)
-        inserts.append((T, pred_close, real_close, err))
-    if not inserts:
-        return 0
-    with pg_conn() as conn:
-        with conn.cursor() as cur:
-            cur.executemany(
-                """
-                INSERT INTO futures(time, pred_close, real_close, err_close)
-                VALUES (%s,%s,%s,%s)
-                ON CONFLICT (time) DO UPDATE SET
-                  pred_close = EXCLUDED.pred_close,
-                  real_close = EXCLUDED.real_close,
-                  err_close = EXCLUDED.err_close
-                """,
-                inserts,
-            )
-            return cur.rowcount
+        inserts.append((T, pred_close, real_close, err, prev_close))
+    return inserts
 
 
-def load_futuros_series(start: Optional[str], end: Optional[str], limit: Optional[int] = None):
-    ensure_table()
+_SERIES_SELECT = "time, pred_close::float8, real_close::float8, err_close::float8"
+
+
+def _futures_point(r: tuple) -> dict:
+    # NaN/Inf viram null no encoder (core.fast_json), sem checagem valor a valor aqui
+    t, pred, real, err = r
+    return {"time": t.isoformat(), "pred_close": pred, "real_close": real, "err_close": err}
+
+
+def iter_futuros_series(start: Optional[str], end: Optional[str], limit: Optional[int] = None):
+    """Pontos de futures em ordem de tempo, lidos em lotes por cursor server-side."""
     params = []
     where = []
     if start and end:
         where.append("time BETWEEN %s AND %s")
         params.extend([start, end])
-    query = "SELECT time, pred_close, real_close, err_close FROM futures"
+    query = f"SELECT {_SERIES_SELECT} FROM futures"
     if where:
         query += " WHERE " + " AND ".join(where)
     if limit is not None:
-        # para pegar os últimos N pontos sem varrer tudo, ordena DESC, limita e reordena em memória
-        query += " ORDER BY time DESC LIMIT %s"
+        # para pegar os últimos N pontos sem varrer tudo, ordena DESC, limita e reordena no banco
+        query = f"SELECT * FROM ({query} ORDER BY time DESC LIMIT %s) t ORDER BY time"
         params.append(int(limit))
     else:
         query += " ORDER BY time"
-    with pg_conn() as conn:
-        df = pd.read_sql(query, conn, params=tuple(params))
-    if df.empty:
-        return {"points": []}
-    if limit is not None:
-        df = df.sort_values("time")
-    # Sanitiza NaN/Inf para None para compatibilidade com JSON
-    def f(x):
-        try:
-            import math
-            if x is None:
-                return None
-            xv = float(x)
-            if math.isnan(xv) or math.isinf(xv):
-                return None
-            return xv
-        except Exception:
-            return None
-    points = []
-    for _, r in df.iterrows():
-        points.append({
-            "time": pd.to_datetime(r["time"]).isoformat(),
-            "pred_close": f(r.get("pred_close")),
-            "real_close": f(r.get("real_close")),
-            "err_close": f(r.get("err_close")),
-        })
-    return {"points": points}
+    for r in iter_rows(query, params, name="futures_series"):
+        yield _futures_point(r)
+
+
+def load_futuros_series(start: Optional[str], end: Optional[str], limit: Optional[int] = None):
+    return {"points": list(iter_futuros_series(start, end, limit=limit))}
+
+
+def page_futuros_series(cursor: Optional[str] = None, limit: int = 1000, direction: str = "asc",
+                        start: Optional[str] = None, end: Optional[str] = None) -> dict:
+    """Página keyset de futures (ver core.pagination)."""
+    return pagination.fetch_page("futures", _SERIES_SELECT, _futures_point, cursor=cursor, limit=limit,
+                                 direction=direction, start=start, end=end)
@@ -0,0 +1,158 @@
+"""Agendador de inferência por worker: junta pedidos concorrentes num lote só.
+
+Chamadores (/series, futures, rebuild do cache, /predict) entregam janelas brutas
+(n, seq_len, F) a predict(). Uma thread por processo drena a fila: a partir do primeiro
+pedido espera no máximo INFERENCE_MAX_WAIT_MS por outros, até INFERENCE_MAX_BATCH
+janelas; o lote é completado com zeros até o próximo bucket potência de 2 (poucos
+formatos distintos = sem retracing do grafo) e os resultados voltam a cada chamador
+pelo seu Future. Pedidos maiores que INFERENCE_MAX_BATCH são quebrados em partes, para
+que pedidos pequenos não esperem um rebuild inteiro.
+
+Métricas: inference_batch_fill_ratio, inference_batch_rows, inference_batch_requests e
+inference_queue_seconds (/obs/metrics).
+"""
+from __future__ import annotations
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Optional
+
+import numpy as np
+
+from core.config import settings
+from core.observability import (
+    INFERENCE_BATCH_FILL,
+    INFERENCE_BATCH_REQUESTS,
+    INFERENCE_BATCH_ROWS,
+    INFERENCE_QUEUE_SECONDS,
+)
+from services.lstm_bundle_service import load_bundle
+
+
+@dataclass
+class _Item:
+    X: np.ndarray
+    future: Future = field(default_factory=Future)
+    enqueued: float = field(default_factory=time.perf_counter)
+
+
+def bucket_size(n: int, min_bucket: int, max_batch: int) -> int:
+    """Menor potência de 2 >= n (limitada a [min_bucket, max_batch])."""
+    b = max(int(min_bucket), 1)
+    while b < n:
+        b *= 2
+    return min(b, max(int(max_batch), n))
+
+
+class InferenceScheduler:
+    def __init__(self, max_batch: int | None = None, max_wait_ms: float | None = None,
+                 min_bucket: int | None = None, predict_fn=None):
+        self.max_batch = int(max_batch or settings.INFERENCE_MAX_BATCH)
+        wait_ms = settings.INFERENCE_MAX_WAIT_MS if max_wait_ms is None else max_wait_ms
+        self.max_wait_s = max(float(wait_ms or 0.0), 0.0) / 1000.0
+        self.min_bucket = int(min_bucket or settings.INFERENCE_MIN_BUCKET)
+        # (X_padded, batch_size) -> (reg, prob); padrão: bundle carregado no momento do lote
+        self._predict_fn = predict_fn or (lambda X, bs: load_bundle().predict(X, batch_size=bs))
+        self._queue: "queue.Queue[_Item]" = queue.Queue()
+        self._carry: Optional[_Item] = None
+        self._thread = threading.Thread(target=self._run, name="inference-scheduler", daemon=True)
+        self._thread.start()
+
+    # ---------------- API ----------------
+    def submit(self, X_seq: np.ndarray) -> Future:
+        """Enfileira até max_batch janelas; o Future resolve para (reg, prob)."""
+        X_seq = np.asarray(X_seq, dtype=np.float32)
+        if len(X_seq) > self.max_batch:
+            raise ValueError(f"submit aceita até {self.max_batch} janelas; use predict()")
+        item = _Item(X_seq)
+        self._queue.put(item)
+        return item.future
+
+    def predict(self, X_seq: np.ndarray, timeout: float | None = None) -> tuple[np.ndarray, np.ndarray]:
+        X_seq = np.asarray(X_seq, dtype=np.float32)
+        if len(X_seq) == 0:
+            return np.zeros((0, len(load_bundle().target_reg_cols))), np.zeros((0,), dtype=np.float32)
+        futures = [self.submit(X_seq[i:i + self.max_batch]) for i in range(0, len(X_seq), self.max_batch)]
+        parts = [f.result(timeout=timeout) for f in futures]
+        if len(parts) == 1:
+            return parts[0]
+        return np.concatenate([p[0] for p in parts]), np.concatenate([p[1] for p in parts])
+
+    # ---------------- worker ----------------
+    def _next(self, timeout: float | None) -> Optional[_Item]:
+        if self._carry is not None:
+            item, self._carry = self._carry, None
+            return item
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def _run(self) -> None:
+        while True:
+            first = self._next(None)
+            batch, rows = [first], len(first.X)
+            deadline = first.enqueued + self.max_wait_s
+            while rows < self.max_batch:
+                remaining = deadline - time.perf_counter()
+                item = self._next(remaining) if remaining > 0 else self._next_nowait()
+                if item is None:
+                    break
+                if rows + len(item.X) > self.max_batch:
+                    self._carry = item  # abre o próximo lote
+                    break
+                batch.append(item)
+                rows += len(item.X)
+            self._execute(batch, rows)
+
+    def _next_nowait(self) -> Optional[_Item]:
+        # prazo vencido: ainda aproveita o que já está na fila, sem esperar
+        try:
+            return self._queue.get_nowait()
+        except queue.Empty:
+            return None
+
+    def _execute(self, batch: list[_Item], rows: int) -> None:
+        started = time.perf_counter()
+        bucket = bucket_size(rows, self.min_bucket, self.max_batch)
+        try:
+            X = batch[0].X if len(batch) == 1 else np.concatenate([it.X for it in batch])
+            if bucket > rows:
+                X = np.concatenate([X, np.zeros((bucket - rows,) + X.shape[1:], dtype=np.float32)])
+            reg, prob = self._predict_fn(X, bucket)
+        except Exception as e:
+            for it in batch:
+                it.future.set_exception(e)
+            return
+        off = 0
+        for it in batch:
+            n = len(it.X)
+            INFERENCE_QUEUE_SECONDS.observe(started - it.enqueued)
+            it.future.set_result((reg[off:off + n], prob[off:off + n]))
+            off += n
+        INFERENCE_BATCH_FILL.observe(rows / bucket)
+        INFERENCE_BATCH_ROWS.observe(rows)
+        INFERENCE_BATCH_REQUESTS.observe(len(batch))
+
+
+_SCHEDULER: Optional[InferenceScheduler] = None
+_SCHEDULER_LOCK = threading.Lock()
+
+
+def get_scheduler() -> InferenceScheduler:
+    global _SCHEDULER
+    if _SCHEDULER is None:
+        with _SCHEDULER_LOCK:
+            if _SCHEDULER is None:
+                _SCHEDULER = InferenceScheduler()
+    return _SCHEDULER
+
+
+def predict(X_seq: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Janelas brutas -> (reg no espaço de preço, prob de alta), via agendador quando ativo."""
+    if not settings.INFERENCE_SCHEDULER:
+        return load_bundle().predict(X_seq)
+    return get_scheduler().predict(X_seq)
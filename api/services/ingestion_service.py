@@ -1,30 +1,95 @@
-import time, requests, pandas as pd
+import time, pandas as pd
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
+from psycopg2.extras import execute_values
+from core import market, notify, partitioning
 from core.config import settings
 from core.db import pg_conn
 from core.logging import log_job
+from services import candle_buffer, feature_store_service, rollup_service
+from services.binance_client import get_binance_client
 
 def fetch_binance_klines(symbol=None, interval=None, limit=None) -> pd.DataFrame:
     symbol = symbol or settings.BINANCE_SYMBOL
     interval = interval or settings.BINANCE_INTERVAL
     limit = limit or settings.BINANCE_LIMIT
-    url = f"{settings.BINANCE_BASE}/api/v3/klines"
-    headers = {}
-    r = requests.get(url, params={"symbol":symbol,"interval":interval,"limit":limit}, headers=headers, timeout=30)
-    r.raise_for_status()
-    data = r.json()
+    data = get_binance_client().klines({"symbol":symbol,"interval":interval,"limit":limit})
     return normalize_klines_payload(data)
 
-def upsert_candles(df: pd.DataFrame) -> int:
-    sql = """INSERT INTO btc_candles (time, open, high, low, close, volume)
-             VALUES (%s,%s,%s,%s,%s,%s)
-             ON CONFLICT (time) DO NOTHING;"""
-    rows = list(df.itertuples(index=False, name=None))
+def fetch_watchlist(pairs=None, limit=None) -> dict:
+    """Klines recentes de todos os pares em paralelo (mesmo cliente: o controle de peso é compartilhado).
+
+    Retorna {par: DataFrame}; um par que falha entra como a exceção, sem derrubar os demais.
+    """
+    pairs = pairs or market.watchlist()
+    workers = max(1, min(int(settings.INGEST_CONCURRENCY), len(pairs)))
+    out = {}
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ingest") as ex:
+        futs = {ex.submit(fetch_binance_klines, sym, iv, limit): (sym, iv) for sym, iv in pairs}
+        for fut, pair in futs.items():
+            try:
+                out[pair] = fut.result()
+            except Exception as e:
+                out[pair] = e
+    return out
+
+def upsert_candles(df: pd.DataFrame, symbol=None, interval=None) -> int:
+    sym, iv = market.primary_pair()
+    pair = ((symbol or sym).upper(), interval or iv)
+    # frame vazio (nada novo na Binance): upsert_many descarta o par
+    return upsert_many({pair: df}).get(pair, 0)
+
+def upsert_many(frames: dict) -> dict:
+    """Grava candles de vários pares num único INSERT em lote; retorna inseridos por par.
+
+    Só o par principal alimenta rollups (mesma transação), buffer e feature store.
+    """
+    frames = {pair: df for pair, df in frames.items() if df is not None and len(df)}
+    counts = {pair: 0 for pair in frames}
+    if not frames:
+        return counts
+    rows = [
+        (sym, iv, *r)
+        for (sym, iv), df in frames.items()
+        for r in df[["time","open","high","low","close","volume"]].itertuples(index=False, name=None)
+    ]
+    partitioning.ensure_partitions_for("btc_candles", [r[2] for r in rows])
+    primary = market.primary_pair()
     with pg_conn() as conn:
         with conn.cursor() as cur:
-            cur.executemany(sql, rows)
-            inserted = cur.rowcount
-    return inserted
+            inserted = execute_values(
+                cur,
+                """INSERT INTO btc_candles (symbol, interval, time, open, high, low, close, volume)
+                   VALUES %s
+                   ON CONFLICT (symbol, interval, time) DO NOTHING
+                   RETURNING symbol, interval, time, open::float8, high::float8, low::float8,
+                             close::float8, volume::float8""",
+                rows,
+                page_size=1000,
+                fetch=True,
+            )
+            new_rows = {}
+            for sym, iv, *candle in inserted:
+                counts[(sym, iv)] += 1
+                new_rows.setdefault((sym, iv), []).append(candle)
+            for (sym, iv), candles in new_rows.items():
+                # GET /events (core/notify.py): entregue aos clientes no COMMIT
+                candles.sort(key=lambda c: c[0])
+                notify.publish(cur, "candles", {
+                    "symbol": sym, "interval": iv, "n": len(candles),
+                    "from": candles[0][0].isoformat(), "to": candles[-1][0].isoformat(),
+                    "candles": [
+                        {"time": t.isoformat(), "open": o, "high": h, "low": l, "close": c, "volume": v}
+                        for t, o, h, l, c, v in candles[-notify.MAX_POINTS:]
+                    ],
+                })
+            if primary in frames:
+                # buckets agregados (1h/4h/1d...) tocados por estes candles, na mesma transação
+                rollup_service.refresh_for(cur, frames[primary]["time"])
+    if primary in frames:
+        candle_buffer.on_candles_upserted(frames[primary])
+        feature_store_service.on_candles_upserted(frames[primary])
+    return counts
 
 def normalize_klines_payload(data: list) -> pd.DataFrame:
     cols = ["open_time","open","high","low","close","volume","close_time",
@@ -41,16 +106,8 @@ def interval_to_ms(interval: str) -> int:
     return {"m":60_000, "h":3_600_000, "d":86_400_000, "w":7*86_400_000}[unit]*val
 
 def fetch_klines_window(symbol: str, interval: str, start_ms: int, limit: int=1000, api_key: str|None=None):
-    url = f"{settings.BINANCE_BASE}/api/v3/klines"
-    headers = {"X-MBX-APIKEY": api_key} if api_key else {}
-    resp = requests.get(url, params={"symbol":symbol,"interval":interval,"limit":limit,"startTime":start_ms},
-                        headers=headers, timeout=30)
-    if resp.status_code in (418,429):
-        time.sleep(2.0)
-        resp = requests.get(url, params={"symbol":symbol,"interval":interval,"limit":limit,"startTime":start_ms},
-                            headers=headers, timeout=30)
-    resp.raise_for_status()
-    data = resp.json()
+    params = {"symbol":symbol,"interval":interval,"limit":limit,"startTime":start_ms}
+    data = get_binance_client().klines(params, api_key=api_key)
     if not data: return [], None
     return data, data[-1][0]
 
@@ -66,6 +123,8 @@ def backfill_job(days: int|None=None, symbol: str|None=None, interval: str|None=
         now_ms = int(datetime.now(timezone.utc).timestamp()*1000)
         start_ms = now_ms - days*86_400_000
         interval_ms = interval_to_ms(interval)
+        client = get_binance_client()
+        retries_before = client.retries
         total_fetched = total_inserted = loops = 0
         current_ms = start_ms
         while True:
@@ -73,15 +132,19 @@ def backfill_job(days: int|None=None, symbol: str|None=None, interval: str|None=
             loops += 1
             if not data: break
             df = normalize_klines_payload(data)
-            total_inserted += upsert_candles(df)
+            total_inserted += upsert_candles(df, symbol, interval)
             total_fetched += len(df)
             current_ms = last_open + interval_ms
             if current_ms >= now_ms: break
             time.sleep(sleep_ms/1000.0)
 
-        msg = f"Backfill {symbol} {interval} {days}d: fetched={total_fetched}, inserted={total_inserted}, calls={loops}"
+        retries = client.retries - retries_before
+        if total_inserted and market.is_primary(symbol, interval):
+            # candles podem ter entrado no meio da série: recalcula a store a partir do início da janela
+            feature_store_service.start_background_recompute(since=datetime.utcfromtimestamp(start_ms/1000.0))
+        msg = f"Backfill {symbol} {interval} {days}d: fetched={total_fetched}, inserted={total_inserted}, calls={loops}, retries={retries}"
         log_job("backfill","ok",msg,start_ts,datetime.utcnow())
-        return {"status":"ok","fetched":total_fetched,"inserted":total_inserted,"calls":loops,"days":days}
+        return {"status":"ok","fetched":total_fetched,"inserted":total_inserted,"calls":loops,"days":days,"retries":retries}
     except Exception as e:
         log_job("backfill","error",str(e),start_ts,datetime.utcnow())
         return {"status":"error","message":str(e)}
@@ -0,0 +1,243 @@
+"""Fontes de klines plugáveis (live HTTP, gravação, replay e sintética).
+
+Todas devolvem um KlinePage com (status, headers, payload), no mesmo formato da
+resposta de GET /api/v3/klines, para que a lógica de retry/normalização em
+ingestion_service seja a mesma independentemente da fonte.
+
+Seleção via env KLINE_SOURCE:
+- http (padrão): chama BINANCE_BASE;
+- record: chama BINANCE_BASE e grava cada payload em KLINE_RECORD_DIR (.json.gz);
+- replay: serve os arquivos gravados em KLINE_RECORD_DIR;
+- synthetic: série sintética determinística (ml.synthetic).
+Replay e synthetic aceitam KLINE_SPEED, KLINE_LATENCY_MS e KLINE_FAULT_429_RATE.
+"""
+from __future__ import annotations
+
+import bisect
+import gzip
+import hashlib
+import json
+import random
+import threading
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional
+
+import requests
+
+from core.config import settings
+
+
+@dataclass
+class KlinePage:
+    status: int
+    payload: Optional[list] = None
+    headers: dict = field(default_factory=dict)
+
+    def raise_for_status(self) -> None:
+        if self.status >= 400:
+            resp = requests.Response()
+            resp.status_code = self.status
+            raise requests.HTTPError(f"{self.status} Error from kline source", response=resp)
+
+
+class KlineSource(ABC):
+    """Interface: fetch(params) com os mesmos parâmetros de /api/v3/klines."""
+
+    @abstractmethod
+    def fetch(self, params: dict, api_key: str | None = None) -> KlinePage:
+        ...
+
+
+class HttpKlineSource(KlineSource):
+    """Cliente HTTP com sessão keep-alive (pool de conexões reaproveitado entre páginas/threads)."""
+
+    def __init__(self, base_url: str | None = None, connect_timeout: float | None = None,
+                 read_timeout: float | None = None, pool_size: int | None = None):
+        from requests.adapters import HTTPAdapter
+
+        self.base_url = base_url or settings.BINANCE_BASE
+        self.timeout = (
+            connect_timeout if connect_timeout is not None else settings.BINANCE_CONNECT_TIMEOUT,
+            read_timeout if read_timeout is not None else settings.BINANCE_READ_TIMEOUT,
+        )
+        pool_size = pool_size or settings.BINANCE_POOL_SIZE
+        self.session = requests.Session()
+        # retries ficam no BinanceClient (backoff com jitter e Retry-After), não no urllib3
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def fetch(self, params: dict, api_key: str | None = None) -> KlinePage:
+        headers = {"X-MBX-APIKEY": api_key} if api_key else {}
+        r = self.session.get(f"{self.base_url}/api/v3/klines", params=params, headers=headers, timeout=self.timeout)
+        payload = r.json() if r.status_code < 400 else None
+        return KlinePage(status=r.status_code, payload=payload, headers=dict(r.headers))
+
+
+def _record_key(params: dict) -> str:
+    """Nome de arquivo estável para um conjunto de parâmetros (ordem das chaves não importa)."""
+    canon = json.dumps({k: str(v) for k, v in sorted(params.items())}, sort_keys=True)
+    label = "_".join(str(params.get(k, "")) for k in ("symbol", "interval", "startTime") if params.get(k))
+    return f"{label or 'latest'}_{hashlib.sha1(canon.encode()).hexdigest()[:12]}"
+
+
+class RecordingKlineSource(KlineSource):
+    """Encaminha para 'inner' e grava cada resposta 200 em <dir>/<chave>.json.gz."""
+
+    def __init__(self, inner: KlineSource, directory: str | Path):
+        self.inner = inner
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def fetch(self, params: dict, api_key: str | None = None) -> KlinePage:
+        t0 = time.perf_counter()
+        page = self.inner.fetch(params, api_key=api_key)
+        elapsed_ms = (time.perf_counter() - t0) * 1000.0
+        if page.status == 200 and page.payload is not None:
+            entry = {
+                "params": params,
+                "recorded_at": time.time(),
+                "elapsed_ms": round(elapsed_ms, 3),
+                "payload": page.payload,
+            }
+            path = self.directory / f"{_record_key(params)}.json.gz"
+            with gzip.open(path, "wt", encoding="utf-8") as fh:
+                json.dump(entry, fh)
+        return page
+
+
+class _Faults:
+    """Latência e 429 injetados, para exercitar retry/backoff de forma repetível.
+
+    A latência efetiva é (latência gravada + latency_ms) / speed.
+    """
+
+    def __init__(self, speed: float = 1.0, latency_ms: float = 0.0, fault_429_rate: float = 0.0, seed: int = 42):
+        self.speed = speed if speed and speed > 0 else 1.0
+        self.latency_ms = latency_ms
+        self.fault_429_rate = fault_429_rate
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def apply(self, recorded_ms: float = 0.0) -> Optional[KlinePage]:
+        delay_ms = (recorded_ms + self.latency_ms) / self.speed
+        if delay_ms > 0:
+            time.sleep(delay_ms / 1000.0)
+        with self._lock:
+            hit = self._rng.random() < self.fault_429_rate
+        if hit:
+            return KlinePage(status=429, headers={"Retry-After": "1"})
+        return None
+
+
+class ReplayKlineSource(KlineSource):
+    """Serve payloads gravados por RecordingKlineSource.
+
+    Busca primeiro pela chave exata dos parâmetros; sem correspondência, monta a resposta a
+    partir de todos os candles gravados (filtrando por startTime/limit), o que permite
+    backfills com paginação diferente da gravada.
+    """
+
+    def __init__(self, directory: str | Path, faults: Optional[_Faults] = None):
+        self.directory = Path(directory)
+        self.faults = faults or _Faults()
+        self._exact: dict[str, tuple[list, float]] = {}
+        self._rows: dict[tuple[str, str], list] = {}
+        self._open_times: dict[tuple[str, str], list] = {}
+        self._load()
+
+    def _load(self) -> None:
+        merged: dict[tuple[str, str], dict[int, list]] = {}
+        for path in sorted(self.directory.glob("*.json.gz")):
+            with gzip.open(path, "rt", encoding="utf-8") as fh:
+                entry = json.load(fh)
+            params = entry.get("params", {})
+            self._exact[path.name[: -len(".json.gz")]] = (entry["payload"], float(entry.get("elapsed_ms", 0.0)))
+            key = (str(params.get("symbol", "")), str(params.get("interval", "")))
+            bucket = merged.setdefault(key, {})
+            for row in entry["payload"]:
+                bucket[int(row[0])] = row
+        self._rows = {k: [v[t] for t in sorted(v)] for k, v in merged.items()}
+        self._open_times = {k: sorted(v) for k, v in merged.items()}
+
+    def fetch(self, params: dict, api_key: str | None = None) -> KlinePage:
+        exact = self._exact.get(_record_key(params))
+        fault = self.faults.apply(exact[1] if exact is not None else 0.0)
+        if fault is not None:
+            return fault
+        if exact is not None:
+            return KlinePage(status=200, payload=exact[0])
+        key = (str(params.get("symbol", "")), str(params.get("interval", "")))
+        rows = self._rows.get(key, [])
+        return KlinePage(status=200, payload=_slice_rows(rows, self._open_times.get(key, []), params))
+
+
+class SyntheticKlineSource(KlineSource):
+    """Série sintética determinística (mesma seed => mesmos candles) terminando na criação da fonte."""
+
+    def __init__(self, days: float = 120, interval: str | None = None, seed: int = 42,
+                 faults: Optional[_Faults] = None):
+        from ml.synthetic import candles_for_days, synthetic_candles, synthetic_klines_payload
+
+        self.interval = interval or settings.BINANCE_INTERVAL or "5m"
+        df = synthetic_candles(candles_for_days(days, self.interval), interval=self.interval, seed=seed)
+        self.rows = synthetic_klines_payload(df, interval=self.interval)
+        self.open_times = [r[0] for r in self.rows]
+        self.faults = faults or _Faults()
+
+    def fetch(self, params: dict, api_key: str | None = None) -> KlinePage:
+        fault = self.faults.apply()
+        if fault is not None:
+            return fault
+        if str(params.get("interval", self.interval)) != self.interval:
+            return KlinePage(status=400, payload=None)
+        return KlinePage(status=200, payload=_slice_rows(self.rows, self.open_times, params))
+
+
+def _slice_rows(rows: list, open_times: list, params: dict) -> list:
+    limit = int(params.get("limit") or 500)
+    if params.get("startTime") is not None:
+        lo = bisect.bisect_left(open_times, int(params["startTime"]))
+        return rows[lo: lo + limit]
+    return rows[-limit:]
+
+
+_SOURCE: Optional[KlineSource] = None
+_SOURCE_LOCK = threading.Lock()
+
+
+def make_kline_source(kind: str | None = None) -> KlineSource:
+    kind = (kind or settings.KLINE_SOURCE or "http").lower()
+    faults = _Faults(
+        speed=settings.KLINE_SPEED,
+        latency_ms=settings.KLINE_LATENCY_MS,
+        fault_429_rate=settings.KLINE_FAULT_429_RATE,
+        seed=settings.KLINE_SEED,
+    )
+    if kind == "http":
+        return HttpKlineSource()
+    if kind == "record":
+        return RecordingKlineSource(HttpKlineSource(), settings.KLINE_RECORD_DIR)
+    if kind == "replay":
+        return ReplayKlineSource(settings.KLINE_RECORD_DIR, faults=faults)
+    if kind == "synthetic":
+        return SyntheticKlineSource(seed=settings.KLINE_SEED, faults=faults)
+    raise ValueError(f"KLINE_SOURCE desconhecido: {kind}")
+
+
+def get_kline_source() -> KlineSource:
+    global _SOURCE
+    if _SOURCE is None:
+        with _SOURCE_LOCK:
+            if _SOURCE is None:
+                _SOURCE = make_kline_source()
+    return _SOURCE
+
+
+def set_kline_source(source: Optional[KlineSource]) -> None:
+    """Troca a fonte do processo (benchmarks/execuções offline). None volta ao padrão do env."""
+    global _SOURCE
+    _SOURCE = source
@@ -1,57 +1,123 @@
 from __future__ import annotations
 
+import os
 from dataclasses import dataclass
 from typing import Optional
 
 import joblib
+import numpy as np
 
-from ml.model_paths import LSTM_BUNDLE_PATH, LSTM_MODEL_PATH
+from ml.model_paths import LSTM_BUNDLE_PATH, LSTM_COMPACT_BUNDLE_DIR, LSTM_MODEL_PATH, model_paths
 
 
 @dataclass(frozen=True)
 class LstmBundle:
-    model: object  # tf.keras.Model
-    scaler_x: object  # sklearn scaler
+    model: object  # tf.keras.Model (None quando há modelo de serving)
+    scaler_x: object  # sklearn scaler (ou AffineScaler no bundle compacto)
     scaler_y: object  # sklearn scaler (targets)
     feature_cols: list[str]
     target_reg_cols: list[str]
     seq_len: int
+    serving_model: object = None  # tf.keras.Model com (des)normalização no grafo, ou NumpyLstmModel
 
+    def predict(self, X_seq: np.ndarray, batch_size: int = 512) -> tuple[np.ndarray, np.ndarray]:
+        """Janelas brutas (n, seq_len, F) -> (reg no espaço de preço (n, T), prob de alta (n,)).
 
-_CACHE: Optional[LstmBundle] = None
+        Único ponto de inferência: com o modelo de serving é um forward só; bundles
+        antigos (sem ele) passam pelos scalers do joblib.
+        """
+        X_seq = np.asarray(X_seq, dtype=np.float32)
+        if self.serving_model is not None:
+            p = _forward(self.serving_model, X_seq, batch_size)
+            return np.asarray(p["reg"], dtype=np.float64), np.asarray(p["cls"]).reshape((-1,))
+        X2d = X_seq.reshape((X_seq.shape[0] * X_seq.shape[1], X_seq.shape[2]))
+        X_scaled = self.scaler_x.transform(X2d).reshape(X_seq.shape).astype("float32")
+        p = _forward(self.model, X_scaled, batch_size)
+        return self.scaler_y.inverse_transform(np.asarray(p["reg"])), np.asarray(p["cls"]).reshape((-1,))
 
 
-def clear_bundle_cache():
-    global _CACHE
-    _CACHE = None
+# Até este tamanho o modelo é chamado direto: model.predict() tem custo fixo (montagem do
+# dataset/loop) de dezenas de ms, que domina lotes pequenos como os de /predict.
+_DIRECT_CALL_MAX = 64
+
+
+def _forward(model, X: np.ndarray, batch_size: int) -> dict:
+    if len(X) <= _DIRECT_CALL_MAX:
+        return model(X, training=False)
+    return model.predict(X, verbose=0, batch_size=batch_size)
+
 
+# intervalo -> bundle ("" = intervalo base; os demais são modelos treinados sobre rollups)
+_CACHE: dict[str, LstmBundle] = {}
+
+
+def clear_bundle_cache():
+    _CACHE.clear()
+
+
+def load_compact_bundle(directory: str = LSTM_COMPACT_BUNDLE_DIR) -> LstmBundle:
+    """Bundle compacto: manifest + pesos mapeados em memória, forward em NumPy (sem tensorflow)."""
+    from ml.bundle_format import read_bundle
+    from ml.numpy_lstm import NumpyLstmModel
+
+    manifest, tensors = read_bundle(directory)
+    net = NumpyLstmModel(manifest, tensors)
+    return LstmBundle(
+        model=None,
+        scaler_x=net.scaler_x,
+        scaler_y=net.scaler_y,
+        feature_cols=list(manifest["feature_cols"]),
+        target_reg_cols=list(manifest["target_reg_cols"]),
+        seq_len=int(manifest["seq_len"]),
+        serving_model=net,
+    )
 
-def load_bundle(force_reload: bool = False) -> LstmBundle:
-    global _CACHE
-    if _CACHE is not None and not force_reload:
-        return _CACHE
 
-    meta = joblib.load(LSTM_BUNDLE_PATH)
+def load_keras_bundle(bundle_path: str = LSTM_BUNDLE_PATH) -> LstmBundle:
+    """Par antigo lstm_bundle.joblib + .keras (modelo de serving quando existe)."""
+    meta = joblib.load(bundle_path)
     model_path = meta.get("model_path") or LSTM_MODEL_PATH
+    serving_path = meta.get("serving_model_path")
 
     # Import pesado: só aqui.
     import tensorflow as tf
 
-    model = tf.keras.models.load_model(model_path)
-    bundle = LstmBundle(
+    model = serving = None
+    if serving_path and os.path.exists(serving_path):
+        from ml.lstm_model import fixed_affine_layer
+
+        fixed_affine_layer()  # registra a camada customizada antes do load
+        serving = tf.keras.models.load_model(serving_path, compile=False)
+    else:
+        model = tf.keras.models.load_model(model_path)
+    return LstmBundle(
         model=model,
         scaler_x=meta["scaler_x"],
         scaler_y=meta["scaler_y"],
         feature_cols=list(meta["feature_cols"]),
         target_reg_cols=list(meta["target_reg_cols"]),
         seq_len=int(meta["seq_len"]),
+        serving_model=serving,
     )
-    _CACHE = bundle
-    return bundle
-
-
-
-
-
 
 
+def load_bundle(force_reload: bool = False, interval: Optional[str] = None) -> LstmBundle:
+    paths = model_paths(interval)
+    key = "" if paths["bundle"] == LSTM_BUNDLE_PATH else str(interval)
+    cached = _CACHE.get(key)
+    if cached is not None and not force_reload:
+        return cached
+
+    from ml.bundle_format import BundleFormatError, bundle_exists
+
+    bundle = None
+    if bundle_exists(paths["compact"]):
+        try:
+            bundle = load_compact_bundle(paths["compact"])
+        except (BundleFormatError, OSError, KeyError):
+            # versão/checksum inválidos: cai no par joblib + keras
+            bundle = None
+    if bundle is None:
+        bundle = load_keras_bundle(paths["bundle"])
+    _CACHE[key] = bundle
+    return bundle
@@ -2,41 +2,48 @@ import numpy as np
 import pandas as pd
 from typing import Optional
 
-from core.db import pg_conn
-from ml.features import build_features_targets, TARGET_REG_COLS
+from core.fast_json import nullable
+from ml.features import TARGET_REG_COLS
 from ml.lstm_dataset import build_x_sequences
+from services.feature_store_service import load_feature_window
+from services import inference_scheduler, rollup_service
 from services.lstm_bundle_service import load_bundle
 
+_REAL_COLS = ("open", "high", "low", "close", "volume")
+
+
+def series_data(start: Optional[str], end: Optional[str], fallback_days: int=90, interval: Optional[str]=None):
+	return {"points": list(iter_series_points(start, end, fallback_days, interval=interval))}
 
-def series_data(start: Optional[str], end: Optional[str], fallback_days: int=90):
-	with pg_conn() as conn:
-		if start and end:
-			q = """SELECT time, open, high, low, close, volume FROM btc_candles
-				   WHERE time BETWEEN %s AND %s ORDER BY time;"""
-			df = pd.read_sql(q, conn, params=(start,end))
-		else:
-			q = """SELECT time, open, high, low, close, volume FROM btc_candles
-				   WHERE time >= NOW() - INTERVAL %s ORDER BY time;"""
-			df = pd.read_sql(q, conn, params=(f'{fallback_days} days',))
-	if df.empty or len(df) < 30: return {"points":[]}
 
-	df2, X, Yreg, Ycls = build_features_targets(df)
+def iter_series_points(start: Optional[str], end: Optional[str], fallback_days: int=90, interval: Optional[str]=None):
+	"""Pontos da série um a um (modo streaming de /series): a inferência roda em lote antes do
+	primeiro ponto, mas a lista de pontos nunca é montada inteira."""
+	# interval agregado (1h/4h/1d...): candles de candle_rollups e o modelo treinado nesse intervalo
+	interval = rollup_service.check_interval(interval)
+	if interval:
+		load = lambda **kw: rollup_service.load_feature_window(interval, **kw)
+	else:
+		load = load_feature_window
+	if start and end:
+		df2, X, Yreg, Ycls, n_candles = load(start=start, end=end)
+	else:
+		df2, X, Yreg, Ycls, n_candles = load(days=fallback_days)
+	if n_candles < 30: return
+
 	try:
-		bundle = load_bundle()
+		bundle = load_bundle(interval=interval)
 		seq_len = int(bundle.seq_len)
 		n = len(X)
 		reg_pred = np.full((n, len(TARGET_REG_COLS)), np.nan, dtype="float32")
 		prob_up = np.full((n,), np.nan, dtype="float32")
 
 		# Batch predict
-		X_feat = X[bundle.feature_cols].copy()
-		X_seq, idx_orig = build_x_sequences(X_feat, seq_len=seq_len)
-		X2d = X_seq.reshape((X_seq.shape[0] * X_seq.shape[1], X_seq.shape[2]))
-		X_scaled = bundle.scaler_x.transform(X2d).reshape(X_seq.shape).astype("float32")
-
-		p = bundle.model.predict(X_scaled, verbose=0, batch_size=512)
-		reg_all = bundle.scaler_y.inverse_transform(p["reg"]).astype("float32")
-		cls_all = p["cls"].reshape((-1,)).astype("float32")
+		X_seq, idx_orig = build_x_sequences(X[bundle.feature_cols], seq_len=seq_len)
+		if interval:
+			reg_all, cls_all = bundle.predict(X_seq)
+		else:
+			reg_all, cls_all = inference_scheduler.predict(X_seq)
 
 		reg_pred[idx_orig, :] = reg_all
 		prob_up[idx_orig] = cls_all
@@ -47,29 +54,42 @@ def series_data(start: Optional[str], end: Optional[str], fallback_days: int=90)
 	except Exception:
 		reg_pred = cls_pred = prob = None
 
-	out = []
-	for i in range(len(df2)):
-		real = {k: (float(df2.iloc[i][k]) if k!="time" else df2.iloc[i]["time"].isoformat())
-				for k in ["time","open","high","low","close","volume"]}
-		pred = None
-		if reg_pred is not None:
-			row = reg_pred.iloc[i]
-			if not np.isnan(row["close_next"]):
-				pred = {k: float(row[k]) for k in TARGET_REG_COLS}
+	# colunas inteiras convertidas de uma vez (NaN/Inf -> None); o laço só monta os dicts
+	n = len(df2)
+	times = [t.isoformat() for t in pd.to_datetime(df2["time"])]
+	real_cols = [nullable(df2[k].to_numpy(dtype="float64")) for k in _REAL_COLS]
+	pred_cols = err_cols = None
+	has_pred = has_err = np.zeros(n, dtype=bool)
+	if reg_pred is not None:
+		reg = reg_pred.to_numpy(dtype="float64")
+		pred_cols = [nullable(reg[:, j]) for j in range(len(TARGET_REG_COLS))]
+		close_next = reg[:, TARGET_REG_COLS.index("close_next")]
+		amp_next = reg[:, TARGET_REG_COLS.index("amp_next")]
+		has_pred = ~np.isnan(close_next)
+		# erro contra o candle seguinte (o último ponto não tem)
+		close = df2["close"].to_numpy(dtype="float64")
+		amp = (df2["high"] - df2["low"]).to_numpy(dtype="float64")
+		real_next_close = np.append(close[1:], np.nan)
+		real_next_amp = np.append(amp[1:], np.nan)
+		signed = close_next - real_next_close
+		err_cols = [nullable(np.abs(signed)), nullable(signed), nullable(np.abs(amp_next - real_next_amp))]
+		has_err = has_pred.copy()
+		if n:
+			has_err[-1] = False
+	has_cls = np.zeros(n, dtype=bool)
+	if cls_pred is not None and prob is not None:
+		has_cls = ~(np.isnan(prob[:, 0]) | np.isnan(prob[:, 1]))
+		dir_next = cls_pred.tolist()
+		prob_up_l, prob_down_l = nullable(prob[:, 1]), nullable(prob[:, 0])
+	has_pred, has_cls, has_err = has_pred.tolist(), has_cls.tolist(), has_err.tolist()
 
-		clsinfo = None
-		if cls_pred is not None and prob is not None:
-			pup = prob[i][1]
-			if not (np.isnan(pup) or np.isnan(prob[i][0])):
-				clsinfo = {"dir_next": int(cls_pred[i]), "prob_up": float(prob[i][1]), "prob_down": float(prob[i][0])}
+	for i in range(n):
+		real = {"time": times[i]}
+		for k, col in zip(_REAL_COLS, real_cols):
+			real[k] = col[i]
+		pred = {k: col[i] for k, col in zip(TARGET_REG_COLS, pred_cols)} if has_pred[i] else None
+		clsinfo = {"dir_next": dir_next[i], "prob_up": prob_up_l[i], "prob_down": prob_down_l[i]} if has_cls[i] else None
 		err = None
-		if pred is not None and i+1 < len(df2):
-			real_next_close = float(df2.iloc[i+1]["close"])
-			real_next_amp = float(df2.iloc[i+1]["high"] - df2.iloc[i+1]["low"])
-			err = {
-				"close_abs": abs(pred["close_next"] - real_next_close),
-				"close_signed": pred["close_next"] - real_next_close,
-				"amp_abs": abs(pred["amp_next"] - real_next_amp)
-			}
-		out.append({"real": real, "pred": pred, "cls": clsinfo, "err": err})
-	return {"points": out}
+		if has_err[i]:
+			err = {"close_abs": err_cols[0][i], "close_signed": err_cols[1][i], "amp_abs": err_cols[2][i]}
+		yield {"real": real, "pred": pred, "cls": clsinfo, "err": err}
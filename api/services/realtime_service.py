@@ -0,0 +1,87 @@
+"""Previsão em tempo real a partir do buffer de candles em memória (sem Postgres).
+
+- predict_latest(): janela das últimas seq_len features do buffer -> próximo candle;
+- predict_candle(): acrescenta um candle novo/hipotético a uma cópia da janela (features
+  pelo StreamingFeatureEngine.peek, a partir dos últimos 10 candles) e prevê o seguinte.
+  O buffer não é alterado: ele espelha btc_candles e só muda pela ingestão.
+
+A inferência usa o bundle direto (um forward de uma janela), sem passar pelo agendador
+de lotes, cuja espera máxima dominaria a latência.
+"""
+from __future__ import annotations
+
+from datetime import datetime, timezone
+from typing import Optional
+
+import numpy as np
+
+from ml.features import FEATURE_COLS
+from ml.streaming_features import VOL_WINDOW, StreamingFeatureEngine
+from services import candle_buffer
+from services.lstm_bundle_service import load_bundle
+
+
+def _iso(ms: Optional[int]) -> Optional[str]:
+    if ms is None:
+        return None
+    return datetime.fromtimestamp(ms / 1000.0, tz=timezone.utc).replace(tzinfo=None).isoformat()
+
+
+def _snapshot(ring, n: int):
+    if ring is None:
+        raise RuntimeError("Buffer de candles desativado (CANDLE_RING_SIZE=0).")
+    snap = ring.snapshot(last_n=n)
+    if snap is None:
+        raise RuntimeError("Buffer de candles ocupado; tente novamente.")
+    times, ohlcv, feats = snap
+    if len(times) < n:
+        raise RuntimeError(f"Buffer com {len(times)} candles; são necessários {n}.")
+    return times, ohlcv, feats
+
+
+def _forecast(bundle, window: np.ndarray, base_ms: Optional[int], step_ms: Optional[int], hypothetical: bool) -> dict:
+    if not np.isfinite(window).all():
+        raise RuntimeError("Janela com features incompletas.")
+    reg, prob = bundle.predict(window[None, :, :])
+    p_up = float(prob[0])
+    return {
+        "status": "ok",
+        "base_time": _iso(base_ms),
+        "target_time": _iso(base_ms + step_ms) if base_ms is not None and step_ms else None,
+        "hypothetical": hypothetical,
+        "pred": {c: float(reg[0][j]) for j, c in enumerate(bundle.target_reg_cols)},
+        "cls": {"dir_next": int(p_up >= 0.5), "prob_up": p_up, "prob_down": 1.0 - p_up},
+    }
+
+
+def _feature_idx(bundle) -> list[int]:
+    # o buffer guarda as colunas na ordem de FEATURE_COLS
+    return [FEATURE_COLS.index(c) for c in bundle.feature_cols]
+
+
+def predict_latest(ring=None, bundle=None) -> dict:
+    """Previsão do candle seguinte ao último do buffer."""
+    ring = ring if ring is not None else candle_buffer.get_ring()
+    bundle = bundle or load_bundle()
+    seq_len = int(bundle.seq_len)
+    times, _, feats = _snapshot(ring, max(seq_len, 2))
+    window = feats[-seq_len:][:, _feature_idx(bundle)].astype(np.float32)
+    step = int(times[-1] - times[-2])
+    return _forecast(bundle, window, int(times[-1]), step, hypothetical=False)
+
+
+def predict_candle(open_: float, high: Optional[float], low: Optional[float], close: float, volume: float,
+                   ring=None, bundle=None) -> dict:
+    """Previsão do candle seguinte a um candle novo/hipotético posterior ao último do buffer."""
+    ring = ring if ring is not None else candle_buffer.get_ring()
+    bundle = bundle or load_bundle()
+    seq_len = int(bundle.seq_len)
+    high = max(open_, close) if high is None else high
+    low = min(open_, close) if low is None else low
+    times, ohlcv, feats = _snapshot(ring, max(seq_len - 1, VOL_WINDOW, 2))
+    engine = StreamingFeatureEngine.from_history(ohlcv[-VOL_WINDOW:, 3], ohlcv[-VOL_WINDOW:, 4])
+    new_feats = engine.peek(open_, high, low, close, volume)
+    idx = _feature_idx(bundle)
+    window = np.vstack([feats[len(feats) - (seq_len - 1):, idx], new_feats[idx][None, :]]).astype(np.float32)
+    step = int(times[-1] - times[-2])
+    return _forecast(bundle, window, int(times[-1]) + step, step, hypothetical=True)
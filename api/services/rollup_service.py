@@ -0,0 +1,224 @@
+"""Candles agregados (rollups) do par principal em resoluções maiores que BINANCE_INTERVAL.
+
+- candle_rollups (interval, time) guarda OHLCV por bucket: open do primeiro candle, close do
+  último, max(high), min(low), sum(volume) e n_candles (quantos candles base entraram).
+- Buckets alinhados à época Unix (como os klines da Binance); semanas começam na segunda.
+- upsert_candles() chama refresh_for(), na mesma transação: só os buckets tocados pelos
+  candles gravados são recalculados a partir de btc_candles (um bucket de 1d = 288 candles
+  de 5m), então o rollup continua exato mesmo com candles fora de ordem (backfill).
+- Resoluções novas em CANDLE_ROLLUP_INTERVALS são preenchidas em background na subida
+  (ensure_rollups) ou por "python -m services.rollup_service --rebuild".
+- load_candles()/load_feature_window() leem um intervalo agregado para séries e treino,
+  sem nova ingestão na Binance.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import threading
+from datetime import datetime, timedelta
+from typing import Iterable, Optional
+
+import pandas as pd
+
+from core.config import settings
+from core.db import pg_conn
+from core.market import PAIR_WHERE, primary_pair
+from core.logging import log_job
+from ml.features import build_features_targets
+from ml.synthetic import interval_seconds
+
+_LOCK_KEY = 0x726f6c6c  # "roll"
+_CANDLE_COLS = ["time", "open", "high", "low", "close", "volume"]
+_WEEK = 7 * 86400
+_WEEK_ORIGIN = 4 * 86400  # 1970-01-05, segunda-feira
+
+_BG_THREAD: Optional[threading.Thread] = None
+_BG_LOCK = threading.Lock()
+
+
+def base_interval() -> str:
+    return primary_pair()[1]
+
+
+def is_base(interval: Optional[str]) -> bool:
+    return not interval or interval == base_interval()
+
+
+def rollup_intervals() -> list[str]:
+    """Resoluções configuradas válidas: múltiplos (maiores) do intervalo base, sem repetição."""
+    base = interval_seconds(base_interval())
+    out = []
+    for iv in settings.CANDLE_ROLLUP_INTERVALS:
+        try:
+            step = interval_seconds(iv)
+        except (KeyError, ValueError):
+            continue
+        if step > base and step % base == 0 and iv not in out:
+            out.append(iv)
+    return out
+
+
+def check_interval(interval: Optional[str]) -> Optional[str]:
+    """None/base -> None; intervalo agregado configurado -> ele mesmo; senão ValueError."""
+    if is_base(interval):
+        return None
+    if interval not in rollup_intervals():
+        raise ValueError(
+            f"interval '{interval}' não disponível; use {base_interval()} ou um de {rollup_intervals()}"
+        )
+    return interval
+
+
+def _origin(step: int) -> int:
+    return _WEEK_ORIGIN if step % _WEEK == 0 else 0
+
+
+def bucket_start(t: datetime, interval: str) -> datetime:
+    step = interval_seconds(interval)
+    o = _origin(step)
+    secs = int((t - datetime(1970, 1, 1)).total_seconds())
+    return datetime(1970, 1, 1) + timedelta(seconds=(secs - o) // step * step + o)
+
+
+def _refresh_range(cur, interval: str, lo: Optional[datetime] = None, hi: Optional[datetime] = None) -> int:
+    """Recalcula os buckets de 'interval' com candles em [lo, hi) (tudo se lo/hi forem None)."""
+    step = interval_seconds(interval)
+    o = _origin(step)
+    where, params = f"WHERE {PAIR_WHERE}", list(primary_pair())
+    if lo is not None and hi is not None:
+        where += " AND time >= %s AND time < %s"
+        params += [lo, hi]
+    cur.execute(
+        f"""
+        INSERT INTO candle_rollups (interval, time, open, high, low, close, volume, n_candles)
+        SELECT %s,
+               TIMESTAMP '1970-01-01'
+                 + (FLOOR((EXTRACT(EPOCH FROM time) - %s) / %s) * %s + %s)::double precision * INTERVAL '1 second' AS b,
+               (ARRAY_AGG(open ORDER BY time))[1], MAX(high), MIN(low),
+               (ARRAY_AGG(close ORDER BY time DESC))[1], SUM(volume), COUNT(*)
+        FROM btc_candles
+        {where}
+        GROUP BY b
+        ON CONFLICT (interval, time) DO UPDATE
+        SET open = EXCLUDED.open, high = EXCLUDED.high, low = EXCLUDED.low, close = EXCLUDED.close,
+            volume = EXCLUDED.volume, n_candles = EXCLUDED.n_candles
+        WHERE (candle_rollups.open, candle_rollups.high, candle_rollups.low, candle_rollups.close,
+               candle_rollups.volume, candle_rollups.n_candles)
+              IS DISTINCT FROM
+              (EXCLUDED.open, EXCLUDED.high, EXCLUDED.low, EXCLUDED.close, EXCLUDED.volume, EXCLUDED.n_candles);
+        """,
+        (interval, o, step, step, o, *params),
+    )
+    return cur.rowcount
+
+
+def refresh_for(cur, times: Iterable) -> int:
+    """Atualiza, na transação de 'cur', os buckets de todas as resoluções que cobrem 'times'."""
+    ts = pd.to_datetime(pd.Series(list(times)), errors="coerce").dropna()
+    if ts.empty:
+        return 0
+    t_min, t_max = ts.min().to_pydatetime(), ts.max().to_pydatetime()
+    # serializa gravações concorrentes: a segunda relê btc_candles já com os candles da primeira
+    cur.execute("SELECT pg_advisory_xact_lock(%s);", (_LOCK_KEY,))
+    n = 0
+    for iv in rollup_intervals():
+        lo = bucket_start(t_min, iv)
+        hi = bucket_start(t_max, iv) + timedelta(seconds=interval_seconds(iv))
+        n += _refresh_range(cur, iv, lo, hi)
+    return n
+
+
+def rebuild(intervals: Optional[list[str]] = None) -> dict[str, int]:
+    """Recalcula por inteiro as resoluções pedidas (padrão: todas as configuradas)."""
+    out = {}
+    for iv in intervals or rollup_intervals():
+        with pg_conn() as conn:
+            with conn.cursor() as cur:
+                cur.execute("SELECT pg_advisory_xact_lock(%s);", (_LOCK_KEY,))
+                cur.execute("DELETE FROM candle_rollups WHERE interval = %s;", (iv,))
+                out[iv] = _refresh_range(cur, iv)
+    return out
+
+
+def _rebuild_guarded(intervals: list[str]) -> None:
+    start = datetime.utcnow()
+    try:
+        counts = rebuild(intervals)
+        log_job("rollups", "ok", "Rollups recalculados: " + ", ".join(f"{k}={v}" for k, v in counts.items()), start, datetime.utcnow())
+    except Exception as e:
+        log_job("rollups", "error", str(e), start, datetime.utcnow())
+
+
+def ensure_rollups() -> list[str]:
+    """Startup: preenche em background as resoluções configuradas ainda vazias."""
+    global _BG_THREAD
+    with pg_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute(f"SELECT EXISTS (SELECT 1 FROM btc_candles WHERE {PAIR_WHERE});", primary_pair())
+            if not cur.fetchone()[0]:
+                return []
+            missing = []
+            for iv in rollup_intervals():
+                cur.execute("SELECT EXISTS (SELECT 1 FROM candle_rollups WHERE interval = %s);", (iv,))
+                if not cur.fetchone()[0]:
+                    missing.append(iv)
+    if not missing:
+        return []
+    with _BG_LOCK:
+        if _BG_THREAD is not None and _BG_THREAD.is_alive():
+            return []
+        _BG_THREAD = threading.Thread(target=_rebuild_guarded, args=(missing,), name="rollup-rebuild", daemon=True)
+        _BG_THREAD.start()
+    return missing
+
+
+# ---------------- leitura ----------------
+def load_candles(interval: str, start=None, end=None, days: Optional[int] = None, complete_only: bool = False) -> pd.DataFrame:
+    """Candles agregados de 'interval' (mesmos critérios de intervalo de load_feature_window).
+
+    complete_only descarta buckets com menos candles base que o esperado (bucket atual ainda
+    aberto ou buracos na ingestão), para o treino não aprender com candles parciais.
+    """
+    if start is not None and end is not None:
+        where, params = "time BETWEEN %s AND %s", [start, end]
+    elif start is not None:
+        where, params = "time >= %s", [start]
+    else:
+        where, params = "time >= NOW() - %s::interval", [f"{days or settings.LOOKBACK_DAYS} days"]
+    if complete_only:
+        where += " AND n_candles = %s"
+        params.append(interval_seconds(interval) // interval_seconds(base_interval()))
+    with pg_conn() as conn:
+        df = pd.read_sql(
+            f"""SELECT time, open, high, low, close, volume FROM candle_rollups
+                WHERE interval = %s AND {where} ORDER BY time""",
+            conn,
+            params=(interval, *params),
+        )
+    for c in _CANDLE_COLS[1:]:
+        df[c] = df[c].astype(float)
+    return df
+
+
+def load_feature_window(interval: str, start=None, end=None, days: Optional[int] = None, complete_only: bool = False):
+    """(df2, X, Yreg, Ycls, n_candles) sobre candles agregados, no formato do feature store."""
+    df = load_candles(interval, start=start, end=end, days=days, complete_only=complete_only)
+    return (*build_features_targets(df[_CANDLE_COLS]), len(df))
+
+
+def main(argv=None) -> None:
+    ap = argparse.ArgumentParser(description="Recalcula os candles agregados (candle_rollups).")
+    ap.add_argument("--rebuild", action="store_true", help="recalcula a partir de btc_candles")
+    ap.add_argument("--interval", action="append", default=None, help="resolução (repetível; padrão: todas)")
+    args = ap.parse_args(argv)
+
+    intervals = [iv for iv in (check_interval(x) for x in args.interval or []) if iv] or None
+    if args.rebuild:
+        print(json.dumps(rebuild(intervals)))
+    else:
+        print(json.dumps({"base": base_interval(), "rollups": rollup_intervals()}))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,48 +1,18 @@
+import math
 from typing import Optional, List, Tuple
 import pandas as pd
 import numpy as np
+from core import pagination, partitioning
 from core.db import pg_conn
+from core.streaming import iter_rows
 from core.config import settings
-from ml.features import build_features_targets, TARGET_REG_COLS
+from ml.features import TARGET_REG_COLS
 from ml.lstm_dataset import build_x_sequences
+from services.feature_store_service import load_feature_window
+from services import inference_scheduler, rollup_service
 from services.lstm_bundle_service import load_bundle
 
 
-def ensure_table() -> None:
-    """Create cached series table if not exists (materialized series for charts)."""
-    conn = pg_conn()
-    old_autocommit = conn.autocommit
-    try:
-        conn.autocommit = True
-        with conn.cursor() as cur:
-            cur.execute(
-                """
-                CREATE TABLE IF NOT EXISTS series_cache (
-                  time                TIMESTAMP PRIMARY KEY,
-                  open                NUMERIC,
-                  high                NUMERIC,
-                  low                 NUMERIC,
-                  close               NUMERIC,
-                  volume              NUMERIC,
-                  pred_open_next      NUMERIC,
-                  pred_high_next      NUMERIC,
-                  pred_low_next       NUMERIC,
-                  pred_close_next     NUMERIC,
-                  pred_amp_next       NUMERIC,
-                  cls_dir_next        INTEGER,
-                  prob_up             NUMERIC,
-                  prob_down           NUMERIC,
-                  err_close_abs       NUMERIC,
-                  err_close_signed    NUMERIC,
-                  err_amp_abs         NUMERIC
-                );
-                """
-            )
-    finally:
-        conn.autocommit = old_autocommit
-        conn.close()
-
-
 def _predict_lstm_for_series(X: pd.DataFrame) -> tuple[pd.DataFrame, np.ndarray, np.ndarray]:
     """Retorna (reg_pred_df, cls_pred, prob_2col) alinhados por índice de X."""
     bundle = load_bundle()
@@ -52,14 +22,8 @@ def _predict_lstm_for_series(X: pd.DataFrame) -> tuple[pd.DataFrame, np.ndarray,
     prob_up = np.full((n,), np.nan, dtype="float32")
 
     # Batch predict: muito mais rápido que chamar predict() ponto-a-ponto
-    X_feat = X[bundle.feature_cols].copy()
-    X_seq, idx_orig = build_x_sequences(X_feat, seq_len=seq_len)
-    X2d = X_seq.reshape((X_seq.shape[0] * X_seq.shape[1], X_seq.shape[2]))
-    X_scaled = bundle.scaler_x.transform(X2d).reshape(X_seq.shape).astype("float32")
-
-    p = bundle.model.predict(X_scaled, verbose=0, batch_size=512)
-    reg_all = bundle.scaler_y.inverse_transform(p["reg"]).astype("float32")
-    cls_all = p["cls"].reshape((-1,)).astype("float32")
+    X_seq, idx_orig = build_x_sequences(X[bundle.feature_cols], seq_len=seq_len)
+    reg_all, cls_all = inference_scheduler.predict(X_seq)
 
     reg_pred[idx_orig, :] = reg_all
     prob_up[idx_orig] = cls_all
@@ -74,23 +38,11 @@ def build_series_cache(days: Optional[int] = None) -> int:
     """Recalcula a série utilizada pelos gráficos e materializa na tabela series_cache.
     Retorna número de linhas upsertadas.
     """
-    ensure_table()
     days = days or settings.LOOKBACK_DAYS
-    with pg_conn() as conn:
-        df = pd.read_sql(
-            """
-            SELECT time, open, high, low, close, volume
-            FROM btc_candles
-            WHERE time >= NOW() - %s::interval
-            ORDER BY time
-            """,
-            conn,
-            params=(f"{days} days",),
-        )
-    if df.empty or len(df) < 3:
+    df2, X, Yreg, Ycls, n_candles = load_feature_window(days=days)
+    if n_candles < 3:
         return 0
 
-    df2, X, Yreg, Ycls = build_features_targets(df)
     try:
         reg_pred, cls_pred, prob = _predict_lstm_for_series(X)
     except Exception:
@@ -156,6 +108,7 @@ def build_series_cache(days: Optional[int] = None) -> int:
     if not inserts:
         return 0
 
+    partitioning.ensure_partitions_for("series_cache", [r[0] for r in inserts])
     with pg_conn() as conn:
         with conn.cursor() as cur:
             cur.executemany(
@@ -188,85 +141,81 @@ def build_series_cache(days: Optional[int] = None) -> int:
                   err_close_abs  = EXCLUDED.err_close_abs,
                   err_close_signed=EXCLUDED.err_close_signed,
                   err_amp_abs    = EXCLUDED.err_amp_abs
+                -- só regrava linhas que mudaram: rebuilds repetidos não geram versões mortas
+                WHERE (series_cache.open, series_cache.high, series_cache.low, series_cache.close, series_cache.volume,
+                       series_cache.pred_open_next, series_cache.pred_high_next, series_cache.pred_low_next,
+                       series_cache.pred_close_next, series_cache.pred_amp_next,
+                       series_cache.cls_dir_next, series_cache.prob_up, series_cache.prob_down,
+                       series_cache.err_close_abs, series_cache.err_close_signed, series_cache.err_amp_abs)
+                  IS DISTINCT FROM
+                      (EXCLUDED.open, EXCLUDED.high, EXCLUDED.low, EXCLUDED.close, EXCLUDED.volume,
+                       EXCLUDED.pred_open_next, EXCLUDED.pred_high_next, EXCLUDED.pred_low_next,
+                       EXCLUDED.pred_close_next, EXCLUDED.pred_amp_next,
+                       EXCLUDED.cls_dir_next, EXCLUDED.prob_up, EXCLUDED.prob_down,
+                       EXCLUDED.err_close_abs, EXCLUDED.err_close_signed, EXCLUDED.err_amp_abs)
                 """,
                 inserts,
             )
             return cur.rowcount
 
 
-def load_series_cached(start: Optional[str], end: Optional[str], fallback_days: int = 90):
-    ensure_table()
-    params = []
-    where = []
+def _iter_rollup_points(interval: str, start: Optional[str], end: Optional[str], fallback_days: int):
+    """Só os candles agregados: as previsões materializadas são do intervalo base."""
     if start and end:
-        where.append("time BETWEEN %s AND %s")
-        params.extend([start, end])
+        df = rollup_service.load_candles(interval, start=start, end=end)
     else:
-        where.append("time >= NOW() - %s::interval")
-        params.append(f"{fallback_days} days")
-    q = """
-        SELECT time, open, high, low, close, volume,
-               pred_open_next, pred_high_next, pred_low_next, pred_close_next, pred_amp_next,
-               cls_dir_next, prob_up, prob_down,
-               err_close_abs, err_close_signed, err_amp_abs
-        FROM series_cache
-    """
-    if where:
-        q += " WHERE " + " AND ".join(where)
-    q += " ORDER BY time"
+        df = rollup_service.load_candles(interval, days=fallback_days)
+    for r in df.itertuples(index=False):
+        real = {"time": pd.to_datetime(r.time).isoformat(), "open": r.open, "high": r.high,
+                "low": r.low, "close": r.close, "volume": r.volume}
+        yield {"real": real, "pred": None, "cls": None, "err": None}
+
+
+# colunas na ordem de _cached_point
+_CACHED_SELECT = """time, open::float8, high::float8, low::float8, close::float8, volume::float8,
+    pred_open_next::float8, pred_high_next::float8, pred_low_next::float8,
+    pred_close_next::float8, pred_amp_next::float8,
+    cls_dir_next, prob_up::float8, prob_down::float8,
+    err_close_abs::float8, err_close_signed::float8, err_amp_abs::float8"""
+
+
+def _cached_point(r: tuple) -> dict:
+    # colunas já vêm como float8 (NULL -> None); NaN/Inf viram null no encoder (core.fast_json)
+    (t, o, h, l, c, v, pon, phn, pln, pcn, pan, cdn, pup, pdn, eca, ecs, eaa) = r
+    real = {"time": t.isoformat(), "open": o, "high": h, "low": l, "close": c, "volume": v}
+    pred = None
+    if pcn is not None and math.isfinite(pcn):
+        pred = {"open_next": pon, "high_next": phn, "low_next": pln, "close_next": pcn, "amp_next": pan}
+    cls = None
+    if cdn is not None:
+        cls = {"dir_next": int(cdn), "prob_up": pup, "prob_down": pdn}
+    err = None
+    if eca is not None and math.isfinite(eca):
+        err = {"close_abs": eca, "close_signed": ecs, "amp_abs": eaa}
+    return {"real": real, "pred": pred, "cls": cls, "err": err}
+
+
+def iter_series_cached(start: Optional[str], end: Optional[str], fallback_days: int = 90, interval: Optional[str] = None):
+    """Pontos de series_cache em ordem de tempo, lidos em lotes por cursor server-side."""
+    interval = rollup_service.check_interval(interval)
+    if interval:
+        yield from _iter_rollup_points(interval, start, end, fallback_days)
+        return
+    if start and end:
+        where, params = "time BETWEEN %s AND %s", [start, end]
+    else:
+        where, params = "time >= NOW() - %s::interval", [f"{fallback_days} days"]
+    q = f"SELECT {_CACHED_SELECT} FROM series_cache WHERE {where} ORDER BY time"
+    for r in iter_rows(q, params, name="series_cached"):
+        yield _cached_point(r)
 
-    with pg_conn() as conn:
-        df = pd.read_sql(q, conn, params=tuple(params))
-    if df.empty:
-        return {"points": []}
 
-    import math
-    def safe(x):
-        if pd.isna(x):
-            return None
-        try:
-            v = float(x)
-            if math.isnan(v) or math.isinf(v):
-                return None
-            return v
-        except:
-            return None
-    
-    points = []
-    for _, r in df.iterrows():
-        real = {
-            "time": pd.to_datetime(r["time"]).isoformat(),
-            "open": safe(r["open"]),
-            "high": safe(r["high"]),
-            "low": safe(r["low"]),
-            "close": safe(r["close"]),
-            "volume": safe(r["volume"]),
-        }
-        pred = None
-        pcn = safe(r["pred_close_next"])
-        if pcn is not None:
-            pred = {
-                "open_next": safe(r["pred_open_next"]),
-                "high_next": safe(r["pred_high_next"]),
-                "low_next": safe(r["pred_low_next"]),
-                "close_next": pcn,
-                "amp_next": safe(r["pred_amp_next"]),
-            }
-        cls = None
-        cdn = safe(r["cls_dir_next"])
-        if cdn is not None:
-            cls = {
-                "dir_next": int(cdn),
-                "prob_up": safe(r["prob_up"]),
-                "prob_down": safe(r["prob_down"]),
-            }
-        err = None
-        eca = safe(r["err_close_abs"])
-        if eca is not None:
-            err = {
-                "close_abs": eca,
-                "close_signed": safe(r["err_close_signed"]),
-                "amp_abs": safe(r["err_amp_abs"]),
-            }
-        points.append({"real": real, "pred": pred, "cls": cls, "err": err})
-    return {"points": points}
+def load_series_cached(start: Optional[str], end: Optional[str], fallback_days: int = 90, interval: Optional[str] = None):
+    return {"points": list(iter_series_cached(start, end, fallback_days, interval=interval))}
+
+
+def page_series_cached(cursor: Optional[str] = None, limit: int = 1000, direction: str = "asc",
+                       start: Optional[str] = None, end: Optional[str] = None) -> dict:
+    """Página keyset de series_cache (ver core.pagination)."""
+    return pagination.fetch_page("series_cache", _CACHED_SELECT, _cached_point, cursor=cursor, limit=limit,
+                                 direction=direction, start=start, end=end)
@@ -0,0 +1,427 @@
+"""Busca de hiperparâmetros do LSTM em paralelo, com poda precoce por val_loss.
+
+- Espaço: units/dense/dropout/lr do LstmModelConfig e seq_len/batch_size da policy
+  (SEARCH_SPACE); cada trial sorteia uma configuração (numpy Generator com seed).
+- Dataset: a janela de dias é lida uma vez (feature store) e gravada em .npy; os trials
+  abrem por memmap e montam as janelas do próprio seq_len. O split é por linha do
+  candle-alvo, então todos os trials validam nos mesmos candles, qualquer que seja o seq_len.
+- Execução: ProcessPoolExecutor (spawn), TUNING_WORKERS processos com TUNING_TF_THREADS
+  threads de TensorFlow cada.
+- Poda (callback por época, estado compartilhado via multiprocessing.Manager):
+  "random"  -> para o trial se o melhor val_loss até a época e está acima da mediana
+               dos outros trials na mesma época (após TUNING_MIN_EPOCHS épocas);
+  "halving" -> successive halving assíncrono: nos degraus TUNING_MIN_EPOCHS * TUNING_ETA^k
+               o trial só segue se estiver no top 1/TUNING_ETA dos que já passaram ali.
+- Resultados em tuning_studies / tuning_trials; o melhor trial completo (menor MAPE de
+  close_next na validação) pode ser promovido para train_policy.json (promote_trial).
+
+CLI: python -m services.tuning_service --trials 30 --strategy halving --workers 4 [--promote]
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import multiprocessing as mp
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from typing import Optional
+
+import numpy as np
+
+from core.config import settings
+from core.db import pg_conn
+from core.logging import log_job
+from ml.lstm_dataset import open_arrays, save_arrays, temporal_split_indices, window_slice
+from ml.lstm_training import limit_tf_threads
+
+# choices -> lista; ("uniform"|"log", lo, hi) -> contínuo
+SEARCH_SPACE: dict = {
+    "lstm_units": [32, 64, 96, 128],
+    "dense_units": [32, 64, 128],
+    "dropout": ("uniform", 0.0, 0.5),
+    "learning_rate": ("log", 1e-4, 3e-3),
+    "seq_len": [24, 48, 72, 96],
+    "batch_size": [32, 64, 128],
+}
+
+# parâmetro do trial -> chave em train_policy.json
+POLICY_KEYS = {
+    "lstm_units": "lstm_units",
+    "dense_units": "lstm_dense_units",
+    "dropout": "lstm_dropout",
+    "learning_rate": "lstm_lr",
+    "seq_len": "lstm_seq_len",
+    "batch_size": "lstm_batch_size",
+}
+
+
+def sample_params(rng: np.random.Generator, space: dict = SEARCH_SPACE) -> dict:
+    out = {}
+    for name, spec in space.items():
+        if isinstance(spec, tuple):
+            kind, lo, hi = spec
+            if kind == "log":
+                out[name] = float(math.exp(rng.uniform(math.log(lo), math.log(hi))))
+            else:
+                out[name] = float(rng.uniform(lo, hi))
+        else:
+            out[name] = spec[int(rng.integers(len(spec)))]
+    return out
+
+
+def rung_epochs(min_epochs: int, eta: int, max_epochs: int) -> list[int]:
+    """Épocas dos degraus do successive halving: min_epochs * eta^k < max_epochs."""
+    out, e = [], max(int(min_epochs), 1)
+    while e < max_epochs:
+        out.append(e)
+        e *= max(int(eta), 2)
+    return out
+
+
+# ---------------- poda ----------------
+class Pruner:
+    """Decisão de poda por época; o estado (val_loss por época/degrau) é compartilhado entre processos."""
+
+    def __init__(self, strategy: str, shared, lock, min_epochs: int, eta: int, max_epochs: int):
+        self.strategy = strategy
+        self.shared = shared
+        self.lock = lock
+        self.min_epochs = int(min_epochs)
+        self.eta = max(int(eta), 2)
+        self.rungs = set(rung_epochs(min_epochs, eta, max_epochs))
+
+    def should_prune(self, epoch: int, best_loss: float) -> bool:
+        """epoch: 1-based; best_loss: menor val_loss do trial até aqui."""
+        if self.strategy == "halving":
+            if epoch not in self.rungs:
+                return False
+            with self.lock:
+                seen = list(self.shared.get(epoch, [])) + [best_loss]
+                self.shared[epoch] = seen
+            keep = max(1, len(seen) // self.eta)
+            return best_loss > sorted(seen)[keep - 1]
+        # random: mediana dos outros trials na mesma época
+        if epoch < self.min_epochs:
+            return False
+        with self.lock:
+            others = list(self.shared.get(epoch, []))
+            self.shared[epoch] = others + [best_loss]
+        return len(others) >= 2 and best_loss > float(np.median(others))
+
+
+def _pruning_callback(pruner: Pruner):
+    import tensorflow as tf
+
+    class PruneOnValLoss(tf.keras.callbacks.Callback):
+        def __init__(self):
+            super().__init__()
+            self.best = math.inf
+            self.pruned_at: Optional[int] = None
+
+        def on_epoch_end(self, epoch, logs=None):
+            loss = (logs or {}).get("val_loss")
+            if loss is None:
+                return
+            self.best = min(self.best, float(loss))
+            if pruner.should_prune(int(epoch) + 1, self.best):
+                self.pruned_at = int(epoch) + 1
+                self.model.stop_training = True
+
+    return PruneOnValLoss()
+
+
+# ---------------- worker ----------------
+def _run_trial(data_dir: str, trial: int, params: dict, split_row: int, base: dict, pruner: Pruner) -> dict:
+    from ml.lstm_training import fit_and_evaluate
+
+    t0 = time.perf_counter()
+    X, Yreg, Ycls = open_arrays(data_dir, "X", "Yreg", "Ycls")
+    L = int(params["seq_len"])
+    n_seq = len(X) - (L - 1)
+    split = split_row - (L - 1)  # primeira sequência cujo alvo é a linha split_row
+    prune_cb = _pruning_callback(pruner)
+    out = {"trial": trial, "params": params}
+    try:
+        fit, _, metrics = fit_and_evaluate(
+            window_slice(X, L, 0, split),
+            np.asarray(Yreg[L - 1 : split_row], dtype=np.float32),
+            np.asarray(Ycls[L - 1 : split_row]),
+            window_slice(X, L, split, n_seq),
+            np.asarray(Yreg[split_row:], dtype=np.float32),
+            np.asarray(Ycls[split_row:]),
+            alpha=float(base["alpha"]),
+            epochs=int(base["max_epochs"]),
+            batch_size=int(params["batch_size"]),
+            learning_rate=float(params["learning_rate"]),
+            patience=int(base["patience"]),
+            lstm_units=int(params["lstm_units"]),
+            dense_units=int(params["dense_units"]),
+            dropout=float(params["dropout"]),
+            checkpoint_path=os.path.join(data_dir, f"trial_{trial}.keras"),
+            callbacks=[prune_cb],
+        )
+    except Exception as e:
+        out.update({"status": "error", "message": str(e), "wall_s": time.perf_counter() - t0})
+        return out
+    pruned = prune_cb.pruned_at is not None
+    out.update({
+        "status": "pruned" if pruned else "complete",
+        "epochs": fit.epochs,
+        "val_loss": fit.val_loss_best,
+        "message": f"podado na época {prune_cb.pruned_at}" if pruned else None,
+        "wall_s": time.perf_counter() - t0,
+    })
+    # métricas de trials podados ficam gravadas, mas não concorrem ao melhor
+    out.update(metrics)
+    return out
+
+
+# ---------------- persistência ----------------
+def _insert_study(strategy: str, days: int, n_trials: int, cfg: dict, started_at: datetime) -> int:
+    with pg_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                """INSERT INTO tuning_studies(status, strategy, days, n_trials, settings, started_at)
+                   VALUES ('running',%s,%s,%s,%s::jsonb,%s) RETURNING id;""",
+                (strategy, days, n_trials, json.dumps(cfg), started_at),
+            )
+            return int(cur.fetchone()[0])
+
+
+def _insert_trial(study_id: int, r: dict) -> None:
+    with pg_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                """INSERT INTO tuning_trials(study_id, trial, params, status, epochs, val_loss,
+                                             mae, rmse, mape, smape, dir_acc, wall_s, message)
+                   VALUES (%s,%s,%s::jsonb,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s);""",
+                (study_id, r["trial"], json.dumps(r["params"]), r["status"], r.get("epochs"), r.get("val_loss"),
+                 r.get("mae"), r.get("rmse"), r.get("mape"), r.get("smape"), r.get("dir_acc"), r.get("wall_s"),
+                 r.get("message")),
+            )
+
+
+def _finish_study(study_id: int, status: str, best_trial: Optional[int], message: str) -> None:
+    with pg_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                """UPDATE tuning_studies SET status=%s, best_trial=%s, message=%s, finished_at=%s
+                   WHERE id=%s;""",
+                (status, best_trial, message, datetime.utcnow(), study_id),
+            )
+
+
+# ---------------- API ----------------
+def run_search(
+    days: Optional[int] = None,
+    trials: Optional[int] = None,
+    strategy: Optional[str] = None,
+    max_epochs: Optional[int] = None,
+    workers: Optional[int] = None,
+    tf_threads: Optional[int] = None,
+    seed: Optional[int] = None,
+    promote: bool = False,
+) -> dict:
+    from services.feature_store_service import load_feature_window
+
+    days = days or settings.LOOKBACK_DAYS
+    trials = int(trials or settings.TUNING_TRIALS)
+    strategy = strategy or settings.TUNING_STRATEGY
+    if strategy not in ("random", "halving"):
+        return {"status": "error", "message": "strategy deve ser 'random' ou 'halving'"}
+    workers = max(min(int(workers or settings.TUNING_WORKERS), trials), 1)
+    tf_threads = int(tf_threads or settings.TUNING_TF_THREADS)
+    cfg = {
+        "alpha": float(settings.ALPHA_DECAY),
+        "max_epochs": int(max_epochs or settings.LSTM_EPOCHS),
+        "patience": int(settings.LSTM_PATIENCE),
+        "min_epochs": int(settings.TUNING_MIN_EPOCHS),
+        "eta": int(settings.TUNING_ETA),
+        "workers": workers,
+        "tf_threads": tf_threads,
+        "seed": seed,
+        "space": {k: list(v) for k, v in SEARCH_SPACE.items()},
+    }
+    start = datetime.utcnow()
+    study_id = None
+    data_dir = None
+    try:
+        df2, X, Yreg, Ycls, n_candles = load_feature_window(days=days)
+        max_len = max(SEARCH_SPACE["seq_len"])
+        # split pela linha do alvo, comum a todos os seq_len (mesmo critério de train_job)
+        n_rows = len(X)
+        if n_rows - (max_len - 1) < 500:
+            raise RuntimeError("Dados insuficientes para a busca (mínimo ~500 sequências).")
+        split_row = (max_len - 1) + temporal_split_indices(n_rows - (max_len - 1), holdout_max=500, train_ratio=0.8)
+
+        study_id = _insert_study(strategy, days, trials, cfg, start)
+        rng = np.random.default_rng(seed)
+        plan = [sample_params(rng) for _ in range(trials)]
+
+        data_dir = tempfile.mkdtemp(prefix="tuning_", dir=settings.BACKTEST_DATA_DIR or None)
+        save_arrays(
+            data_dir,
+            X=X.to_numpy(dtype=np.float32),
+            Yreg=Yreg.to_numpy(dtype=np.float32),
+            Ycls=Ycls.to_numpy(dtype=np.int64),
+        )
+
+        ctx = mp.get_context("spawn")
+        results = []
+        with ctx.Manager() as manager:
+            pruner = Pruner(strategy, manager.dict(), manager.Lock(), cfg["min_epochs"], cfg["eta"], cfg["max_epochs"])
+            with ProcessPoolExecutor(
+                max_workers=workers, mp_context=ctx, initializer=limit_tf_threads, initargs=(tf_threads,),
+            ) as pool:
+                futs = [pool.submit(_run_trial, data_dir, k, p, split_row, cfg, pruner) for k, p in enumerate(plan)]
+                for fut in as_completed(futs):
+                    r = fut.result()
+                    _insert_trial(study_id, r)
+                    results.append(r)
+
+        results.sort(key=lambda r: r["trial"])
+        complete = [r for r in results if r["status"] == "complete" and r.get("mape") is not None]
+        best = min(complete, key=lambda r: r["mape"]) if complete else None
+        counts = {s: sum(1 for r in results if r["status"] == s) for s in ("complete", "pruned", "error")}
+        msg = (
+            f"Busca {strategy} {days}d: {trials} trials "
+            f"({counts['complete']} completos, {counts['pruned']} podados, {counts['error']} erros). "
+            + (f"Melhor trial {best['trial']}: MAPE={best['mape']:.4f}% {best['params']}" if best else "Sem trial completo.")
+        )
+        _finish_study(study_id, "ok", best["trial"] if best else None, msg)
+        log_job("tuning", "ok", msg, start, datetime.utcnow())
+        out = {
+            "status": "ok",
+            "study_id": study_id,
+            "strategy": strategy,
+            "days": days,
+            "elapsed_s": (datetime.utcnow() - start).total_seconds(),
+            "counts": counts,
+            "best": best,
+            "trials": results,
+        }
+        if promote and best is not None:
+            out["promoted"] = promote_trial(study_id, best["trial"])
+        return out
+    except Exception as e:
+        if study_id is not None:
+            try:
+                _finish_study(study_id, "error", None, str(e))
+            except Exception:
+                pass
+        log_job("tuning", "error", str(e), start, datetime.utcnow())
+        return {"status": "error", "message": str(e), "study_id": study_id}
+    finally:
+        if data_dir:
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+
+def promote_trial(study_id: int, trial: Optional[int] = None) -> dict:
+    """Grava os hiperparâmetros do trial (padrão: o melhor do estudo) em train_policy.json.
+
+    As demais chaves do arquivo são mantidas; a troca é atômica (arquivo temporário + rename).
+    O processo atual passa a usar os novos valores no próximo treino; outros workers da API
+    leem o arquivo ao reiniciar.
+    """
+    with pg_conn() as conn:
+        with conn.cursor() as cur:
+            if trial is None:
+                cur.execute("SELECT best_trial FROM tuning_studies WHERE id=%s;", (int(study_id),))
+                row = cur.fetchone()
+                if not row or row[0] is None:
+                    raise ValueError(f"Estudo {study_id} sem melhor trial.")
+                trial = int(row[0])
+            cur.execute(
+                "SELECT params, status FROM tuning_trials WHERE study_id=%s AND trial=%s;",
+                (int(study_id), int(trial)),
+            )
+            row = cur.fetchone()
+    if not row:
+        raise ValueError(f"Trial {trial} não encontrado no estudo {study_id}.")
+    params, status = row
+    if status != "complete":
+        raise ValueError(f"Trial {trial} não foi completo ({status}).")
+
+    path = settings.TRAIN_POLICY_PATH
+    try:
+        with open(path, encoding="utf-8") as f:
+            policy = json.load(f)
+    except FileNotFoundError:
+        policy = {}
+    updates = {POLICY_KEYS[k]: v for k, v in params.items() if k in POLICY_KEYS}
+    policy.update(updates)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(policy, f, indent=2)
+        f.write("\n")
+    os.replace(tmp, path)
+
+    settings.LSTM_UNITS = int(policy["lstm_units"])
+    settings.LSTM_DENSE_UNITS = int(policy["lstm_dense_units"])
+    settings.LSTM_DROPOUT = float(policy["lstm_dropout"])
+    settings.LSTM_LR = float(policy["lstm_lr"])
+    settings.LSTM_SEQ_LEN = int(policy["lstm_seq_len"])
+    settings.LSTM_BATCH_SIZE = int(policy["lstm_batch_size"])
+
+    with pg_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute("UPDATE tuning_studies SET promoted_at=%s WHERE id=%s;", (datetime.utcnow(), int(study_id)))
+    return {"study_id": int(study_id), "trial": int(trial), "policy_path": path, "policy": updates}
+
+
+def list_studies(limit: int = 20) -> list[dict]:
+    with pg_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                """SELECT id, status, strategy, days, n_trials, best_trial, promoted_at, message, started_at, finished_at
+                   FROM tuning_studies ORDER BY id DESC LIMIT %s;""",
+                (int(limit),),
+            )
+            rows = cur.fetchall()
+    return [
+        {
+            "study_id": r[0], "status": r[1], "strategy": r[2], "days": r[3], "n_trials": r[4], "best_trial": r[5],
+            "promoted_at": r[6].isoformat() if r[6] else None, "message": r[7],
+            "started_at": r[8].isoformat(), "finished_at": r[9].isoformat() if r[9] else None,
+        }
+        for r in rows
+    ]
+
+
+def get_trials(study_id: int) -> list[dict]:
+    with pg_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                """SELECT trial, params, status, epochs, val_loss, mae, rmse, mape, smape, dir_acc, wall_s, message
+                   FROM tuning_trials WHERE study_id=%s ORDER BY trial;""",
+                (int(study_id),),
+            )
+            cols = [d[0] for d in cur.description]
+            return [dict(zip(cols, r)) for r in cur.fetchall()]
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Busca de hiperparâmetros do LSTM (random/successive halving).")
+    ap.add_argument("--days", type=int, default=None)
+    ap.add_argument("--trials", type=int, default=None)
+    ap.add_argument("--strategy", choices=["random", "halving"], default=None)
+    ap.add_argument("--max-epochs", type=int, default=None)
+    ap.add_argument("--workers", type=int, default=None)
+    ap.add_argument("--tf-threads", type=int, default=None, help="threads de TensorFlow por worker")
+    ap.add_argument("--seed", type=int, default=None)
+    ap.add_argument("--promote", action="store_true", help="grava o melhor trial em train_policy.json")
+    args = ap.parse_args()
+    out = run_search(
+        days=args.days, trials=args.trials, strategy=args.strategy, max_epochs=args.max_epochs,
+        workers=args.workers, tf_threads=args.tf_threads, seed=args.seed, promote=args.promote,
+    )
+    print(json.dumps(out, indent=2, default=str))
+
+
+if __name__ == "__main__":
+    main()